@@ -3,6 +3,8 @@
 import numpy as np
 from sgp4.api import Satrec, WGS72
 from sgp4.api import jday
+from debris_density import DebrisDensityIndex, R_EARTH_KM
+from frames import teme_to_geodetic
 import datetime
 import csv
 
@@ -91,15 +93,16 @@ def is_in_fir(lat, lon):
 
 now = datetime.datetime.utcnow()
 sat_positions = []
+satrecs = []
 
 for sat in satellites:
     s = Satrec.twoline2rv(sat['line1'], sat['line2'])
+    satrecs.append(s)
     jd, fr = jday(now.year, now.month, now.day, now.hour, now.minute, now.second)
     e, r, v = s.sgp4(jd, fr)  # r = position in km, v = velocity in km/s
 
     if e == 0:
-        lat = np.degrees(np.arcsin(r[2] / np.linalg.norm(r)))   # simple lat calculation
-        lon = np.degrees(np.arctan2(r[1], r[0]))               # simple lon calculation
+        lat, lon, _ = teme_to_geodetic(r, jd, fr)   # WGS-84 sub-point (Earth rotation included)
 
     if is_in_fir(lat, lon):
         sat_positions.append({
@@ -129,7 +132,7 @@ delta_t_val = 60.0 # Policy Constant: Sample time interval (using max 60 sec per
 tau_val = 300.0    # Tuning Constant: Time decay constant (Initial default)
 
 # External/Policy Variables - Using placeholders until external data feeds are integrated.
-DSE_val = 5.0      # External: Debris/Environment Index (Placeholder)
+density = DebrisDensityIndex.from_satrecs(satrecs)   # Debris/Environment Index from the loaded catalog
 W_odpo_h_val = 0.9 # External: ODPO Weight (Placeholder)
 W_ops_val = 1.0    # External: Operational Weight (Placeholder)
 
@@ -159,7 +162,7 @@ for i in range(num_sats):
                 delta_t=delta_t_val,
                 tau=tau_val,
                 v_rel=v_rel_val,
-                DSE=DSE_val,
+                DSE=density.lookup(sat1['alt'] - R_EARTH_KM, sat1['lat']),
                 W_odpo_h=W_odpo_h_val,
                 W_ops=W_ops_val
             )
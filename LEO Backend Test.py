@@ -5,6 +5,7 @@ from sgp4.api import Satrec, WGS72
 from sgp4.api import jday
 import datetime
 import csv
+from frames import teme_to_geodetic
 
 
 # 1. Load TLE data
@@ -46,8 +47,7 @@ for sat in satellites:
     e, r, v = s.sgp4(jd, fr)  # r = position in km, v = velocity in km/s
 
     if e == 0:
-        lat = np.degrees(np.arcsin(r[2] / np.linalg.norm(r)))   # simple lat calculation
-        lon = np.degrees(np.arctan2(r[1], r[0]))               # simple lon calculation
+        lat, lon, _ = teme_to_geodetic(r, jd, fr)   # WGS-84 sub-point via GMST rotation
 
         if is_in_fir(lat, lon):
             sat_positions.append({
@@ -7,6 +7,8 @@ import requests
 import os
 from datetime import datetime, UTC
 from marshmallow import Schema, fields
+from frames import teme_to_geodetic
+from debris_density import DebrisDensityIndex, NEUTRAL_DSE
 
 # 0. Constants and Parameters (SME-Tuned)
 
@@ -23,7 +25,6 @@ FIR_LON_MAX = 127.5
 D0_VAL = 25.0       # Reference distance (km)
 DELTA_T_VAL = 60.0  
 TAU_VAL = 600.0     # Time decay constant (10 minutes per SME)
-DSE_VAL = 1.0       # Debris/Environment Index (Neutral value per SME)
 
 
 # 1. Dynamic Weight Calculation Functions (API Simulators)
@@ -139,7 +140,7 @@ def is_in_fir(lat, lon):
 # 4. TLE Loading Function
 
 def load_tle_data(tle_file_path=TLE_FILE):
-    """Loads all TLE data into a list of dictionaries."""
+    """Loads all TLE data into a list of dictionaries (each with its parsed Satrec)."""
     satellites = []
     try:
         with open(tle_file_path, "r") as f:
@@ -148,18 +149,25 @@ def load_tle_data(tle_file_path=TLE_FILE):
                 name = lines[i].strip()
                 line1 = lines[i+1].strip()
                 line2 = lines[i+2].strip()
-                satellites.append({'name': name, 'line1': line1, 'line2': line2})
+                satellites.append({'name': name, 'line1': line1, 'line2': line2,
+                                   'satrec': Satrec.twoline2rv(line1, line2)})
         return satellites
     except FileNotFoundError:
         print(f"Error: TLE file not found at {tle_file_path}") 
         return []
 
+def build_density_index(satellites):
+    """Debris/Environment Index of the loaded catalog; build once after load_tle_data() and reuse per run."""
+    return DebrisDensityIndex.from_satrecs([sat['satrec'] for sat in satellites])
+
 # 5. Core Analysis Function (Epoch and Dynamic Weights Implemented)
 
-def run_full_risk_analysis(satellites, analysis_time=None):
+def run_full_risk_analysis(satellites, analysis_time=None, density=None):
     """
     Propagates satellites for the given analysis_time (epoch) and performs
     conjunction analysis, returning results as a list of Python-native dicts.
+    density is the catalog's DebrisDensityIndex from build_density_index(); without it
+    every pair uses the neutral DSE.
     """
     # Use current UTC time if no time is provided
     if analysis_time is None:
@@ -170,7 +178,7 @@ def run_full_risk_analysis(satellites, analysis_time=None):
 
     # 5.1 Propagate and Filter Incheon FIR
     for sat in satellites:
-        s = Satrec.twoline2rv(sat['line1'], sat['line2'])
+        s = sat['satrec']
         
         # Propagate using the provided analysis_time
         jd, fr = jday(analysis_time.year, analysis_time.month, analysis_time.day, 
@@ -178,8 +186,7 @@ def run_full_risk_analysis(satellites, analysis_time=None):
         e, r, v = s.sgp4(jd, fr)
 
         if e == 0:
-            lat = np.degrees(np.arcsin(r[2] / np.linalg.norm(r)))
-            lon = np.degrees(np.arctan2(r[1], r[0]))
+            lat, lon, _ = teme_to_geodetic(r, jd, fr)   # WGS-84 sub-point (Earth rotation included)
 
             if is_in_fir(lat, lon):
                 sat_positions.append({
@@ -210,10 +217,11 @@ def run_full_risk_analysis(satellites, analysis_time=None):
                 # Call Dynamic Weight Functions
                 W_odpo_h_val = get_W_odpo_h(alt1_km)
                 W_ops_val = get_W_ops(sat1['lat'], sat1['lon'], analysis_time)
+                DSE_val = density.lookup(alt1_km, sat1['lat']) if density is not None else NEUTRAL_DSE
                 
                 risk_score = calculate_R_final_revised(
                     d=d_val, d0=D0_VAL, delta_t=DELTA_T_VAL, tau=TAU_VAL,
-                    v_rel=v_rel_val, DSE=DSE_VAL, W_odpo_h=W_odpo_h_val, W_ops=W_ops_val
+                    v_rel=v_rel_val, DSE=DSE_val, W_odpo_h=W_odpo_h_val, W_ops=W_ops_val
                 )
                 risk_category = assign_risk_category(risk_score)
                 
@@ -0,0 +1,208 @@
+# access_windows.py - Precomputed FIR access windows (entry/exit intervals) for regional pre-filtering
+
+# 1. Imports and Setup
+from datetime import datetime, timedelta, UTC
+import os
+import threading
+import numpy as np
+
+from marshmallow import Schema, fields, validate
+
+from propagation import VectorCatalog, time_grid, datetime_to_jd
+from frames import teme_to_geodetic
+from risk_analyzer import FIR_BOUNDARIES
+
+ACCESS_HORIZON_HOURS = float(os.getenv("ACCESS_HORIZON_HOURS", "24"))   # 24-72 h forward
+ACCESS_STEP_SECONDS = float(os.getenv("ACCESS_STEP_SECONDS", "30"))     # Passes shorter than one step can be missed
+ACCESS_LEAD_SECONDS = float(os.getenv("ACCESS_LEAD_SECONDS", "60"))     # Pre-filter also keeps objects entering this soon after
+BISECTION_ITERATIONS = 5       # Entry/exit times refined to step / 2^5 (~1 s at 30 s)
+TIME_CHUNK = 60                # Epochs propagated per batch while scanning the horizon
+
+FIR_NAMES = [b["name"] for b in FIR_BOUNDARIES.values()]
+_BOX = np.array([[b["lat_min"], b["lat_max"], b["lon_min"], b["lon_max"]] for b in FIR_BOUNDARIES.values()], dtype=float)
+
+
+# --- 2. Marshmallow Schemas ---
+
+class FirAccessQuerySchema(Schema):
+    """Query parameters for /api/firs/access."""
+    fir = fields.Str(required=True, validate=validate.OneOf(FIR_NAMES))
+    start = fields.AwareDateTime(load_default=None, default_timezone=UTC, metadata={"description": "Default: now."})
+    end = fields.AwareDateTime(load_default=None, default_timezone=UTC, metadata={"description": "Default: start + 1 h."})
+
+class AccessWindowSchema(Schema):
+    entry = fields.Str(required=True); exit = fields.Str(required=True)
+
+class SatelliteAccessSchema(Schema):
+    norad_id = fields.Int(required=True); name = fields.Str(required=True)
+    windows = fields.List(fields.Nested(AccessWindowSchema), required=True)
+
+class FirAccessResponseSchema(Schema):
+    fir = fields.Str(required=True); start = fields.Str(required=True); end = fields.Str(required=True)
+    count = fields.Int(required=True)
+    satellites = fields.List(fields.Nested(SatelliteAccessSchema), required=True)
+
+
+# --- 3. Box Test ---
+
+def _inside(lat, lon, fir):
+    """Sub-point inside FIR box `fir` (array of FIR indices broadcasting against lat/lon)."""
+    box = _BOX[fir]
+    return (box[..., 0] <= lat) & (lat <= box[..., 1]) & (box[..., 2] <= lon) & (lon <= box[..., 3])
+
+
+# --- 4. Access-Window Index ---
+
+class AccessWindowIndex:
+    """
+    Entry/exit intervals of every object over every FIR box across [start, start + hours].
+    The horizon is scanned on a step_seconds grid with batched SatrecArray propagation; every
+    in/out flip between two samples is then bisected (all flips of an object in one sgp4_array
+    call per iteration). Per FIR, intervals are kept sorted by entry time together with the
+    longest interval duration, so an overlap query is two binary searches plus a vectorized
+    exit-time test over the few intervals that can overlap.
+    """
+
+    def __init__(self, satellites, start, hours=ACCESS_HORIZON_HOURS, step_seconds=ACCESS_STEP_SECONDS):
+        self.catalog = VectorCatalog(satellites)
+        self.start = start; self.end = start + timedelta(hours=hours); self.step_seconds = step_seconds
+        times, jd, fr = time_grid(self.start, self.end, step_seconds)
+        self.t0 = start.timestamp(); self.t_end = self.t0 + (len(times) - 1) * step_seconds
+        n, n_fir = len(self.catalog), len(FIR_NAMES)
+
+        # 1) Scan: record (object, fir, sample k) wherever the in-box state flips between k and k+1
+        flips = []; previous = None; initial = None
+        for c0 in range(0, len(times), TIME_CHUNK):
+            jd_c, fr_c = jd[c0:c0 + TIME_CHUNK], fr[c0:c0 + TIME_CHUNK]
+            r, _, ok = self.catalog.propagate(jd_c, fr_c)                       # (N, Tc, 3)
+            lat, lon, _ = teme_to_geodetic(r, jd_c, fr_c)
+            state = _inside(lat[:, np.newaxis, :], lon[:, np.newaxis, :], np.arange(n_fir)[:, np.newaxis])
+            state &= ok[:, np.newaxis, :]                                         # (N, F, Tc)
+            if previous is not None: state = np.concatenate([previous, state], axis=2)
+            else: initial = state[:, :, 0].copy()
+            obj, fir, k = np.nonzero(state[:, :, 1:] != state[:, :, :-1])
+            offset = c0 - (1 if previous is not None else 0)
+            flips.append(np.stack([obj, fir, k + offset], axis=1))
+            previous = state[:, :, -1:]
+        flips = np.concatenate(flips) if flips else np.empty((0, 3), dtype=np.int64)
+
+        # 2) Bisect every flip between its two samples (lo: state as at sample k, hi: as at k+1)
+        lo = self.t0 + flips[:, 2] * step_seconds; hi = lo + step_seconds
+        entering = np.empty(0, dtype=bool)
+        if len(flips):
+            # Direction of each flip: parity of earlier flips of the same (object, FIR)
+            order = np.lexsort((flips[:, 2], flips[:, 1], flips[:, 0]))
+            flips, lo, hi = flips[order], lo[order], hi[order]
+            group = flips[:, 0] * n_fir + flips[:, 1]
+            first = np.r_[True, group[1:] != group[:-1]]
+            rank = np.arange(len(flips)) - np.maximum.accumulate(np.where(first, np.arange(len(flips)), 0))
+            entering = ~initial[flips[:, 0], flips[:, 1]] ^ (rank % 2 == 1)
+            for _ in range(BISECTION_ITERATIONS):
+                mid = (lo + hi) / 2.0
+                inside_mid = self._inside_at(flips[:, 0], flips[:, 1], mid)
+                # Entering: inside at mid means the crossing is earlier; exiting: the opposite
+                crossed = inside_mid == entering
+                hi = np.where(crossed, mid, hi); lo = np.where(crossed, lo, mid)
+        crossing = (lo + hi) / 2.0
+
+        # 3) Pair entries with exits into intervals (clipped to the horizon) and index them per FIR
+        self._by_fir = []
+        for f in range(n_fir):
+            starts, ends, owners = [], [], []; open_at = {}
+            for o in np.nonzero(initial[:, f])[0].tolist():
+                open_at[o] = len(starts); starts.append(self.t0); ends.append(self.t_end); owners.append(o)
+            sel = flips[:, 1] == f
+            for o, t, is_entry in zip(flips[sel, 0].tolist(), crossing[sel].tolist(), entering[sel].tolist()):
+                if is_entry:
+                    open_at[o] = len(starts); starts.append(t); ends.append(self.t_end); owners.append(o)
+                elif o in open_at:
+                    ends[open_at.pop(o)] = t
+            starts = np.array(starts, dtype=float); ends = np.array(ends, dtype=float)
+            owners = np.array(owners, dtype=np.int64)
+            order = np.argsort(starts, kind='stable')
+            self._by_fir.append((starts[order], ends[order], owners[order],
+                                 float((ends - starts).max()) if len(starts) else 0.0))
+        self.window_count = sum(len(s) for s, _, _, _ in self._by_fir)
+
+    def _inside_at(self, objs, firs, t_seconds):
+        """In-box state of objs[i] over FIR firs[i] at t_seconds[i] (one sgp4_array call per object)."""
+        jd0, fr0 = datetime_to_jd(self.start)
+        fr = fr0 + (t_seconds - self.t0) / 86400.0
+        r = np.full((len(objs), 3), np.nan)
+        bounds = np.flatnonzero(np.r_[True, objs[1:] != objs[:-1], True])
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            e, r_o, _ = self.catalog.satrecs[objs[a]].sgp4_array(np.full(b - a, jd0), fr[a:b])
+            r[a:b] = np.where((e == 0)[:, np.newaxis], r_o, np.nan)
+        lat, lon, _ = teme_to_geodetic(r, np.full(len(objs), jd0), fr)
+        return _inside(lat, lon, firs)
+
+    def covers(self, t1, t2):
+        return self.t0 <= t1.timestamp() and t2.timestamp() <= self.t_end
+
+    def over(self, fir_name, t1, t2):
+        """Catalog indices of objects whose sub-point is inside the FIR at some time in [t1, t2]."""
+        starts, ends, owners, max_len = self._by_fir[FIR_NAMES.index(fir_name)]
+        a, b = t1.timestamp(), t2.timestamp()
+        lo = np.searchsorted(starts, a - max_len, side="left"); hi = np.searchsorted(starts, b, side="right")
+        hit = ends[lo:hi] >= a
+        return np.unique(owners[lo:hi][hit])
+
+    def over_any(self, t1, t2):
+        """Catalog indices of objects over any FIR at some time in [t1, t2]."""
+        found = [self.over(name, t1, t2) for name in FIR_NAMES]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def windows(self, fir_name, index, t1=None, t2=None):
+        """(entry, exit) datetimes of one object over a FIR, optionally limited to [t1, t2]."""
+        starts, ends, owners, _ = self._by_fir[FIR_NAMES.index(fir_name)]
+        sel = owners == index
+        if t1 is not None: sel &= ends >= t1.timestamp()
+        if t2 is not None: sel &= starts <= t2.timestamp()
+        return [(datetime.fromtimestamp(s, UTC), datetime.fromtimestamp(e, UTC)) for s, e in zip(starts[sel], ends[sel])]
+
+    def access_report(self, fir_name, t1, t2):
+        """Response body for /api/firs/access (FirAccessResponseSchema)."""
+        satellites = []
+        for i in self.over(fir_name, t1, t2).tolist():
+            satellites.append({
+                "norad_id": int(self.catalog.norad_ids[i]), "name": self.catalog.names[i],
+                "windows": [{"entry": s.isoformat(), "exit": e.isoformat()} for s, e in self.windows(fir_name, i, t1, t2)]
+            })
+        satellites.sort(key=lambda s: s["windows"][0]["entry"] if s["windows"] else "")
+        return {"fir": fir_name, "start": t1.isoformat(), "end": t2.isoformat(),
+                "count": len(satellites), "satellites": satellites}
+
+
+# --- 5. Rolling Index ---
+
+class AccessWindowCache:
+    """
+    Holds the current index and rebuilds it in a background thread once less than half of its
+    horizon remains, so lookups never wait for a catalog-wide scan (get() is None until the
+    first build finishes).
+    """
+
+    def __init__(self, satellites, hours=ACCESS_HORIZON_HOURS, step_seconds=ACCESS_STEP_SECONDS):
+        self.satellites = satellites; self.hours = hours; self.step_seconds = step_seconds
+        self._index = None; self._building = False; self._lock = threading.Lock()
+
+    def _build(self):
+        try:
+            start = datetime.now(UTC).replace(microsecond=0)
+            index = AccessWindowIndex(self.satellites, start, self.hours, self.step_seconds)
+            print(f"[+] INFO: FIR access-window index built: {index.window_count} windows over {self.hours:g} h.")
+            self._index = index
+        except Exception as e:
+            print(f"[-] ERROR: FIR access-window index build failed: {e}")
+        finally:
+            self._building = False
+
+    def get(self):
+        index = self._index
+        remaining = (index.t_end - datetime.now(UTC).timestamp()) if index is not None else 0.0
+        if remaining < self.hours * 3600.0 / 2.0:
+            with self._lock:
+                if not self._building:
+                    self._building = True
+                    threading.Thread(target=self._build, name="access-window-index", daemon=True).start()
+        return index if remaining > 0 else None
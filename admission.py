@@ -0,0 +1,85 @@
+# admission.py - Concurrency limit and backpressure (429 + Retry-After) around expensive analysis runs
+
+# 1. Imports and Setup
+from contextlib import contextmanager
+import math
+import os
+import threading
+import time
+
+from werkzeug.exceptions import TooManyRequests
+
+ANALYSIS_MAX_CONCURRENT = int(os.getenv("ANALYSIS_MAX_CONCURRENT", "0")) or max(1, (os.cpu_count() or 2) // 2)
+ANALYSIS_MAX_WAITING = int(os.getenv("ANALYSIS_MAX_WAITING", "8"))            # Requests allowed to queue
+ANALYSIS_WAIT_TIMEOUT_S = float(os.getenv("ANALYSIS_WAIT_TIMEOUT_S", "15"))    # Below common proxy timeouts
+_DURATION_SMOOTHING = 0.2       # EWMA weight of the latest run when estimating Retry-After
+
+
+# --- 2. Rejection ---
+
+class Overloaded(TooManyRequests):
+    """
+    Raised when no analysis slot is available. It is an HTTPException carrying webargs-style
+    data, so flask-smorest's error handler renders it as a JSON 429 with a Retry-After header.
+    """
+
+    def __init__(self, retry_after, message):
+        super().__init__(description=message)
+        self.retry_after = retry_after
+        self.data = {"message": message, "headers": {"Retry-After": str(retry_after)}}
+
+
+# --- 3. Admission Controller ---
+
+class AdmissionController:
+    """
+    Bounded semaphore with a bounded wait queue. Only code that actually computes (snapshot
+    refreshes, forecasts, screening) takes a slot; cached snapshot reads, the FIR and home routes
+    never do, so they stay fast while analyses are saturated.
+    """
+
+    def __init__(self, max_concurrent=ANALYSIS_MAX_CONCURRENT, max_waiting=ANALYSIS_MAX_WAITING,
+                 wait_timeout=ANALYSIS_WAIT_TIMEOUT_S):
+        self.max_concurrent = max_concurrent; self.max_waiting = max_waiting; self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.running = 0; self.waiting = 0; self.rejected = 0
+        self._avg_seconds = None
+
+    def retry_after(self):
+        """Seconds until a slot is likely free, from the average run time and the queue length."""
+        avg = self._avg_seconds or 5.0
+        return max(1, math.ceil(avg * (self.waiting + 1) / self.max_concurrent))
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejected += 1
+        raise Overloaded(self.retry_after(), f"Server busy: {reason}. Retry later.")
+
+    @contextmanager
+    def slot(self):
+        """Runs the block in an analysis slot, waiting in the queue if needed; raises Overloaded."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                queue_full = self.waiting >= self.max_waiting
+                if not queue_full: self.waiting += 1
+            if queue_full: self._reject("analysis queue is full")
+            try:
+                acquired = self._slots.acquire(timeout=self.wait_timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired: self._reject(f"no analysis slot freed within {self.wait_timeout:.0f} s")
+
+        with self._lock:
+            self.running += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.running -= 1
+                self._avg_seconds = elapsed if self._avg_seconds is None else (
+                    (1 - _DURATION_SMOOTHING) * self._avg_seconds + _DURATION_SMOOTHING * elapsed)
+            self._slots.release()
@@ -0,0 +1,200 @@
+# batch.py - Headless sharded batch analysis (run one shard per machine, then merge the partial results)
+
+# 1. Imports and Setup
+import argparse
+from datetime import datetime, timedelta, UTC
+import glob
+import json
+import os
+import numpy as np
+from sgp4.api import SatrecArray
+
+from propagation import catalog_tag, datetime_to_jd
+from debris_density import get_density_index
+from constellations import get_formation_groups
+from snapshot import event_id, TCA_BUCKET_SECONDS
+
+SHARD_MODES = ("time", "pairs", "cells")
+CELL_DEG = 10.0            # "cells" shards own pairs whose midpoint falls in their lat/lon cells
+
+
+# --- 2. Shard Assignment ---
+
+def campaign_epochs(start, end, step_minutes):
+    epochs = []; t = start
+    while t <= end:
+        epochs.append(t); t += timedelta(minutes=step_minutes)
+    return epochs
+
+def pair_range_mask(n, shard, shards):
+    """Shard `shard` owns the shard-th of `shards` equal ranges of the linear upper-triangle pair index (i < j) over n objects."""
+    total = n * (n - 1) // 2
+    def mask(pairs):
+        i, j = pairs[:, 0], pairs[:, 1]
+        linear = i * (2 * n - i - 1) // 2 + (j - i - 1)
+        return linear * shards // max(total, 1) == shard
+    return mask
+
+def cell_mask(r, shard, shards, cell_deg=CELL_DEG):
+    """Shard `shard` owns pairs whose position midpoint lies in a lat/lon cell assigned to it (cells dealt round-robin)."""
+    n_lon = int(round(360.0 / cell_deg))
+    def mask(pairs):
+        mid = (r[pairs[:, 0]] + r[pairs[:, 1]]) / 2.0
+        lat = np.degrees(np.arcsin(np.clip(mid[:, 2] / np.linalg.norm(mid, axis=1), -1.0, 1.0)))
+        lon = np.degrees(np.arctan2(mid[:, 1], mid[:, 0])) + 180.0
+        cell = np.floor((lat + 90.0) / cell_deg).astype(np.int64) * n_lon + np.floor(lon / cell_deg).astype(np.int64) % n_lon
+        return cell % shards == shard
+    return mask
+
+
+# --- 3. Running a Shard ---
+
+def shard_path(out_dir, shard, shards):
+    return os.path.join(out_dir, f"shard-{shard:04d}-of-{shards:04d}.jsonl")
+
+def run_shard(satellites, start, end, step_minutes, shard, shards, by, out_dir,
+              fir_filter=True, screening=None, formation_policy=None, top_k=None):
+    """
+    Runs this shard's share of the campaign and writes it to out_dir as JSON lines: a header
+    (campaign parameters and catalog tag) then one event per line. The file only appears once
+    the shard has finished, so merge never reads a partial shard. Returns the event count.
+    """
+    from risk_analyzer import run_full_risk_analysis, filter_satellites_by_fir
+
+    if by not in SHARD_MODES: raise ValueError(f"Unknown shard mode '{by}' (use one of {', '.join(SHARD_MODES)}).")
+    if not 0 <= shard < shards: raise ValueError("shard must be in [0, shards).")
+    epochs = campaign_epochs(start, end, step_minutes)
+    if by == "time": epochs = epochs[shard::shards]   # Round-robin keeps slow and fast epochs balanced
+
+    options = {}
+    if screening: options["screening"] = screening
+    if formation_policy: options["formation_policy"] = formation_policy
+    if top_k: options["top_k"] = top_k
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = shard_path(out_dir, shard, shards); partial = path + ".partial"
+    header = {"shard": shard, "shards": shards, "by": by, "start": start.isoformat(), "end": end.isoformat(),
+              "step_minutes": step_minutes, "fir_filter": fir_filter, "options": options,
+              "catalog_tag": catalog_tag(satellites), "epochs": len(epochs)}
+    density = get_density_index(satellites)   # From the whole catalog, not the FIR-filtered subset
+    formations = get_formation_groups(satellites)
+    count = 0
+    with open(partial, "w") as f:
+        f.write(json.dumps({"header": header}) + "\n")
+        for analysis_time in epochs:
+            relevant = filter_satellites_by_fir(satellites, analysis_time) if fir_filter else satellites
+            if len(relevant) < 2: continue
+            # One propagation per epoch, shared by the shard mask and the analysis itself
+            jd, fr = datetime_to_jd(analysis_time)
+            e, r, v = SatrecArray(list(relevant.values())).sgp4(np.array([jd]), np.array([fr]))
+            states = (r[:, 0, :], v[:, 0, :], e[:, 0] == 0)
+            pair_mask = None
+            if by == "pairs": pair_mask = pair_range_mask(len(relevant), shard, shards)
+            elif by == "cells": pair_mask = cell_mask(states[0], shard, shards)
+            events = run_full_risk_analysis(relevant, analysis_time=analysis_time, states=states,
+                                            pair_mask=pair_mask, density=density, formations=formations, **options)
+            for event in events:
+                f.write(json.dumps(dict(event, analysis_time=analysis_time.isoformat()), default=str) + "\n")
+            count += len(events)
+    os.replace(partial, path)
+    print(f"[+] INFO: Shard {shard}/{shards} ({by}) wrote {count} event(s) over {len(epochs)} epoch(s) to {path}.")
+    return count
+
+
+# --- 4. Merging ---
+
+def read_shard(path):
+    with open(path) as f:
+        header = json.loads(f.readline())["header"]
+        return header, [json.loads(line) for line in f if line.strip()]
+
+def merge_shards(out_dir, allow_partial=False):
+    """
+    Combines every finished shard in out_dir into one ranked event list. Shards must come from
+    the same campaign and catalog. Events are deduplicated by event_id (NORAD pair and the
+    TCA or analysis-time bucket), keeping the highest-risk sample of each encounter.
+    Returns (events, summary).
+    """
+    paths = sorted(glob.glob(os.path.join(out_dir, "shard-*-of-*.jsonl")))
+    if not paths: raise ValueError(f"No finished shard files in {out_dir}.")
+    campaign = None; seen = set(); best = {}; read = 0
+    for path in paths:
+        header, events = read_shard(path)
+        key = {k: header[k] for k in ("shards", "by", "start", "end", "step_minutes", "fir_filter", "options", "catalog_tag")}
+        if campaign is None: campaign = key
+        elif key != campaign: raise ValueError(f"{os.path.basename(path)} belongs to a different campaign or catalog.")
+        seen.add(header["shard"]); read += len(events)
+        for event in events:
+            eid = event_id(event, datetime.fromisoformat(event["analysis_time"]), TCA_BUCKET_SECONDS)
+            if eid not in best or event["risk_score"] > best[eid]["risk_score"]:
+                best[eid] = dict(event, event_id=eid)
+    missing = sorted(set(range(campaign["shards"])) - seen)
+    if missing and not allow_partial:
+        raise ValueError(f"Missing shard(s) {missing} of {campaign['shards']}; pass --allow-partial to merge anyway.")
+    ranked = sorted(best.values(), key=lambda e: e["risk_score"], reverse=True)
+    summary = dict(campaign, shards_merged=len(seen), missing_shards=missing, events_read=read, unique_events=len(ranked))
+    return ranked, summary
+
+def write_merged(events, summary, path, fmt="jsonl"):
+    if fmt == "jsonl":
+        with open(path, "w") as f:
+            f.write(json.dumps({"summary": summary}) + "\n")
+            for event in events: f.write(json.dumps(event, default=str) + "\n")
+    else:
+        from export import export_events
+        export_events(events, path, fmt)
+
+
+# --- 5. Command Line ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded batch LEO conjunction analysis over a shared filesystem.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run one shard of a campaign.")
+    run.add_argument("--shard", type=int, required=True, help="This shard's index, 0 .. shards-1.")
+    run.add_argument("--shards", type=int, required=True, help="Total number of shards.")
+    run.add_argument("--by", choices=SHARD_MODES, default="time",
+                     help="Split by time slices, pair-index ranges or spatial cells.")
+    run.add_argument("--start", required=True, help="ISO 8601 campaign start (UTC).")
+    run.add_argument("--hours", type=float, default=24.0, help="Campaign length.")
+    run.add_argument("--step-minutes", type=float, default=60.0, help="Minutes between analysis epochs.")
+    run.add_argument("--out-dir", required=True, help="Shared directory for shard files.")
+    run.add_argument("--tle", default="spacetrack_leo_3le.txt", help="TLE file (identical on every node).")
+    run.add_argument("--no-fir-filter", action="store_true", help="Screen the whole catalog, not only objects over the FIRs.")
+    run.add_argument("--screening", choices=["all", "ric", "verlet"])
+    run.add_argument("--formation-policy", choices=["include", "exclude", "sample"])
+    run.add_argument("--top-k", type=int, help="Keep only the K riskiest events per epoch and shard.")
+    run.add_argument("--force", action="store_true", help="Re-run even if this shard's file already exists.")
+
+    merge = commands.add_parser("merge", help="Merge finished shards into one ranked event list.")
+    merge.add_argument("--out-dir", required=True, help="Directory holding the shard files.")
+    merge.add_argument("--out", required=True, help="Merged output file.")
+    merge.add_argument("--format", choices=["jsonl", "parquet", "arrow"], default="jsonl")
+    merge.add_argument("--allow-partial", action="store_true", help="Merge even if some shards are missing.")
+    merge.add_argument("--show", type=int, default=10, help="Print this many top events.")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        from risk_analyzer import load_tle_data
+        if os.path.exists(shard_path(args.out_dir, args.shard, args.shards)) and not args.force:
+            print("[i] INFO: Shard already finished; pass --force to re-run it.")
+        else:
+            satellites = load_tle_data(args.tle)
+            if not satellites: raise SystemExit("TLE data not loaded.")
+            start = datetime.fromisoformat(args.start.replace("Z", "+00:00"))
+            if start.tzinfo is None: start = start.replace(tzinfo=UTC)
+            run_shard(satellites, start, start + timedelta(hours=args.hours), args.step_minutes, args.shard, args.shards,
+                      args.by, args.out_dir, fir_filter=not args.no_fir_filter, screening=args.screening,
+                      formation_policy=args.formation_policy, top_k=args.top_k)
+    else:
+        try:
+            events, summary = merge_shards(args.out_dir, args.allow_partial)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        write_merged(events, summary, args.out, args.format)
+        print(f"[+] INFO: Merged {summary['shards_merged']}/{summary['shards']} shard(s): {summary['events_read']} "
+              f"event(s) read, {summary['unique_events']} unique, written to {args.out}.")
+        for event in events[:args.show]:
+            print(f"{event['risk_category']:<9} {event['risk_score']:.3f}  {event['satellite1']} x {event['satellite2']}  "
+                  f"{event['distance_km']:.2f} km  {event['analysis_time']}  ({event['fir']})")
@@ -0,0 +1,123 @@
+# collision_probability.py - Vectorized 2D probability of collision (Pc) for batches of encounters
+
+# 1. Imports and Setup
+import numpy as np
+
+from frames import ric_basis
+
+# Hard-body radius (km) per object class. Combined HBR of an encounter is the sum of both objects.
+HARD_BODY_RADIUS_KM = {
+    'DEBRIS': 0.0005,      # Fragments: ~1 m across
+    'ROCKET_BODY': 0.003,  # Upper stages
+    'STARLINK': 0.005,     # Flat-panel bus plus solar array
+    'PAYLOAD': 0.002,      # Generic active payload
+}
+
+# Default TLE-derived 1-sigma position uncertainty (km) in the object's RIC frame:
+# sigma = sigma_at_epoch + growth_per_day * |TLE age|. In-track error dominates and grows fastest.
+TLE_SIGMA_AT_EPOCH_KM = np.array([0.1, 0.5, 0.15])
+TLE_SIGMA_GROWTH_KM_PER_DAY = np.array([0.05, 1.0, 0.05])
+
+# Polar Gauss-Legendre quadrature over the hard-body disk (Foster-style numerical integration)
+_N_RADIAL = 12; _N_ANGULAR = 24
+_GL_X, _GL_W = np.polynomial.legendre.leggauss(_N_RADIAL)
+_RHO_UNIT = 0.5 * (_GL_X + 1.0)          # Radial nodes on [0, 1]
+_RHO_WEIGHTS = 0.5 * _GL_W
+_THETA = np.linspace(0.0, 2.0 * np.pi, _N_ANGULAR, endpoint=False)
+_COS_T, _SIN_T = np.cos(_THETA), np.sin(_THETA)
+
+
+# --- 2. Object Class Helpers ---
+
+def classify_object(satellite_name):
+    """Maps a catalog name to one of the HARD_BODY_RADIUS_KM object classes."""
+    name = satellite_name.upper()
+    if name.startswith('0 '): name = name[2:]
+    if ' DEB' in name: return 'DEBRIS'
+    if ' R/B' in name: return 'ROCKET_BODY'
+    if name.startswith('STARLINK'): return 'STARLINK'
+    return 'PAYLOAD'
+
+def hard_body_radius_km(satellite_name):
+    return HARD_BODY_RADIUS_KM[classify_object(satellite_name)]
+
+def tle_age_days(sat, jd, fr):
+    """Days between the TLE epoch of sat and the Julian date (jd, fr)."""
+    return (jd - sat.jdsatepoch) + (fr - sat.jdsatepochF)
+
+
+# --- 3. Covariance Model ---
+
+def default_covariance(r, v, age_days):
+    """
+    TLE-derived 3x3 position covariance (km^2) in TEME for a batch of states.
+    The diagonal RIC sigmas grow linearly with |age_days| and are rotated into the inertial frame.
+    """
+    age = np.abs(np.asarray(age_days, dtype=float))[..., np.newaxis]
+    sigma = TLE_SIGMA_AT_EPOCH_KM + TLE_SIGMA_GROWTH_KM_PER_DAY * age
+    basis = ric_basis(r, v)
+    # C = B^T diag(sigma^2) B
+    return np.einsum('...ki,...k,...kj->...ij', basis, sigma**2, basis)
+
+
+# --- 4. Probability of Collision ---
+
+def compute_pc_batch(r1, v1, r2, v2, age1_days, age2_days, hbr_km):
+    """
+    2D probability of collision for N encounters in one NumPy pass.
+    All state arrays are (N, 3) TEME km / km/s at TCA, ages are (N,) days since TLE epoch and
+    hbr_km is the (N,) combined hard-body radius. The combined covariance is projected onto the
+    encounter plane (normal to the relative velocity) and the Gaussian density is integrated over
+    the hard-body disk with polar Gauss-Legendre quadrature. Returns Pc as an (N,) array.
+    """
+    r1 = np.atleast_2d(r1); v1 = np.atleast_2d(v1); r2 = np.atleast_2d(r2); v2 = np.atleast_2d(v2)
+    hbr = np.broadcast_to(np.asarray(hbr_km, dtype=float), (r1.shape[0],))
+
+    cov = default_covariance(r1, v1, age1_days) + default_covariance(r2, v2, age2_days)
+
+    # Encounter-plane axes: z along relative velocity, x along the miss vector, y completes the frame
+    dr = r2 - r1; dv = v2 - v1
+    dv_norm = np.linalg.norm(dv, axis=1, keepdims=True)
+    # Formation-flying pairs (no relative velocity) fall back to the primary's velocity direction
+    z = np.where(dv_norm > 1e-9, dv, v1)
+    z = z / np.linalg.norm(z, axis=1, keepdims=True)
+    miss = dr - np.sum(dr * z, axis=1, keepdims=True) * z
+    miss_km = np.linalg.norm(miss, axis=1)
+    # Fall back to any axis normal to z when the miss vector vanishes
+    fallback = np.cross(z, np.where(np.abs(z[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]]))
+    x = np.where(miss_km[:, np.newaxis] > 1e-12, miss / np.maximum(miss_km[:, np.newaxis], 1e-12), fallback)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    y = np.cross(z, x)
+
+    plane = np.stack([x, y], axis=1)                                  # (N, 2, 3)
+    cov2 = np.einsum('nai,nij,nbj->nab', plane, cov, plane)           # (N, 2, 2)
+    det = cov2[:, 0, 0] * cov2[:, 1, 1] - cov2[:, 0, 1] ** 2
+    det = np.maximum(det, 1e-30)
+    inv_xx = cov2[:, 1, 1] / det; inv_yy = cov2[:, 0, 0] / det; inv_xy = -cov2[:, 0, 1] / det
+
+    # Quadrature nodes on the disk centred on the miss point (miss_km, 0)
+    rho = hbr[:, np.newaxis, np.newaxis] * _RHO_UNIT[np.newaxis, :, np.newaxis]   # (N, R, 1)
+    px = miss_km[:, np.newaxis, np.newaxis] + rho * _COS_T
+    py = rho * _SIN_T
+    q = (inv_xx[:, None, None] * px**2 + 2.0 * inv_xy[:, None, None] * px * py
+         + inv_yy[:, None, None] * py**2)
+    density = np.exp(-0.5 * q) / (2.0 * np.pi * np.sqrt(det))[:, None, None]
+
+    # dA = rho d(rho) d(theta)
+    integrand = density * rho * (_RHO_WEIGHTS[np.newaxis, :, np.newaxis] * hbr[:, None, None])
+    pc = integrand.sum(axis=(1, 2)) * (2.0 * np.pi / _N_ANGULAR)
+    return np.clip(pc, 0.0, 1.0)
+
+def collision_probabilities(pairs):
+    """
+    Convenience wrapper for a list of encounter tuples
+    (name1, sat1, r1, v1, name2, sat2, r2, v2, jd, fr), each evaluated at its own TCA (jd, fr).
+    Returns a list of Python floats in the same order.
+    """
+    if not pairs: return []
+    r1 = np.array([p[2] for p in pairs]); v1 = np.array([p[3] for p in pairs])
+    r2 = np.array([p[6] for p in pairs]); v2 = np.array([p[7] for p in pairs])
+    age1 = np.array([tle_age_days(p[1], p[8], p[9]) for p in pairs])
+    age2 = np.array([tle_age_days(p[5], p[8], p[9]) for p in pairs])
+    hbr = np.array([hard_body_radius_km(p[0]) + hard_body_radius_km(p[4]) for p in pairs])
+    return compute_pc_batch(r1, v1, r2, v2, age1, age2, hbr).tolist()
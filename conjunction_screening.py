@@ -0,0 +1,178 @@
+# conjunction_screening.py - One-versus-catalog conjunction screening for a single primary
+
+# 1. Imports and Setup
+from datetime import datetime, timedelta, UTC
+import numpy as np
+
+from marshmallow import Schema, fields, validate
+
+from propagation import get_vector_catalog, time_grid
+from collision_probability import collision_probabilities
+from frames import teme_to_geodetic
+from risk_analyzer import find_fir_by_location, get_satellite_country
+
+# Screening Parameters
+DEFAULT_WINDOW_HOURS = 6.0     # Default look-ahead when no end time is given
+MAX_WINDOW_HOURS = 72.0        # Longest window accepted by the API (bounds request cost)
+DEFAULT_STEP_SECONDS = 300.0   # Coarse sampling step of the time grid
+SCREENING_RADIUS_KM = 50.0     # Encounters with a larger miss distance are not reported
+SHELL_MARGIN_KM = 25.0         # Extra radial margin for the apogee/perigee pre-filter
+MAX_REL_ACCEL_KM_S2 = 0.02     # Bound on relative acceleration; sizes the linearization slack
+TIME_CHUNK = 64                # Grid samples propagated per SatrecArray call (bounds memory)
+REFINE_ITERATIONS = 4          # Newton iterations on exact SGP4 states around each TCA
+
+
+# --- 2. Marshmallow Schemas ---
+
+class ConjunctionWindowQuerySchema(Schema):
+    """Query parameters for the one-versus-catalog screening endpoint."""
+    start = fields.AwareDateTime(
+        load_default=None, default_timezone=UTC,
+        metadata={"description": "Window start (ISO 8601). Defaults to the current UTC time."}
+    )
+    end = fields.AwareDateTime(
+        load_default=None, default_timezone=UTC,
+        metadata={"description": f"Window end (ISO 8601). Defaults to start + {DEFAULT_WINDOW_HOURS:g} h."}
+    )
+    step_seconds = fields.Float(
+        load_default=DEFAULT_STEP_SECONDS, validate=validate.Range(min=10.0, max=900.0),
+        metadata={"description": "Coarse sampling step in seconds."}
+    )
+    max_distance_km = fields.Float(
+        load_default=SCREENING_RADIUS_KM, validate=validate.Range(min=0.0, max=1000.0),
+        metadata={"description": "Only encounters closer than this miss distance are returned."}
+    )
+    limit = fields.Int(
+        load_default=50, validate=validate.Range(min=1, max=1000),
+        metadata={"description": "Maximum number of ranked encounters to return."}
+    )
+
+class EncounterSchema(Schema):
+    """Closest approach between the primary and one secondary object."""
+    norad_id = fields.Int(required=True, metadata={"description": "NORAD ID of the secondary object."})
+    satellite = fields.Str(required=True, metadata={"description": "Name of the secondary object."})
+    tca = fields.Str(required=True, metadata={"description": "Time of closest approach (UTC, ISO 8601)."})
+    miss_distance_km = fields.Float(required=True, metadata={"description": "Miss distance at TCA in km."})
+    relative_velocity_km_s = fields.Float(required=True, metadata={"description": "Relative speed at TCA in km/s."})
+    lat = fields.Float(required=True); lon = fields.Float(required=True)
+    fir = fields.Str(required=True)
+    country_of_origin = fields.Str(required=True)
+    collision_probability = fields.Float(required=True, metadata={"description": "2D probability of collision (Pc)."})
+
+class PrimaryConjunctionsResponseSchema(Schema):
+    """Defines the structure of the /api/satellites/<norad_id>/conjunctions response."""
+    norad_id = fields.Int(required=True); satellite = fields.Str(required=True)
+    start = fields.Str(required=True); end = fields.Str(required=True)
+    candidates_screened = fields.Int(required=True, metadata={"description": "Objects surviving the radial pre-filter."})
+    encounters = fields.List(fields.Nested(EncounterSchema), required=True)
+
+
+# --- 3. Screening Helpers ---
+
+def _shell_overlap(catalog, primary_index, margin_km):
+    """Apogee/perigee filter: keep objects whose radial shell can intersect the primary's."""
+    lo = catalog.perigee_km[primary_index] - margin_km
+    hi = catalog.apogee_km[primary_index] + margin_km
+    mask = (catalog.apogee_km >= lo) & (catalog.perigee_km <= hi)
+    mask[primary_index] = False
+    return np.nonzero(mask)[0]
+
+def _refine_tca(primary, secondary, jd, fr, step_days):
+    """
+    Newton iterations on the relative state of one pair, starting from a coarse grid sample.
+    Returns (fr, miss_km, rel_speed_km_s, (r1, v1, r2, v2)) at TCA, or None if SGP4 fails.
+    """
+    fr0 = fr
+    for _ in range(REFINE_ITERATIONS):
+        e1, r1, v1 = primary.sgp4(jd, fr); e2, r2, v2 = secondary.sgp4(jd, fr)
+        if e1 != 0 or e2 != 0: return None
+        dr = np.subtract(r2, r1); dv = np.subtract(v2, v1)
+        dv2 = float(dv @ dv)
+        if dv2 == 0.0: break
+        dt_s = -float(dr @ dv) / dv2
+        # Stay within one coarse step of the sampled minimum
+        fr = float(np.clip(fr + dt_s / 86400.0, fr0 - step_days, fr0 + step_days))
+    e1, r1, v1 = primary.sgp4(jd, fr); e2, r2, v2 = secondary.sgp4(jd, fr)
+    if e1 != 0 or e2 != 0: return None
+    dr = np.subtract(r2, r1); dv = np.subtract(v2, v1)
+    return fr, float(np.linalg.norm(dr)), float(np.linalg.norm(dv)), (r1, v1, r2, v2)
+
+
+# --- 4. Main Screening Function ---
+
+def screen_primary(satellites, norad_id, start=None, end=None, step_seconds=DEFAULT_STEP_SECONDS,
+                   max_distance_km=SCREENING_RADIUS_KM, limit=50):
+    """
+    Screens one primary object against the rest of the catalog over [start, end].
+    The catalog is propagated on a coarse grid in time chunks with one SatrecArray call each,
+    keeping a running minimum of the linearized closest approach per object (O(N) per sample).
+    The best sample of every close object is then refined to the true TCA with a few exact
+    SGP4 evaluations.
+    Returns a dict matching PrimaryConjunctionsResponseSchema, or None if norad_id is unknown.
+    """
+    if start is None: start = datetime.now(UTC)
+    if end is None: end = start + timedelta(hours=DEFAULT_WINDOW_HOURS)
+
+    catalog = get_vector_catalog(satellites)
+    primary_index = catalog.index_by_norad.get(int(norad_id))
+    if primary_index is None: return None
+    primary = catalog.satrecs[primary_index]
+
+    candidates = _shell_overlap(catalog, primary_index, max_distance_km + SHELL_MARGIN_KM)
+    times, jd, fr = time_grid(start, end, step_seconds)
+
+    # Between samples the relative motion is close to linear, so each sample predicts its own
+    # closest approach within +/- half a step; curvature is covered by the slack term below.
+    half_step = step_seconds / 2.0
+    best_dist = np.full(len(candidates), np.inf)
+    best_sample = np.zeros(len(candidates), dtype=np.int64)
+
+    if len(candidates) > 0:
+        for t0 in range(0, len(times), TIME_CHUNK):
+            jd_c, fr_c = jd[t0:t0 + TIME_CHUNK], fr[t0:t0 + TIME_CHUNK]
+            e_p, r_p, v_p = primary.sgp4_array(jd_c, fr_c)
+            r, v, ok = catalog.propagate(jd_c, fr_c, indices=candidates)
+            dr = r - r_p[np.newaxis, :, :]; dv = v - v_p[np.newaxis, :, :]
+            dv2 = np.einsum('ntk,ntk->nt', dv, dv)
+            tau = np.clip(-np.einsum('ntk,ntk->nt', dr, dv) / np.maximum(dv2, 1e-12), -half_step, half_step)
+            dist = np.linalg.norm(dr + dv * tau[:, :, np.newaxis], axis=2)
+            dist[~ok] = np.inf
+            dist[:, e_p != 0] = np.inf
+            chunk_best = np.argmin(dist, axis=1)
+            chunk_dist = dist[np.arange(len(candidates)), chunk_best]
+            improved = chunk_dist < best_dist
+            best_dist[improved] = chunk_dist[improved]
+            best_sample[improved] = chunk_best[improved] + t0
+
+    coarse_cut = max_distance_km + 0.5 * MAX_REL_ACCEL_KM_S2 * half_step**2
+    step_days = step_seconds / 86400.0
+    encounters = []; pc_inputs = []
+    for k in np.nonzero(best_dist < coarse_cut)[0]:
+        idx = int(candidates[k]); sample = int(best_sample[k])
+        refined = _refine_tca(primary, catalog.satrecs[idx], float(jd[sample]), float(fr[sample]), step_days)
+        if refined is None: continue
+        fr_tca, miss_km, rel_speed, tca_state = refined
+        if miss_km > max_distance_km: continue
+        tca = times[sample] + timedelta(days=fr_tca - float(fr[sample]))
+        lat, lon, _ = teme_to_geodetic(tca_state[0], float(jd[sample]), fr_tca)
+        lat, lon = float(lat), float(lon)
+        name = catalog.names[idx]
+        encounters.append({
+            "norad_id": int(catalog.norad_ids[idx]), "satellite": name,
+            "tca": tca.isoformat(), "miss_distance_km": miss_km, "relative_velocity_km_s": rel_speed,
+            "lat": lat, "lon": lon, "fir": find_fir_by_location(lat, lon),
+            "country_of_origin": get_satellite_country(name)
+        })
+        pc_inputs.append((catalog.names[primary_index], primary, tca_state[0], tca_state[1],
+                          name, catalog.satrecs[idx], tca_state[2], tca_state[3], float(jd[sample]), fr_tca))
+
+    for encounter, pc in zip(encounters, collision_probabilities(pc_inputs)):
+        encounter["collision_probability"] = pc
+
+    encounters.sort(key=lambda x: x["miss_distance_km"])
+    return {
+        "norad_id": int(norad_id), "satellite": catalog.names[primary_index],
+        "start": start.isoformat(), "end": end.isoformat(),
+        "candidates_screened": int(len(candidates)),
+        "encounters": encounters[:limit]
+    }
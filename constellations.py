@@ -0,0 +1,126 @@
+# constellations.py - Constellation / shell / plane grouping and the intra-formation pair policy
+
+# 1. Imports and Setup
+import os
+import threading
+import numpy as np
+
+from propagation import get_vector_catalog
+
+# Operators flying controlled formations (the SATELLITE_OWNERS prefixes plus newer LEO constellations)
+CONSTELLATION_PREFIXES = (
+    "STARLINK", "ONEWEB", "KUIPER", "QIANFAN", "HULIANWANG", "IRIDIUM", "GLOBALSTAR", "ORBCOMM", "BEIDOU", "QZS"
+)
+
+# "include" screens every pair, "exclude" skips pairs inside one formation (same constellation,
+# shell and plane), "sample" keeps one in FORMATION_SAMPLE_EVERY of them.
+FORMATION_POLICY = os.getenv("FORMATION_POLICY", "include")
+FORMATION_SAMPLE_EVERY = int(os.getenv("FORMATION_SAMPLE_EVERY", "10"))
+
+SHELL_ALT_BIN_KM = 10.0       # Same shell: mean altitude and inclination within one bin
+SHELL_INC_BIN_DEG = 0.5
+PLANE_RAAN_BIN_DEG = 2.0      # Same plane: RAAN (at a common epoch) within one bin
+
+_MU_KM3_S2 = 398600.4418
+_J2 = 1.08262668e-3
+
+_GROUPS_CACHE = {}; _GROUPS_LOCK = threading.Lock()
+
+
+# --- 2. Classification ---
+
+def constellation_of(name):
+    """Constellation prefix of a catalog name (3LE line-0 names start with '0 '), or None."""
+    upper = name.upper()
+    if upper.startswith("0 "): upper = upper[2:]
+    for prefix in CONSTELLATION_PREFIXES:
+        if upper.startswith(prefix): return prefix
+    return None
+
+def formation_groups(names, satrecs):
+    """
+    Classifies objects by (constellation, shell, plane). Shells bin mean altitude and inclination;
+    planes bin the RAAN propagated with J2 nodal regression to the newest TLE epoch, so members
+    of one plane line up even when their element sets were issued days apart.
+    Returns (group_ids, labels): an int array with -1 for objects outside any constellation and
+    the (constellation, shell_alt_km, shell_inc_deg, plane_raan_deg) label of every group id.
+    """
+    n = len(satrecs)
+    group_ids = np.full(n, -1, dtype=np.int64); labels = []
+    if n == 0: return group_ids, labels
+    members = [(k, c) for k, c in enumerate(constellation_of(name) for name in names) if c is not None]
+    if not members: return group_ids, labels
+
+    idx = np.array([k for k, _ in members])
+    sats = [satrecs[k] for k in idx]
+    radius = sats[0].radiusearthkm
+    n_rad_s = np.array([s.no_kozai for s in sats]) / 60.0
+    ecc = np.array([s.ecco for s in sats]); inc = np.array([s.inclo for s in sats])
+    raan = np.array([s.nodeo for s in sats])
+    epoch = np.array([s.jdsatepoch + s.jdsatepochF for s in sats])
+
+    a = (_MU_KM3_S2 / n_rad_s**2) ** (1.0 / 3.0)
+    p = a * (1.0 - ecc**2)
+    node_rate = -1.5 * n_rad_s * _J2 * (radius / p) ** 2 * np.cos(inc)        # rad/s
+    raan_ref = np.mod(raan + node_rate * (epoch.max() - epoch) * 86400.0, 2.0 * np.pi)
+
+    alt_bin = np.round((a - radius) / SHELL_ALT_BIN_KM).astype(int)
+    inc_bin = np.round(np.degrees(inc) / SHELL_INC_BIN_DEG).astype(int)
+    plane_bin = np.floor(np.degrees(raan_ref) / PLANE_RAAN_BIN_DEG).astype(int)
+
+    lookup = {}
+    for pos, (k, constellation) in enumerate(members):
+        key = (constellation, int(alt_bin[pos]), int(inc_bin[pos]), int(plane_bin[pos]))
+        gid = lookup.get(key)
+        if gid is None:
+            gid = lookup[key] = len(labels)
+            labels.append((constellation, key[1] * SHELL_ALT_BIN_KM, key[2] * SHELL_INC_BIN_DEG,
+                           key[3] * PLANE_RAAN_BIN_DEG))
+        group_ids[k] = gid
+    return group_ids, labels
+
+def get_formation_groups(satellites):
+    """
+    formation_groups of a whole {name: Satrec} catalog, classified once per catalog version.
+    Returns (group_ids, labels, row_by_name); pass it to run_full_risk_analysis as formations
+    and each run reads its subset's group ids instead of reclassifying.
+    """
+    catalog = get_vector_catalog(satellites)
+    with _GROUPS_LOCK:
+        groups = _GROUPS_CACHE.get(catalog.version)
+        if groups is None:
+            group_ids, labels = formation_groups(catalog.names, catalog.satrecs)
+            groups = (group_ids, labels, {name: i for i, name in enumerate(catalog.names)})
+            _GROUPS_CACHE.clear(); _GROUPS_CACHE[catalog.version] = groups
+        return groups
+
+
+# --- 3. Pair Policy ---
+
+def formation_pair_mask(pairs, group_ids, norad_ids, policy=FORMATION_POLICY, sample_every=FORMATION_SAMPLE_EVERY):
+    """
+    For an (M, 2) array of pair indices, returns (keep, intra): keep masks the pairs to screen
+    under the policy; intra marks pairs flying in one formation. Down-sampling is deterministic
+    in the NORAD pair, so the same pairs are sampled at every epoch.
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    ga, gb = group_ids[pairs[:, 0]], group_ids[pairs[:, 1]]
+    intra = (ga >= 0) & (ga == gb)
+    if policy == "exclude":
+        keep = ~intra
+    elif policy == "sample":
+        na, nb = norad_ids[pairs[:, 0]], norad_ids[pairs[:, 1]]
+        sampled = (np.minimum(na, nb) * 1_000_003 + np.maximum(na, nb)) % max(1, sample_every) == 0
+        keep = ~intra | sampled
+    else:
+        keep = np.ones(len(pairs), dtype=bool)
+    return keep, intra
+
+def skipped_summary(pairs, keep, group_ids, labels):
+    """Counts of skipped pairs per constellation, for logs and analysis reports."""
+    gids, counts = np.unique(group_ids[np.asarray(pairs).reshape(-1, 2)[~keep, 0]], return_counts=True)
+    summary = {}
+    for gid, count in zip(gids.tolist(), counts.tolist()):
+        constellation = labels[gid][0]
+        summary[constellation] = summary.get(constellation, 0) + count
+    return summary
@@ -0,0 +1,105 @@
+# debris_density.py - Catalog-derived debris/environment index (DSE) as an O(1) altitude x latitude lookup
+
+# 1. Imports and Setup
+import math
+import threading
+import numpy as np
+
+from propagation import get_vector_catalog
+
+ALT_MIN_KM = 100.0
+ALT_MAX_KM = 2100.0
+ALT_STEP_KM = 50.0
+LAT_STEP_DEG = 5.0             # Bands of |latitude|; both hemispheres share a band
+NEUTRAL_DSE = 1.0              # Index where the environment neither adds nor removes risk (SME value)
+R_EARTH_KM = 6378.135
+
+_INDEX_CACHE = {}; _INDEX_LOCK = threading.Lock()
+
+
+# --- 2. Density Field ---
+
+def latitude_fractions(inclination_rad, lat_edges_deg):
+    """
+    Share of each orbit's time spent in every |latitude| band (rows sum to 1). A circular orbit
+    of inclination i spends a fraction (2/pi) asin(sin(phi) / sin(i)) of its time below |lat| phi.
+    """
+    sin_i = np.abs(np.sin(np.asarray(inclination_rad, dtype=float)))[:, None]
+    sin_phi = np.sin(np.radians(lat_edges_deg))[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(sin_i > 1e-9, sin_phi / sin_i, np.where(sin_phi > 0, 1.0, 0.0))
+    cdf = (2.0 / np.pi) * np.arcsin(np.clip(ratio, 0.0, 1.0))
+    return np.diff(cdf, axis=1)
+
+class DebrisDensityIndex:
+    """
+    Time-averaged spatial object density of a catalog on an altitude x |latitude| grid, built in
+    one vectorized pass and mapped to the DSE scale: NEUTRAL_DSE where a cell is no denser than
+    the grid average, rising by one for every doubling above it. Lookups are two divisions and
+    an array read.
+    """
+
+    def __init__(self, perigee_km, apogee_km, inclination_rad):
+        self.alt_edges = np.arange(ALT_MIN_KM, ALT_MAX_KM + ALT_STEP_KM / 2, ALT_STEP_KM)
+        self.lat_edges = np.arange(0.0, 90.0 + LAT_STEP_DEG / 2, LAT_STEP_DEG)
+        n_alt = len(self.alt_edges) - 1; n_lat = len(self.lat_edges) - 1
+
+        alt = (np.asarray(perigee_km, dtype=float) + np.asarray(apogee_km, dtype=float)) / 2.0
+        row = np.floor((alt - ALT_MIN_KM) / ALT_STEP_KM).astype(np.int64)
+        inside = (row >= 0) & (row < n_alt)
+        counts = np.zeros((n_alt, n_lat))
+        np.add.at(counts, row[inside], latitude_fractions(np.asarray(inclination_rad)[inside], self.lat_edges))
+
+        # Cell volume: spherical shell slice between the two radii and |latitude| band (both hemispheres)
+        r = R_EARTH_KM + self.alt_edges
+        shell = (4.0 / 3.0) * np.pi * np.diff(r ** 3)
+        band = np.diff(np.sin(np.radians(self.lat_edges)))
+        volume = shell[:, None] * band[None, :]
+        self.density = counts / volume                               # Objects per km^3
+        self.reference = counts.sum() / volume.sum() if counts.sum() else 0.0
+        with np.errstate(divide="ignore"):
+            ratio = self.density / self.reference if self.reference else np.zeros_like(self.density)
+            self.dse = NEUTRAL_DSE + np.log2(np.maximum(ratio, 1.0))
+        self.objects = int(inside.sum())
+
+    @classmethod
+    def from_satrecs(cls, satrecs):
+        radius = np.array([sat.radiusearthkm for sat in satrecs])
+        return cls(np.array([sat.altp for sat in satrecs]) * radius, np.array([sat.alta for sat in satrecs]) * radius,
+                   np.array([sat.inclo for sat in satrecs]))
+
+    def lookup(self, alt_km, lat_deg):
+        """DSE of the cell containing (alt_km, lat_deg); NEUTRAL_DSE outside the grid."""
+        row = (alt_km - ALT_MIN_KM) / ALT_STEP_KM
+        if not 0.0 <= row < self.dse.shape[0]: return NEUTRAL_DSE       # Also rejects NaN
+        col = min(int(abs(lat_deg) / LAT_STEP_DEG), self.dse.shape[1] - 1)
+        return float(self.dse[int(row), col])
+
+    def lookup_many(self, alt_km, lat_deg):
+        """Vectorized lookup for arrays of altitudes and latitudes."""
+        row = np.floor((np.asarray(alt_km, dtype=float) - ALT_MIN_KM) / ALT_STEP_KM)
+        inside = (row >= 0) & (row < self.dse.shape[0])
+        col = np.minimum(np.abs(np.nan_to_num(np.asarray(lat_deg, dtype=float))) // LAT_STEP_DEG, self.dse.shape[1] - 1)
+        out = np.full(row.shape, NEUTRAL_DSE)
+        out[inside] = self.dse[row[inside].astype(np.int64), col[inside].astype(np.int64)]
+        return out
+
+
+# --- 3. Risk Weight and Catalog Cache ---
+
+def dse_weight(dse):
+    """Environment term of the risk score, exp(-max(0, DSE - 2) / 3) as in the SME formula."""
+    return math.exp(-max(0.0, dse - 2.0) / 3.0)
+
+def get_density_index(satellites):
+    """DebrisDensityIndex of a {name: Satrec} catalog, built once per catalog version."""
+    catalog = get_vector_catalog(satellites)
+    with _INDEX_LOCK:
+        index = _INDEX_CACHE.get(catalog.version)
+        if index is None:
+            inclination = np.array([sat.inclo for sat in catalog.satrecs])
+            index = DebrisDensityIndex(catalog.perigee_km, catalog.apogee_km, inclination)
+            _INDEX_CACHE.clear(); _INDEX_CACHE[catalog.version] = index
+            print(f"[+] INFO: Debris density index built from {index.objects} objects "
+                  f"(peak DSE {index.dse.max():.2f}).")
+        return index
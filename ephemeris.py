@@ -0,0 +1,213 @@
+# ephemeris.py - Rolling precomputed ephemeris grid (memory-mapped, shared by worker processes)
+
+# 1. Imports and Setup
+from datetime import datetime, UTC
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+from sgp4.api import SatrecArray
+
+from propagation import VectorCatalog, catalog_tag, datetime_to_jd
+
+EPHEMERIS_DIR = os.getenv("EPHEMERIS_DIR", os.path.join(tempfile.gettempdir(), "leo-ephemeris"))
+EPHEMERIS_HORIZON_HOURS = float(os.getenv("EPHEMERIS_HORIZON_HOURS", "6"))
+EPHEMERIS_STEP_SECONDS = float(os.getenv("EPHEMERIS_STEP_SECONDS", "60"))
+# Stated interpolation error bound: objects whose measured error exceeds it are propagated exactly
+EPHEMERIS_MAX_ERROR_KM = float(os.getenv("EPHEMERIS_MAX_ERROR_KM", "0.01"))
+CHECK_STRIDE = 5      # Every 5th grid interval is checked against SGP4 while building, at these fractions:
+CHECK_FRACTIONS = (0.25, 0.5, 0.75)   # truncation error peaks mid-interval, velocity/position mismatch off-centre
+TIME_CHUNK = 60       # Grid epochs propagated per batch while building
+
+
+# --- 2. Cubic Hermite Interpolation ---
+
+def hermite(r0, v0, r1, v1, s, h):
+    """
+    Cubic Hermite interpolation between samples (r0, v0) and (r1, v1) h seconds apart, at
+    fraction s in [0, 1]. Returns position and velocity.
+    """
+    s2 = s * s; s3 = s2 * s
+    r = (2*s3 - 3*s2 + 1) * r0 + (s3 - 2*s2 + s) * h * v0 + (-2*s3 + 3*s2) * r1 + (s3 - s2) * h * v1
+    v = ((6*s2 - 6*s) * (r0 - r1)) / h + (3*s2 - 4*s + 1) * v0 + (3*s2 - 2*s) * v1
+    return r, v
+
+
+# --- 3. Published Grid ---
+
+class Ephemeris:
+    """
+    Read-only, memory-mapped view of one published grid: positions and velocities (T, N, 3) as
+    float32 in TEME km and km/s, the SGP4 ok mask (T, N) and the objects flagged for exact
+    propagation. Every process maps the same files, so the pages are shared.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.path = path; self.tag = meta["tag"]
+        self.t0 = meta["t0"]; self.step_seconds = meta["step_seconds"]; self.steps = meta["steps"]
+        self.t_end = self.t0 + (self.steps - 1) * self.step_seconds
+        self.start = datetime.fromtimestamp(self.t0, UTC); self.end = datetime.fromtimestamp(self.t_end, UTC)
+        self.position_error_km = meta["position_error_km"]; self.velocity_error_km_s = meta["velocity_error_km_s"]
+        self.r = np.load(os.path.join(path, "r.npy"), mmap_mode="r")
+        self.v = np.load(os.path.join(path, "v.npy"), mmap_mode="r")
+        self.ok = np.load(os.path.join(path, "ok.npy"), mmap_mode="r")
+        self.exact = np.flatnonzero(np.load(os.path.join(path, "exact.npy")))
+        self.exact_array = None    # SatrecArray of the exact objects, attached by EphemerisStore
+
+    def covers(self, t):
+        return self.t0 <= t.timestamp() <= self.t_end
+
+    def interpolate(self, t):
+        """(r, v, ok) of every object at t, each (N, 3) / (N,), from the two bracketing grid slices."""
+        x = (t.timestamp() - self.t0) / self.step_seconds
+        k = min(int(x), self.steps - 2); s = x - k
+        r, v = hermite(self.r[k].astype(float), self.v[k].astype(float),
+                       self.r[k + 1].astype(float), self.v[k + 1].astype(float), s, self.step_seconds)
+        return r, v, self.ok[k] & self.ok[k + 1]
+
+
+def _publish_path(tag, t0, t_end):
+    return os.path.join(EPHEMERIS_DIR, f"{tag[:16]}-{int(t0)}-{int(t_end)}")
+
+def build_ephemeris(satellites, start, hours=EPHEMERIS_HORIZON_HOURS, step_seconds=EPHEMERIS_STEP_SECONDS,
+                    max_error_km=EPHEMERIS_MAX_ERROR_KM, tag=None):
+    """
+    Propagates the catalog on the grid, measures the interpolation error of every object inside
+    every CHECK_STRIDE-th interval, and publishes the grid with an atomic rename. Objects above
+    max_error_km (eccentric orbits near perigee, decaying objects) are flagged for
+    exact propagation, so interpolated states of the rest stay within the stated bound.
+    """
+    tag = tag or catalog_tag(satellites)
+    catalog = VectorCatalog(satellites, tag)
+    n = len(catalog); steps = int(hours * 3600.0 // step_seconds) + 1
+    t0 = start.timestamp(); t_end = t0 + (steps - 1) * step_seconds
+    jd0, fr0 = datetime_to_jd(start)
+
+    os.makedirs(EPHEMERIS_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".building-", dir=EPHEMERIS_DIR)
+    try:
+        r_out = np.lib.format.open_memmap(os.path.join(staging, "r.npy"), "w+", np.float32, (steps, n, 3))
+        v_out = np.lib.format.open_memmap(os.path.join(staging, "v.npy"), "w+", np.float32, (steps, n, 3))
+        ok_out = np.lib.format.open_memmap(os.path.join(staging, "ok.npy"), "w+", np.bool_, (steps, n))
+        r_err = np.zeros(n); v_err = np.zeros(n)
+        for c0 in range(0, steps, TIME_CHUNK):
+            k = np.arange(c0, min(c0 + TIME_CHUNK, steps))
+            e, r, v = catalog.array.sgp4(np.full(len(k), jd0), fr0 + k * step_seconds / 86400.0)
+            r_out[k] = r.transpose(1, 0, 2); v_out[k] = v.transpose(1, 0, 2); ok_out[k] = (e == 0).T
+
+            # Error check inside sampled intervals, against the stored (float32) samples
+            checked = k[(k % CHECK_STRIDE == 0) & (k + 1 <= k[-1])] - c0
+            if len(checked) == 0: continue
+            rs = r.astype(np.float32).astype(float); vs = v.astype(np.float32).astype(float)
+            both_ok = (e[:, checked] == 0) & (e[:, checked + 1] == 0)
+            for s in CHECK_FRACTIONS:
+                e_m, r_m, v_m = catalog.array.sgp4(np.full(len(checked), jd0),
+                                                   fr0 + (c0 + checked + s) * step_seconds / 86400.0)
+                r_i, v_i = hermite(rs[:, checked], vs[:, checked], rs[:, checked + 1], vs[:, checked + 1], s, step_seconds)
+                valid = both_ok & (e_m == 0)
+                r_err = np.maximum(r_err, np.where(valid, np.linalg.norm(r_i - r_m, axis=2), 0.0).max(axis=1))
+                v_err = np.maximum(v_err, np.where(valid, np.linalg.norm(v_i - v_m, axis=2), 0.0).max(axis=1))
+        r_out.flush(); v_out.flush(); ok_out.flush()
+        del r_out, v_out, ok_out
+
+        exact = r_err > max_error_km
+        np.save(os.path.join(staging, "exact.npy"), exact)
+        meta = {"tag": tag, "t0": t0, "step_seconds": step_seconds, "steps": steps,
+                "position_error_km": float(r_err[~exact].max()) if (~exact).any() else 0.0,
+                "velocity_error_km_s": float(v_err[~exact].max()) if (~exact).any() else 0.0,
+                "exact_objects": int(exact.sum())}
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        path = _publish_path(tag, t0, t_end)
+        if os.path.exists(path): shutil.rmtree(staging)   # Another process published the same grid
+        else: os.rename(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return Ephemeris(path)
+
+
+# --- 4. Rolling Store ---
+
+class EphemerisStore:
+    """
+    Keeps a grid covering now .. now + horizon for one catalog. Grids live as .npy files under
+    EPHEMERIS_DIR: the first process to need one builds it under an exclusive file lock and the
+    others (gunicorn workers) map the published files instead of propagating. A replacement is
+    built in a background thread once less than half of the horizon remains; expired grids are
+    deleted (processes still mapping them keep their pages until they switch).
+    """
+
+    def __init__(self, satellites, hours=EPHEMERIS_HORIZON_HOURS, step_seconds=EPHEMERIS_STEP_SECONDS):
+        self.satellites = satellites; self.hours = hours; self.step_seconds = step_seconds
+        self._current = None
+        self._building = False; self._lock = threading.Lock()
+
+    def _find_published(self, tag, min_end):
+        if not os.path.isdir(EPHEMERIS_DIR): return None
+        best = None
+        for entry in os.listdir(EPHEMERIS_DIR):
+            parts = entry.split("-")
+            if len(parts) != 3 or parts[0] != tag[:16]: continue
+            if int(parts[2]) >= min_end and (best is None or int(parts[1]) > int(best.split("-")[1])): best = entry
+        return Ephemeris(os.path.join(EPHEMERIS_DIR, best)) if best else None
+
+    def _remove_expired(self, now, keep):
+        for entry in os.listdir(EPHEMERIS_DIR):
+            parts = entry.split("-")
+            if len(parts) == 3 and parts[2].isdigit() and int(parts[2]) < now and entry != os.path.basename(keep):
+                shutil.rmtree(os.path.join(EPHEMERIS_DIR, entry), ignore_errors=True)
+
+    def _refresh(self):
+        try:
+            tag = catalog_tag(self.satellites)
+            now = datetime.now(UTC).timestamp()
+            os.makedirs(EPHEMERIS_DIR, exist_ok=True)
+            with open(os.path.join(EPHEMERIS_DIR, ".lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                eph = self._find_published(tag, now + self.hours * 3600.0 / 2.0)
+                if eph is None:
+                    start = datetime.fromtimestamp(now // self.step_seconds * self.step_seconds, UTC)
+                    eph = build_ephemeris(self.satellites, start, self.hours, self.step_seconds, tag=tag)
+                    print(f"[+] INFO: Ephemeris grid built: {eph.steps} epochs x {len(self.satellites)} objects, "
+                          f"interpolation error <= {eph.position_error_km * 1000:.2f} m "
+                          f"({len(eph.exact)} object(s) propagated exactly).")
+                    self._remove_expired(now, eph.path)
+            satrecs = list(self.satellites.values())
+            eph.exact_array = SatrecArray([satrecs[i] for i in eph.exact]) if len(eph.exact) else None
+            self._current = eph
+        except Exception as e:
+            print(f"[-] ERROR: Ephemeris grid refresh failed: {e}")
+        finally:
+            self._building = False
+
+    def get(self):
+        """The current grid, or None until the first one is available (refreshed in the background)."""
+        eph = self._current
+        remaining = (eph.t_end - datetime.now(UTC).timestamp()) if eph is not None else 0.0
+        if remaining < self.hours * 3600.0 / 2.0:
+            with self._lock:
+                if not self._building:
+                    self._building = True
+                    threading.Thread(target=self._refresh, name="ephemeris-grid", daemon=True).start()
+        return eph if remaining > 0 else None
+
+    def states_at(self, t):
+        """
+        (r, v, ok) of every catalog object at t, in catalog order, interpolated from the grid
+        (objects flagged at build time are propagated exactly). None when t is outside the grid,
+        the grid is still being built, or the catalog changed since it was built.
+        """
+        eph = self.get()
+        if eph is None or not eph.covers(t) or len(eph.ok[0]) != len(self.satellites): return None
+        r, v, ok = eph.interpolate(t)
+        if eph.exact_array is not None:
+            jd, fr = datetime_to_jd(t)
+            e, r_x, v_x = eph.exact_array.sgp4(np.array([jd]), np.array([fr]))
+            r[eph.exact] = r_x[:, 0, :]; v[eph.exact] = v_x[:, 0, :]; ok = ok.copy(); ok[eph.exact] = e[:, 0] == 0
+        return r, v, ok
@@ -0,0 +1,179 @@
+# event_store.py - Persistent SQLite store of computed conjunction events with indexed queries
+
+# 1. Imports and Setup
+from datetime import datetime, date, timedelta, UTC
+import os
+import sqlite3
+import threading
+
+from marshmallow import Schema, fields, validate
+
+EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH", "conjunction_events.sqlite3")
+MAX_QUERY_ROWS = 5000
+# Events older than this many days are deleted as new ones are recorded (0 keeps everything)
+EVENT_RETENTION_DAYS = float(os.getenv("EVENT_RETENTION_DAYS", "90"))
+PURGE_INTERVAL_SECONDS = 3600   # At most one retention purge per interval
+
+_COLUMNS = (
+    "analysis_epoch", "analysis_time", "norad_id_1", "norad_id_2", "satellite1", "satellite2",
+    "risk_score", "risk_category", "distance_km", "relative_velocity_km_s", "collision_probability",
+    "fir", "lat", "lon", "country_of_origin_1", "country_of_origin_2"
+)
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS conjunction_events (
+    id INTEGER PRIMARY KEY,
+    analysis_epoch REAL NOT NULL,          -- UTC seconds since 1970, for range queries
+    analysis_time TEXT NOT NULL,           -- ISO 8601, as returned by the API
+    norad_id_1 INTEGER, norad_id_2 INTEGER,
+    satellite1 TEXT NOT NULL, satellite2 TEXT NOT NULL,
+    risk_score REAL NOT NULL, risk_category TEXT NOT NULL,
+    distance_km REAL, relative_velocity_km_s REAL, collision_probability REAL,
+    fir TEXT, lat REAL, lon REAL,
+    country_of_origin_1 TEXT, country_of_origin_2 TEXT,
+    UNIQUE (analysis_epoch, satellite1, satellite2)
+);
+CREATE INDEX IF NOT EXISTS idx_events_time ON conjunction_events (analysis_epoch);
+CREATE INDEX IF NOT EXISTS idx_events_norad1 ON conjunction_events (norad_id_1, analysis_epoch);
+CREATE INDEX IF NOT EXISTS idx_events_norad2 ON conjunction_events (norad_id_2, analysis_epoch);
+CREATE INDEX IF NOT EXISTS idx_events_fir ON conjunction_events (fir, analysis_epoch);
+CREATE INDEX IF NOT EXISTS idx_events_category ON conjunction_events (risk_category, analysis_epoch);
+"""
+
+
+# --- 2. Marshmallow Schemas ---
+
+class EventHistoryQuerySchema(Schema):
+    """Query parameters for /api/events/history."""
+    start = fields.AwareDateTime(load_default=None, default_timezone=UTC,
+                                 metadata={"description": "Earliest analysis time (ISO 8601)."})
+    end = fields.AwareDateTime(load_default=None, default_timezone=UTC,
+                               metadata={"description": "Latest analysis time (ISO 8601), exclusive."})
+    norad_id = fields.Int(load_default=None, metadata={"description": "Events involving this NORAD ID."})
+    fir = fields.Str(load_default=None, metadata={"description": "FIR name, e.g. 'Incheon (South Korea)'."})
+    risk_category = fields.Str(load_default=None, validate=validate.OneOf(["Danger", "Attention"]))
+    limit = fields.Int(load_default=500, validate=validate.Range(min=1, max=MAX_QUERY_ROWS))
+
+class StoredEventSchema(Schema):
+    analysis_time = fields.Str(required=True)
+    norad_id_1 = fields.Int(allow_none=True); norad_id_2 = fields.Int(allow_none=True)
+    satellite1 = fields.Str(required=True); satellite2 = fields.Str(required=True)
+    risk_score = fields.Float(required=True); risk_category = fields.Str(required=True)
+    distance_km = fields.Float(); relative_velocity_km_s = fields.Float()
+    collision_probability = fields.Float(allow_none=True)
+    fir = fields.Str(); lat = fields.Float(); lon = fields.Float()
+    country_of_origin_1 = fields.Str(); country_of_origin_2 = fields.Str()
+
+class EventHistoryResponseSchema(Schema):
+    count = fields.Int(required=True)
+    events = fields.List(fields.Nested(StoredEventSchema), required=True)
+
+
+# --- 3. Event Store ---
+
+class EventStore:
+    """
+    Append-mostly SQLite store of the live conjunction events the server computes. One shared
+    connection (WAL mode) guarded by a lock is enough for the Flask dev server and gunicorn
+    threads; each gunicorn worker process opens its own connection to the same file. Rows
+    older than retention_days are purged while recording.
+    """
+
+    def __init__(self, path=EVENT_STORE_PATH, retention_days=EVENT_RETENTION_DAYS):
+        self.path = path; self.retention_days = retention_days
+        self._purged_at = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA_SQL)
+
+    def record_events(self, events, analysis_time):
+        """Persists a list of event dicts computed for analysis_time (re-runs replace duplicates)."""
+        if not events: return 0
+        epoch = analysis_time.timestamp(); iso = analysis_time.isoformat()
+        rows = [(
+            epoch, iso, e.get("norad_id_1"), e.get("norad_id_2"), e["satellite1"], e["satellite2"],
+            e["risk_score"], e["risk_category"], e.get("distance_km"), e.get("relative_velocity_km_s"),
+            e.get("collision_probability"), e.get("fir"), e.get("lat"), e.get("lon"),
+            e.get("country_of_origin_1"), e.get("country_of_origin_2")
+        ) for e in events]
+        sql = (f"INSERT OR REPLACE INTO conjunction_events ({', '.join(_COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(_COLUMNS))})")
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+        self._purge_expired()
+        return len(rows)
+
+    def purge(self, before):
+        """Deletes events analysed before the given time; returns the number of rows removed."""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM conjunction_events WHERE analysis_epoch < ?",
+                                      (before.timestamp(),)).rowcount
+
+    def _purge_expired(self):
+        if self.retention_days <= 0: return
+        now = datetime.now(UTC)
+        if self._purged_at is not None and (now - self._purged_at).total_seconds() < PURGE_INTERVAL_SECONDS: return
+        self._purged_at = now
+        removed = self.purge(now - timedelta(days=self.retention_days))
+        if removed: print(f"[-] INFO: Purged {removed} stored event(s) older than {self.retention_days:g} day(s).")
+
+    @staticmethod
+    def _where(start=None, end=None, norad_id=None, fir=None, risk_category=None):
+        clauses = []; params = []
+        if start is not None: clauses.append("analysis_epoch >= ?"); params.append(start.timestamp())
+        if end is not None: clauses.append("analysis_epoch < ?"); params.append(end.timestamp())
+        if fir is not None: clauses.append("fir = ?"); params.append(fir)
+        if risk_category is not None: clauses.append("risk_category = ?"); params.append(risk_category)
+        if norad_id is not None:
+            clauses.append("(norad_id_1 = ? OR norad_id_2 = ?)"); params.extend([norad_id, norad_id])
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def query(self, start=None, end=None, norad_id=None, fir=None, risk_category=None, limit=500):
+        """Indexed lookup by time range, NORAD ID, FIR and category; highest risk first."""
+        where, params = self._where(start, end, norad_id, fir, risk_category)
+        sql = (f"SELECT {', '.join(_COLUMNS[1:])} FROM conjunction_events {where} "
+               f"ORDER BY risk_score DESC, analysis_epoch DESC LIMIT ?")
+        params.append(min(int(limit), MAX_QUERY_ROWS))
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def iter_events(self, start=None, end=None, batch_size=10_000, **filters):
+        """
+        Streams matching events in time order without materializing the result set. Uses its own
+        read connection so long exports never block writers holding the shared one.
+        """
+        where, params = self._where(start, end, **filters)
+        sql = f"SELECT {', '.join(_COLUMNS[1:])} FROM conjunction_events {where} ORDER BY analysis_epoch"
+        conn = sqlite3.connect(self.path); conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows: break
+                for row in rows: yield dict(row)
+        finally:
+            conn.close()
+
+    def events_on_date(self, day, **filters):
+        """All events whose analysis time falls on the given UTC calendar day."""
+        if isinstance(day, str): day = date.fromisoformat(day)
+        start = datetime(day.year, day.month, day.day, tzinfo=UTC)
+        return self.query(start=start, end=start + timedelta(days=1), **filters)
+
+
+# --- 4. Flutter Alert Format ---
+
+def to_alerts_response(events, last_update):
+    """Maps stored events onto the {lastUpdate, alerts} shape read by the Flutter ApiService."""
+    return {
+        "lastUpdate": last_update,
+        "alerts": [{
+            "id": f"{e['norad_id_1']}-{e['norad_id_2']}-{e['analysis_time']}",
+            "satA": e["satellite1"], "satB": e["satellite2"], "risk": e["risk_score"],
+            "location": [e["lat"], e["lon"]], "fir": e["fir"], "timestamp": e["analysis_time"]
+        } for e in events]
+    }
@@ -0,0 +1,181 @@
+# export.py - Streaming columnar export (Parquet / Arrow IPC) of trajectories and conjunction events
+
+# 1. Imports and Setup
+import argparse
+from datetime import datetime, timedelta, UTC
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency: only needed when exporting
+    pa = pa_ipc = pq = None
+
+from propagation import get_vector_catalog, time_grid
+from frames import gmst_radians, teme_to_ecef, ecef_to_geodetic
+
+TIME_CHUNK = 30             # Epochs propagated per batch (N x TIME_CHUNK rows per row group)
+EVENT_BATCH_ROWS = 50_000   # Events buffered per row group
+DEFAULT_COMPRESSION = "zstd"
+
+
+# --- 2. Column Schemas ---
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for columnar export. Install it with: pip install pyarrow")
+
+def trajectory_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ("timestamp", pa.timestamp("ms", tz="UTC")), ("norad_id", pa.int32()),
+        ("lat", pa.float32()), ("lon", pa.float32()), ("alt_km", pa.float32()),
+        ("x_km", pa.float64()), ("y_km", pa.float64()), ("z_km", pa.float64()),
+        ("vx_km_s", pa.float32()), ("vy_km_s", pa.float32()), ("vz_km_s", pa.float32()),
+    ])
+
+def satellite_schema():
+    _require_pyarrow()
+    return pa.schema([("norad_id", pa.int32()), ("name", pa.string())])
+
+def event_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ("analysis_time", pa.timestamp("ms", tz="UTC")),
+        ("norad_id_1", pa.int32()), ("norad_id_2", pa.int32()),
+        ("satellite1", pa.string()), ("satellite2", pa.string()),
+        ("risk_score", pa.float64()), ("risk_category", pa.dictionary(pa.int8(), pa.string())),
+        ("distance_km", pa.float64()), ("relative_velocity_km_s", pa.float64()),
+        ("collision_probability", pa.float64()), ("fir", pa.dictionary(pa.int8(), pa.string())),
+        ("lat", pa.float32()), ("lon", pa.float32()),
+    ])
+
+
+# --- 3. Streaming Writer ---
+
+class ColumnarWriter:
+    """
+    Thin wrapper over pyarrow's ParquetWriter / IPC file writer: each write_batch call appends
+    one row group (or record batch), so memory is bounded by the batch size, not the file size.
+    """
+
+    def __init__(self, path, schema, fmt="parquet", compression=DEFAULT_COMPRESSION):
+        _require_pyarrow()
+        self.schema = schema; self.rows = 0
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression=compression)
+            self._write = self._writer.write_table
+        elif fmt == "arrow":
+            self._sink = pa.OSFile(path, "wb")
+            options = pa_ipc.IpcWriteOptions(compression=compression if compression in ("zstd", "lz4") else None)
+            self._writer = pa_ipc.new_file(self._sink, schema, options=options)
+            self._write = self._writer.write_table
+        else:
+            raise ValueError(f"Unknown export format '{fmt}' (use 'parquet' or 'arrow').")
+        self.fmt = fmt
+
+    def write_batch(self, columns):
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        self._write(table); self.rows += table.num_rows
+
+    def close(self):
+        self._writer.close()
+        if self.fmt == "arrow": self._sink.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+
+# --- 4. Export Functions ---
+
+def export_trajectories(satellites, start, end, step_seconds, path, fmt="parquet",
+                        compression=DEFAULT_COMPRESSION, time_chunk=TIME_CHUNK):
+    """
+    Propagates the whole catalog over [start, end] every step_seconds and streams one row per
+    (epoch, object) to path. Each chunk of epochs is a single SatrecArray call plus one batched
+    geodetic conversion, then written as its own row group. Returns the number of rows written.
+    """
+    catalog = get_vector_catalog(satellites)
+    times, jd, fr = time_grid(start, end, step_seconds)
+    epoch_ms = np.array([int(t.timestamp() * 1000) for t in times], dtype=np.int64)
+
+    with ColumnarWriter(path, trajectory_schema(), fmt, compression) as writer:
+        for t0 in range(0, len(times), time_chunk):
+            jd_c, fr_c = jd[t0:t0 + time_chunk], fr[t0:t0 + time_chunk]
+            r, v, ok = catalog.propagate(jd_c, fr_c)                      # (N, T, 3)
+            lat, lon, alt = ecef_to_geodetic(teme_to_ecef(r, gmst_radians(jd_c, fr_c)))
+            n_idx, t_idx = np.nonzero(ok)
+            writer.write_batch({
+                "timestamp": epoch_ms[t0:t0 + time_chunk][t_idx], "norad_id": catalog.norad_ids[n_idx],
+                "lat": lat[ok], "lon": lon[ok], "alt_km": alt[ok],
+                "x_km": r[ok][:, 0], "y_km": r[ok][:, 1], "z_km": r[ok][:, 2],
+                "vx_km_s": v[ok][:, 0], "vy_km_s": v[ok][:, 1], "vz_km_s": v[ok][:, 2],
+            })
+        rows = writer.rows
+
+    print(f"[+] INFO: Exported {rows} trajectory rows ({len(times)} epochs) to {path}.")
+    return rows
+
+def export_satellites(satellites, path, fmt="parquet", compression=DEFAULT_COMPRESSION):
+    """Writes the NORAD ID -> name lookup table that the trajectory rows join against."""
+    catalog = get_vector_catalog(satellites)
+    with ColumnarWriter(path, satellite_schema(), fmt, compression) as writer:
+        writer.write_batch({"norad_id": catalog.norad_ids, "name": catalog.names})
+        rows = writer.rows
+
+    print(f"[+] INFO: Exported {rows} satellite names to {path}.")
+    return rows
+
+def export_events(events, path, fmt="parquet", compression=DEFAULT_COMPRESSION, batch_rows=EVENT_BATCH_ROWS):
+    """
+    Streams conjunction events (any iterable of event dicts carrying an 'analysis_time', e.g.
+    EventStore.iter_events) to path in row groups of batch_rows. Returns the number of rows.
+    """
+    schema = event_schema(); names = schema.names
+    with ColumnarWriter(path, schema, fmt, compression) as writer:
+        buffer = {name: [] for name in names}
+        for event in events:
+            for name in names:
+                value = event.get(name)
+                if name == "analysis_time" and isinstance(value, str): value = datetime.fromisoformat(value)
+                buffer[name].append(value)
+            if len(buffer["risk_score"]) >= batch_rows:
+                writer.write_batch(buffer); buffer = {name: [] for name in names}
+        if buffer["risk_score"]: writer.write_batch(buffer)
+        rows = writer.rows
+
+    print(f"[+] INFO: Exported {rows} conjunction events to {path}.")
+    return rows
+
+
+# --- 5. Command Line ---
+
+if __name__ == "__main__":
+    from risk_analyzer import load_tle_data
+    from event_store import EventStore
+
+    parser = argparse.ArgumentParser(description="Columnar export of LEO analysis results.")
+    parser.add_argument("what", choices=["trajectories", "satellites", "events"])
+    parser.add_argument("--out", required=True, help="Output file path.")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--compression", default=DEFAULT_COMPRESSION)
+    parser.add_argument("--start", help="ISO 8601 start time (trajectories default: now; events default: all history).")
+    parser.add_argument("--hours", type=float, default=6.0, help="Length of the export window.")
+    parser.add_argument("--step", type=float, default=60.0, help="Trajectory sampling step in seconds.")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start).replace(tzinfo=UTC) if args.start else datetime.now(UTC)
+    end = start + timedelta(hours=args.hours)
+
+    if args.what == "trajectories":
+        satellites = load_tle_data()
+        export_trajectories(satellites, start, end, args.step, args.out, args.format, args.compression)
+    elif args.what == "satellites":
+        # NORAD ID -> name table for joining trajectory exports (which carry IDs only)
+        export_satellites(load_tle_data(), args.out, args.format, args.compression)
+    else:
+        # Without --start the whole stored history is exported
+        store = EventStore()
+        window = {"start": start, "end": end} if args.start else {}
+        export_events(store.iter_events(**window), args.out, args.format, args.compression)
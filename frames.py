@@ -0,0 +1,77 @@
+# frames.py - Batched reference-frame helpers (NumPy arrays of shape (..., 3))
+
+# 1. Imports and Setup
+import numpy as np
+
+# WGS-84 ellipsoid
+WGS84_A_KM = 6378.137
+WGS84_F = 1.0 / 298.257223563
+WGS84_B_KM = WGS84_A_KM * (1.0 - WGS84_F)
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+WGS84_EP2 = (WGS84_A_KM**2 - WGS84_B_KM**2) / WGS84_B_KM**2
+
+
+# --- 2. Orbit-Relative Frames ---
+
+def ric_basis(r, v):
+    """
+    Radial / in-track / cross-track unit vectors of an object with TEME state (r, v).
+    Returns an array of shape (..., 3, 3) whose rows are the R, I and C axes, so that
+    basis @ x rotates an inertial vector x into the object's RIC frame.
+    """
+    r = np.asarray(r, dtype=float); v = np.asarray(v, dtype=float)
+    radial = r / np.linalg.norm(r, axis=-1, keepdims=True)
+    h = np.cross(r, v)
+    cross_track = h / np.linalg.norm(h, axis=-1, keepdims=True)
+    in_track = np.cross(cross_track, radial)
+    return np.stack([radial, in_track, cross_track], axis=-2)
+
+def to_ric(r_primary, v_primary, vectors):
+    """Rotates inertial vectors (e.g. relative positions) into the RIC frame of the primary."""
+    basis = ric_basis(r_primary, v_primary)
+    return np.einsum('...ij,...j->...i', basis, np.asarray(vectors, dtype=float))
+
+
+# --- 3. Earth-Fixed and Geodetic Frames ---
+
+def gmst_radians(jd, fr):
+    """
+    Greenwich mean sidereal time (IAU-82, as used by SGP4's TEME) for Julian dates split as
+    (jd, fr). Works on scalars or arrays; compute it once per epoch and reuse it for every object.
+    """
+    t_ut1 = ((np.asarray(jd, dtype=float) - 2451545.0) + np.asarray(fr, dtype=float)) / 36525.0
+    seconds = (-6.2e-6 * t_ut1**3 + 0.093104 * t_ut1**2
+               + (876600.0 * 3600.0 + 8640184.812866) * t_ut1 + 67310.54841)
+    return np.mod(np.radians(seconds / 240.0), 2.0 * np.pi)
+
+def teme_to_ecef(r_teme, gmst):
+    """
+    Rotates TEME positions (..., 3) into the Earth-fixed frame (polar motion neglected).
+    gmst must broadcast against r_teme[..., 0], e.g. a scalar for a single epoch or a (T,)
+    array for positions shaped (N, T, 3).
+    """
+    r = np.asarray(r_teme, dtype=float)
+    c = np.cos(gmst); s = np.sin(gmst)
+    x = c * r[..., 0] + s * r[..., 1]
+    y = -s * r[..., 0] + c * r[..., 1]
+    return np.stack([x, y, r[..., 2]], axis=-1)
+
+def ecef_to_geodetic(r_ecef):
+    """
+    WGS-84 geodetic latitude/longitude (degrees) and altitude (km) of ECEF positions (..., 3),
+    using Bowring's closed-form latitude (sub-metre for LEO altitudes).
+    """
+    r = np.asarray(r_ecef, dtype=float)
+    x, y, z = r[..., 0], r[..., 1], r[..., 2]
+    p = np.hypot(x, y)
+    theta = np.arctan2(z * WGS84_A_KM, p * WGS84_B_KM)
+    lat = np.arctan2(z + WGS84_EP2 * WGS84_B_KM * np.sin(theta)**3,
+                     p - WGS84_E2 * WGS84_A_KM * np.cos(theta)**3)
+    lon = np.arctan2(y, x)
+    sin_lat = np.sin(lat)
+    alt = p * np.cos(lat) + z * sin_lat - WGS84_A_KM * np.sqrt(1.0 - WGS84_E2 * sin_lat**2)
+    return np.degrees(lat), np.degrees(lon), alt
+
+def teme_to_geodetic(r_teme, jd, fr):
+    """TEME positions at Julian date (jd, fr) -> (lat_deg, lon_deg, alt_km) arrays."""
+    return ecef_to_geodetic(teme_to_ecef(r_teme, gmst_radians(jd, fr)))
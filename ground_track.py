@@ -0,0 +1,175 @@
+# ground_track.py - Ground tracks for the map: one vectorized propagation, antimeridian split, zoom decimation
+
+# 1. Imports and Setup
+from collections import OrderedDict
+from datetime import datetime, timedelta, UTC
+import os
+import threading
+import numpy as np
+
+from marshmallow import Schema, fields, validate
+
+from propagation import get_vector_catalog, time_grid
+from frames import teme_to_geodetic
+
+DEFAULT_TRACK_HOURS = 1.5      # About one LEO revolution when no end time is given
+MAX_TRACK_HOURS = 48.0         # Longest window accepted by the API (bounds request cost)
+DEFAULT_TRACK_STEP_SECONDS = 30.0
+TOLERANCE_PIXELS = 1.0         # Decimation tolerance: polyline error below one screen pixel at the zoom
+TILE_PIXELS = 256              # Web-map tile size: the world is 256 * 2^zoom pixels wide
+TRACK_CACHE_SIZE = int(os.getenv("TRACK_CACHE_SIZE", "256"))
+
+
+# --- 2. Marshmallow Schemas ---
+
+class TrackQuerySchema(Schema):
+    """Query parameters for /api/satellites/<norad_id>/track."""
+    start = fields.AwareDateTime(
+        load_default=None, default_timezone=UTC,
+        metadata={"description": "Track start (ISO 8601). Defaults to the current UTC time."}
+    )
+    end = fields.AwareDateTime(
+        load_default=None, default_timezone=UTC,
+        metadata={"description": f"Track end (ISO 8601). Defaults to start + {DEFAULT_TRACK_HOURS:g} h."}
+    )
+    step_seconds = fields.Float(
+        load_default=DEFAULT_TRACK_STEP_SECONDS, validate=validate.Range(min=5.0, max=600.0),
+        metadata={"description": "Propagation step in seconds; start and end are snapped to it."}
+    )
+    zoom = fields.Int(
+        load_default=None, validate=validate.Range(min=0, max=22),
+        metadata={"description": "Map zoom level; points closer than a pixel to the simplified line are dropped. Omit for every sample."}
+    )
+
+class TrackResponseSchema(Schema):
+    norad_id = fields.Int(required=True)
+    name = fields.Str(required=True)
+    start = fields.DateTime(required=True)
+    end = fields.DateTime(required=True)
+    step_seconds = fields.Float(required=True)
+    tolerance_deg = fields.Float(required=True, metadata={"description": "Decimation tolerance used (0 = none)."})
+    catalog_version = fields.Int(required=True)
+    point_count = fields.Int(required=True)
+    segments = fields.List(
+        fields.List(fields.List(fields.Float())), required=True,
+        metadata={"description": "Polylines split at the antimeridian and at propagation failures; "
+                                 "points are [lat, lon, alt_km, seconds since start]."}
+    )
+
+
+# --- 3. Track Geometry ---
+
+def split_antimeridian(lat, lon, alt, t):
+    """
+    Splits a sampled track wherever consecutive longitudes jump by more than 180 deg. Each
+    piece is closed (and the next one opened) with a point interpolated onto +/-180 deg, so
+    the drawn lines meet the map edge instead of stopping short of it.
+    """
+    points = np.column_stack([lat, lon, alt, t])
+    if len(points) < 2: return [points] if len(points) else []
+    jumps = np.flatnonzero(np.abs(np.diff(lon)) > 180.0)
+    segments = []; begin = 0; head = None
+    for k in jumps:
+        a, b = points[k], points[k + 1]
+        edge = 180.0 if a[1] > 0 else -180.0
+        lon_b = b[1] + 2 * edge                  # b's longitude continued past the edge
+        f = (edge - a[1]) / (lon_b - a[1])
+        crossing = a + f * (np.array([b[0], lon_b, b[2], b[3]]) - a)   # Lies on lon = edge
+        piece = points[begin:k + 1]
+        if head is not None: piece = np.vstack([head, piece])
+        segments.append(np.vstack([piece, crossing]))
+        head = crossing.copy(); head[1] = -edge
+        begin = k + 1
+    piece = points[begin:]
+    segments.append(piece if head is None else np.vstack([head, piece]))
+    return segments
+
+def simplify(points, tolerance):
+    """
+    Ramer-Douglas-Peucker on (lat, lon) in degrees: keeps the endpoints and every point whose
+    removal would move the line by more than tolerance. Returns the retained rows.
+    """
+    n = len(points)
+    if tolerance <= 0 or n < 3: return points
+    keep = np.zeros(n, dtype=bool); keep[0] = keep[-1] = True
+    xy = points[:, :2]
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2: continue
+        a = xy[i]; d = xy[j] - a; seg = xy[i + 1:j] - a
+        length = np.hypot(d[0], d[1])
+        if length > 0: dist = np.abs(d[0] * seg[:, 1] - d[1] * seg[:, 0]) / length
+        else: dist = np.hypot(seg[:, 0], seg[:, 1])
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            k += i + 1; keep[k] = True
+            stack.append((i, k)); stack.append((k, j))
+    return points[keep]
+
+def zoom_tolerance(zoom):
+    return 0.0 if zoom is None else 360.0 / (TILE_PIXELS * 2 ** zoom) * TOLERANCE_PIXELS
+
+def snap_window(start, end, step_seconds):
+    """Floors start and ceils end to the step grid, so nearby requests share one cached track."""
+    epoch = datetime(1970, 1, 1, tzinfo=UTC)
+    s = (start - epoch).total_seconds() // step_seconds * step_seconds
+    e = -((epoch - end).total_seconds() // step_seconds) * step_seconds
+    return epoch + timedelta(seconds=s), epoch + timedelta(seconds=e)
+
+
+# --- 4. Cached Tracks ---
+
+class TrackCache:
+    """
+    Ground tracks keyed by (catalog version, NORAD ID, window, step). Each window is propagated
+    once in a single call; the decimated polylines per zoom level are kept alongside it.
+    """
+
+    def __init__(self, satellites, size=TRACK_CACHE_SIZE):
+        self.satellites = satellites; self.size = size
+        self._items = OrderedDict(); self._lock = threading.Lock()
+
+    def _cached(self, key, build):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key); return item
+        item = build()
+        with self._lock:
+            self._items[key] = item; self._items.move_to_end(key)
+            while len(self._items) > self.size: self._items.popitem(last=False)
+        return item
+
+    def key(self, norad_id, start, end, step_seconds):
+        return (get_vector_catalog(self.satellites).version, norad_id, start.isoformat(), end.isoformat(), step_seconds)
+
+    def _segments(self, norad_id, start, end, step_seconds):
+        catalog = get_vector_catalog(self.satellites)
+        index = catalog.index_by_norad[norad_id]
+        _, jd, fr = time_grid(start, end, step_seconds)
+        r, _, ok = catalog.propagate(jd, fr, indices=[index])
+        lat, lon, alt = teme_to_geodetic(r[0], jd, fr)
+        t = (jd - jd[0] + fr - fr[0]) * 86400.0
+        ok = ok[0] & np.isfinite(lat)
+        # Failed samples break the line as well; each valid run is then split at the antimeridian
+        segments = []
+        for run in np.split(np.arange(len(t)), np.flatnonzero(np.diff(ok.astype(np.int8))) + 1):
+            if len(run) and ok[run[0]]:
+                segments.extend(split_antimeridian(lat[run], lon[run], alt[run], t[run]))
+        return segments
+
+    def track(self, norad_id, start, end, step_seconds, zoom=None):
+        """TrackResponseSchema dict, or None if norad_id is not in the loaded catalog."""
+        catalog = get_vector_catalog(self.satellites)
+        if norad_id not in catalog.index_by_norad: return None
+        key = self.key(norad_id, start, end, step_seconds)
+        tolerance = zoom_tolerance(zoom)
+
+        def build():
+            raw = self._cached(key, lambda: self._segments(norad_id, start, end, step_seconds))
+            segments = [np.round(simplify(s, tolerance), 4).tolist() for s in raw]
+            return {"norad_id": norad_id, "name": catalog.names[catalog.index_by_norad[norad_id]],
+                    "start": start, "end": end, "step_seconds": step_seconds, "tolerance_deg": tolerance,
+                    "catalog_version": key[0], "point_count": sum(len(s) for s in segments), "segments": segments}
+        return self._cached(key + (zoom,), build)
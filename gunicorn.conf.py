@@ -0,0 +1,35 @@
+# gunicorn.conf.py - gunicorn settings; the master publishes the TLE catalog once for all workers
+# Run: gunicorn -c gunicorn.conf.py server:app
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '3002')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))     # SSE streams and waiting requests hold a thread
+timeout = 120
+
+
+def _publish(server):
+    from risk_analyzer import load_tle_data
+    from shared_catalog import publish_catalog, SHARED_CATALOG_ENV
+
+    satellites = load_tle_data()
+    if not satellites:
+        server.log.warning("TLE catalog not loaded; workers will try the TLE file themselves.")
+        os.environ.pop(SHARED_CATALOG_ENV, None)
+        return
+    path = publish_catalog(satellites)
+    os.environ[SHARED_CATALOG_ENV] = path      # Inherited by every worker forked after this point
+    server.log.info("Published shared catalog %s (%d satellites).", path, len(satellites))
+
+def on_starting(server):
+    _publish(server)
+
+def on_reload(server):
+    # SIGHUP: parse the new TLE file once here; the replacement workers attach to it
+    _publish(server)
+
+def on_exit(server):
+    from shared_catalog import CATALOG_SHM_DIR
+    import shutil
+    shutil.rmtree(CATALOG_SHM_DIR, ignore_errors=True)
@@ -0,0 +1,113 @@
+# heatmap.py - Gridded traffic and conjunction density per snapshot, for the map's heat layer
+
+# 1. Imports and Setup
+from datetime import UTC
+import numpy as np
+
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+
+from positions import sub_satellite_points
+from risk_analyzer import FIR_BOUNDARIES
+
+DEFAULT_CELL_DEG = 2.0
+DEFAULT_ALT_MIN_KM = 200.0
+DEFAULT_ALT_MAX_KM = 2000.0
+DEFAULT_ALT_STEP_KM = 100.0
+MAX_GRID_CELLS = 2_000_000     # lat x lon x altitude bins accepted per request (bounds the dense histogram)
+
+FIR_NAMES = [b["name"] for b in FIR_BOUNDARIES.values()]
+_FIR_BOXES = {b["name"]: b for b in FIR_BOUNDARIES.values()}
+_POSITIONS_KEY = ("positions",)     # Per-snapshot catalog sub-points, shared by every grid of that snapshot
+
+
+# --- 2. Marshmallow Schemas ---
+
+class HeatmapQuerySchema(Schema):
+    """Query parameters for /api/heatmap."""
+    time = fields.AwareDateTime(load_default=None, default_timezone=UTC, metadata={"description": "Analysis time (ISO 8601). Defaults to the live snapshot."})
+    fir = fields.Str(load_default=None, validate=validate.OneOf(FIR_NAMES),
+                     metadata={"description": "Limit the grid to this FIR's box (default: whole globe)."})
+    cell_deg = fields.Float(load_default=DEFAULT_CELL_DEG, validate=validate.Range(min=0.1, max=30.0))
+    alt_min_km = fields.Float(load_default=DEFAULT_ALT_MIN_KM, validate=validate.Range(min=0.0, max=50000.0))
+    alt_max_km = fields.Float(load_default=DEFAULT_ALT_MAX_KM, validate=validate.Range(min=0.0, max=50000.0))
+    alt_step_km = fields.Float(load_default=DEFAULT_ALT_STEP_KM, validate=validate.Range(min=10.0, max=50000.0))
+
+    @validates_schema
+    def _validate_grid(self, data, **kwargs):
+        if data["alt_max_km"] <= data["alt_min_km"]:
+            raise ValidationError("alt_max_km must exceed alt_min_km.", "alt_max_km")
+        lat_span, lon_span = _extent(data.get("fir"))[1::2]
+        cells = (np.ceil(lat_span / data["cell_deg"]) * np.ceil(lon_span / data["cell_deg"])
+                 * np.ceil((data["alt_max_km"] - data["alt_min_km"]) / data["alt_step_km"]))
+        if cells > MAX_GRID_CELLS:
+            raise ValidationError(f"Grid would have {int(cells)} cells (limit {MAX_GRID_CELLS}); use coarser bins.", "cell_deg")
+
+class HeatmapResponseSchema(Schema):
+    timestamp = fields.Str(required=True); version = fields.Int(required=True)
+    fir = fields.Str(allow_none=True)
+    lat_min = fields.Float(required=True); lon_min = fields.Float(required=True); cell_deg = fields.Float(required=True)
+    alt_edges_km = fields.List(fields.Float(), required=True)
+    shape = fields.List(fields.Int(), required=True, metadata={"description": "[lat bins, lon bins, altitude bins]."})
+    objects = fields.Int(required=True, metadata={"description": "Catalog objects inside the grid."})
+    events = fields.Int(required=True, metadata={"description": "Conjunction events inside the grid."})
+    max_objects = fields.Int(required=True); max_events = fields.Int(required=True)
+    cells = fields.List(
+        fields.List(fields.Float()), required=True,
+        metadata={"description": "Non-empty cells as [lat_index, lon_index, alt_index, objects, events, summed risk_score]."}
+    )
+
+
+# --- 3. Aggregation ---
+
+def _extent(fir):
+    """(lat_min, lat_span, lon_min, lon_span) of the grid: a FIR box or the globe."""
+    if fir is None: return -90.0, 180.0, -180.0, 360.0
+    box = _FIR_BOXES[fir]
+    return box["lat_min"], box["lat_max"] - box["lat_min"], box["lon_min"], box["lon_max"] - box["lon_min"]
+
+def grid_edges(fir, cell_deg, alt_min_km, alt_max_km, alt_step_km):
+    lat_min, lat_span, lon_min, lon_span = _extent(fir)
+    n_lat = int(np.ceil(lat_span / cell_deg - 1e-9)); n_lon = int(np.ceil(lon_span / cell_deg - 1e-9))
+    n_alt = int(np.ceil((alt_max_km - alt_min_km) / alt_step_km - 1e-9))
+    return (lat_min + cell_deg * np.arange(n_lat + 1), lon_min + cell_deg * np.arange(n_lon + 1),
+            alt_min_km + alt_step_km * np.arange(n_alt + 1))
+
+def _histogram(lat, lon, alt, edges, weights=None):
+    ok = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(alt)
+    sample = np.column_stack([lat[ok], lon[ok], alt[ok]])
+    counts, _ = np.histogramdd(sample, bins=edges, weights=None if weights is None else weights[ok])
+    return counts
+
+def _catalog_points(snapshot, satellites, ephemeris):
+    points = snapshot.aggregates.get(_POSITIONS_KEY)
+    if points is None:
+        lat, lon, alt, ok = sub_satellite_points(satellites, snapshot.analysis_time, ephemeris)
+        points = snapshot.aggregates.setdefault(_POSITIONS_KEY, (lat[ok], lon[ok], alt[ok]))
+    return points
+
+def snapshot_heatmap(snapshot, satellites, query, ephemeris=None):
+    """
+    Density grid of catalog objects (propagated to the snapshot time) and of the snapshot's
+    conjunction events, binned by latitude, longitude and altitude with np.histogramdd.
+    Computed once per snapshot and grid; only non-empty cells are returned.
+    """
+    params = (query.get("fir"), query["cell_deg"], query["alt_min_km"], query["alt_max_km"], query["alt_step_km"])
+    cached = snapshot.aggregates.get(params)
+    if cached is not None: return cached
+
+    edges = grid_edges(*params)
+    objects = _histogram(*_catalog_points(snapshot, satellites, ephemeris), edges)
+    events = _histogram(snapshot.lat, snapshot.lon, snapshot.alt, edges)
+    risk = _histogram(snapshot.lat, snapshot.lon, snapshot.alt, edges, weights=snapshot.risk)
+
+    nonzero = np.nonzero((objects > 0) | (events > 0))
+    cells = np.column_stack(nonzero + (objects[nonzero], events[nonzero], np.round(risk[nonzero], 4)))
+    result = {
+        "timestamp": snapshot.timestamp, "version": snapshot.version, "fir": params[0],
+        "lat_min": float(edges[0][0]), "lon_min": float(edges[1][0]), "cell_deg": params[1],
+        "alt_edges_km": edges[2].tolist(), "shape": list(objects.shape),
+        "objects": int(objects.sum()), "events": int(events.sum()),
+        "max_objects": int(objects.max(initial=0)), "max_events": int(events.max(initial=0)),
+        "cells": cells.tolist(),
+    }
+    return snapshot.aggregates.setdefault(params, result)
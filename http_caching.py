@@ -0,0 +1,123 @@
+# http_caching.py - Strong ETags, conditional GET (304) and gzip/brotli responses for polling clients
+
+# 1. Imports and Setup
+from collections import OrderedDict
+import gzip
+import hashlib
+import threading
+
+from flask import g, request, Response
+
+try:
+    import brotli  # Optional: preferred over gzip when installed and accepted by the client
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024      # Smaller bodies are sent as-is
+ENCODED_CACHE_SIZE = 64        # Encoded bodies kept per process, keyed by (etag, encoding)
+_ENCODING_SUFFIX = {"gzip": "-gz", "br": "-br"}
+_VARY = "Accept, Accept-Encoding"   # Bodies differ by content type (JSON / MessagePack) and encoding
+
+
+# --- 2. ETag Helpers ---
+
+def make_etag(*parts):
+    """Strong validator derived from the snapshot identity and anything else shaping the body."""
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:24]
+
+def _client_etags():
+    header = request.headers.get("If-None-Match", "")
+    tags = set()
+    for raw in header.split(","):
+        tag = raw.strip()
+        if tag.startswith("W/"): tag = tag[2:]
+        tag = tag.strip('"')
+        for suffix in _ENCODING_SUFFIX.values():
+            if tag.endswith(suffix): tag = tag[:-len(suffix)]
+        if tag: tags.add(tag)
+    return tags
+
+def choose_encoding():
+    """Picks br or gzip from Accept-Encoding (honouring q=0), or None for identity."""
+    accepted = {}
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        token, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try: q = float(params.strip()[2:])
+            except ValueError: q = 0.0
+        if token: accepted[token.lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0: return "br"
+    if accepted.get("gzip", 0) > 0: return "gzip"
+    return None
+
+
+# --- 3. Encoded Body Cache ---
+
+class EncodedResponseCache:
+    """Small LRU of already serialized and compressed bodies, so unchanged snapshots are never re-encoded."""
+
+    def __init__(self, size=ENCODED_CACHE_SIZE):
+        self.size = size; self._items = OrderedDict(); self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None: self._items.move_to_end(key)
+            return item
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value; self._items.move_to_end(key)
+            while len(self._items) > self.size: self._items.popitem(last=False)
+
+ENCODED_CACHE = EncodedResponseCache()
+
+
+# --- 4. Request / Response Hooks ---
+
+def _etag_header(etag, encoding):
+    return f'"{etag}{_ENCODING_SUFFIX.get(encoding, "")}"'
+
+def begin_conditional(etag):
+    """
+    Call in a view once the snapshot is known, before any serialization. Returns a 304 when the
+    client already holds this version, a cached encoded body when one exists, or None to let the
+    view build the body (which finish_conditional then encodes and caches).
+    """
+    encoding = choose_encoding()
+    g.conditional_etag = etag; g.conditional_encoding = encoding
+    if etag in _client_etags() or "*" in request.headers.get("If-None-Match", ""):
+        response = Response(status=304)
+        response.headers["ETag"] = _etag_header(etag, encoding)
+        response.headers["Vary"] = _VARY
+        g.conditional_done = True
+        return response
+    cached = ENCODED_CACHE.get((etag, encoding))
+    if cached is not None:
+        body, mimetype, content_encoding = cached
+        response = Response(body, status=200, mimetype=mimetype)
+        if content_encoding: response.headers["Content-Encoding"] = content_encoding
+        response.headers["ETag"] = _etag_header(etag, content_encoding)
+        response.headers["Vary"] = _VARY
+        g.conditional_done = True
+        return response
+    return None
+
+def finish_conditional(response):
+    """after_request hook: adds the ETag, compresses the body and caches it for the next poll."""
+    etag = g.get("conditional_etag")
+    if etag is None or g.get("conditional_done") or response.status_code != 200 or response.direct_passthrough:
+        return response
+    encoding = g.get("conditional_encoding")
+    body = response.get_data()
+    content_encoding = None
+    if encoding and len(body) >= MIN_COMPRESS_BYTES:
+        body = brotli.compress(body, quality=5) if encoding == "br" else gzip.compress(body, compresslevel=6)
+        content_encoding = encoding
+        response.set_data(body)
+        response.headers["Content-Encoding"] = content_encoding
+    response.headers["ETag"] = _etag_header(etag, content_encoding)
+    response.headers["Vary"] = _VARY
+    ENCODED_CACHE.put((etag, encoding), (body, response.mimetype, content_encoding))
+    return response
@@ -0,0 +1,219 @@
+# jobs.py - Background analysis jobs executed by worker processes, with results cached by parameter hash
+
+# 1. Imports and Setup
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, UTC
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+
+from monte_carlo import satrec_elements, satrec_from_elements
+from risk_analyzer import (
+    run_full_risk_analysis, filter_satellites_by_fir, ConjunctionEventSchema, SCREENING_MODE
+)
+from constellations import FORMATION_POLICY, get_formation_groups
+from debris_density import get_density_index
+from access_windows import ACCESS_LEAD_SECONDS
+from shared_catalog import SharedSatellites
+from process_pool import worker_context
+
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))   # Analysis processes shared by all jobs
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "50"))           # Finished jobs (and results) kept per process
+MAX_JOB_HOURS = 72
+MAX_JOB_STEPS = 288
+
+
+# --- 2. Marshmallow Schemas ---
+
+class JobSubmitSchema(Schema):
+    """Body of POST /api/jobs: one analysis run every step_minutes over [start, end]."""
+    start = fields.AwareDateTime(required=True, default_timezone=UTC)
+    end = fields.AwareDateTime(load_default=None, default_timezone=UTC,
+                               metadata={"description": "Defaults to start (a single analysis epoch)."})
+    step_minutes = fields.Float(load_default=60.0, validate=validate.Range(min=1.0, max=1440.0))
+    firs = fields.List(fields.Str(), load_default=None,
+                       metadata={"description": "Only keep events in these FIRs (default: all FIRs)."})
+    min_risk = fields.Float(load_default=None, validate=validate.Range(min=0.0, max=1.0))
+    screening = fields.Str(load_default=SCREENING_MODE, validate=validate.OneOf(["all", "ric", "verlet"]))
+    monte_carlo = fields.Bool(load_default=False)
+    formation_policy = fields.Str(load_default=FORMATION_POLICY, validate=validate.OneOf(["include", "exclude", "sample"]),
+                                  metadata={"description": "How pairs inside one constellation shell/plane are screened."})
+
+    @validates_schema
+    def _validate_window(self, data, **kwargs):
+        end = data.get("end") or data["start"]
+        if end < data["start"]: raise ValidationError("end must not precede start.", "end")
+        if end - data["start"] > timedelta(hours=MAX_JOB_HOURS):
+            raise ValidationError(f"Job windows are limited to {MAX_JOB_HOURS} hours.", "end")
+        steps = int((end - data["start"]).total_seconds() // (data["step_minutes"] * 60)) + 1
+        if steps > MAX_JOB_STEPS:
+            raise ValidationError(f"At most {MAX_JOB_STEPS} analysis epochs per job; increase step_minutes.", "step_minutes")
+
+class JobStatusSchema(Schema):
+    job_id = fields.Str(required=True)
+    status = fields.Str(required=True, metadata={"description": "queued | running | done | failed"})
+    progress = fields.Float(required=True); steps_done = fields.Int(); steps_total = fields.Int()
+    cached = fields.Bool(metadata={"description": "True when an identical earlier submission was reused."})
+    submitted_at = fields.Str(); finished_at = fields.Str(allow_none=True)
+    error = fields.Str(allow_none=True); params = fields.Dict()
+
+class JobStepSchema(Schema):
+    timestamp = fields.Str(required=True)
+    events = fields.List(fields.Nested(ConjunctionEventSchema), required=True)
+    formation_skipped_by_constellation = fields.Dict(keys=fields.Str(), values=fields.Int())
+
+class JobResultSchema(Schema):
+    job_id = fields.Str(required=True); params = fields.Dict()
+    results = fields.List(fields.Nested(JobStepSchema), required=True)
+
+
+# --- 3. Worker Process Side ---
+
+_WORKER_SATELLITES = None
+
+def _init_worker(shared_path, elements_by_name):
+    """
+    Pool initializer, run once in each fresh worker process: attaches the catalog the gunicorn
+    master published in shared memory, or (Satrec objects cannot be pickled) rebuilds it from
+    element rows.
+    """
+    global _WORKER_SATELLITES
+    if shared_path:
+        _WORKER_SATELLITES = SharedSatellites(shared_path)
+    else:
+        _WORKER_SATELLITES = {name: satrec_from_elements(e) for name, e in elements_by_name.items()}
+
+def _run_step(analysis_time, firs, min_risk, screening, monte_carlo, formation_policy, candidates=None):
+    """
+    One analysis epoch of a job (FIR pre-filter, full analysis, then the job's event filters).
+    candidates, if given, are the names the submitting process already found over the FIRs in
+    its access-window index; otherwise the worker propagates the catalog to pre-filter.
+    """
+    if candidates is not None:
+        relevant = {name: _WORKER_SATELLITES[name] for name in candidates}
+    else:
+        relevant = filter_satellites_by_fir(_WORKER_SATELLITES, analysis_time)
+    report = {}
+    events = run_full_risk_analysis(relevant, analysis_time=analysis_time, monte_carlo=monte_carlo, screening=screening,
+                                    formation_policy=formation_policy, report=report,
+                                    density=get_density_index(_WORKER_SATELLITES),
+                                    formations=get_formation_groups(_WORKER_SATELLITES))
+    if firs: events = [e for e in events if e.get("fir") in firs]
+    if min_risk is not None: events = [e for e in events if e["risk_score"] >= min_risk]
+    return {"timestamp": analysis_time.isoformat(), "events": events,
+            "formation_skipped_by_constellation": report.get("formation_skipped_by_constellation", {})}
+
+
+# --- 4. Job Manager ---
+
+class Job:
+    def __init__(self, job_id, params, param_hash, steps):
+        self.job_id = job_id; self.params = params; self.param_hash = param_hash
+        self.steps = steps; self.results = [None] * len(steps)
+        self.status = "queued"; self.steps_done = 0; self.error = None
+        self.submitted_at = datetime.now(UTC); self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def describe(self, cached=False):
+        return {
+            "job_id": self.job_id, "status": self.status, "cached": cached,
+            "progress": self.steps_done / len(self.steps), "steps_done": self.steps_done, "steps_total": len(self.steps),
+            "submitted_at": self.submitted_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error, "params": self.params
+        }
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+class JobManager:
+    """
+    Local job queue: every analysis epoch of a job is one task in a shared process pool, so long
+    forecasts never hold a web worker. Identical submissions (same parameters and catalog) return
+    the existing job. Jobs live in the submitting server process; with several gunicorn workers,
+    route /api/jobs to one of them or poll with sticky sessions. With an access_windows
+    AccessWindowCache, epochs inside its horizon are pre-filtered here by interval lookup
+    (objects entering within lead_seconds included) instead of by a catalog propagation per step.
+    """
+
+    def __init__(self, satellites, max_workers=JOB_MAX_WORKERS, history=JOB_HISTORY,
+                 access_windows=None, lead_seconds=ACCESS_LEAD_SECONDS):
+        self.satellites = satellites; self.access_windows = access_windows; self.lead_seconds = lead_seconds
+        self._elements = {name: satrec_elements(sat) for name, sat in satellites.items()}
+        self.catalog_tag = hashlib.sha1(json.dumps(sorted(self._elements.items())).encode()).hexdigest()
+        self.max_workers = max_workers; self.history = history
+        self._pool = None; self._lock = threading.Lock()
+        self._jobs = OrderedDict(); self._by_hash = {}
+
+    def _executor(self):
+        if self._pool is None:
+            shared_path = getattr(self.satellites, "path", None)   # shared_catalog.SharedSatellites
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=worker_context(),
+                                             initializer=_init_worker,
+                                             initargs=(shared_path, None if shared_path else self._elements))
+        return self._pool
+
+    def param_hash(self, params):
+        canonical = json.dumps(params, sort_keys=True, default=_json_default)
+        return hashlib.sha1(f"{self.catalog_tag}|{canonical}".encode()).hexdigest()
+
+    def submit(self, params):
+        """Returns (job, cached): the existing job for identical parameters, or a newly queued one."""
+        params = dict(params, end=params.get("end") or params["start"])
+        if params.get("firs"): params["firs"] = sorted(set(params["firs"]))
+        key = self.param_hash(params)
+        with self._lock:
+            existing = self._jobs.get(self._by_hash.get(key))
+            if existing is not None and existing.status != "failed":
+                return existing, True
+            step = timedelta(minutes=params["step_minutes"])
+            steps = []; t = params["start"]
+            while t <= params["end"]:
+                steps.append(t); t += step
+            job = Job(uuid.uuid4().hex, json.loads(json.dumps(params, default=_json_default)), key, steps)
+            self._jobs[job.job_id] = job; self._by_hash[key] = job.job_id
+            self._evict()
+            pool = self._executor()
+        access = self.access_windows.get() if self.access_windows is not None else None
+        for index, analysis_time in enumerate(steps):
+            future = pool.submit(_run_step, analysis_time, params.get("firs"), params.get("min_risk"),
+                                 params["screening"], params["monte_carlo"], params["formation_policy"],
+                                 self._candidates(access, analysis_time))
+            future.add_done_callback(lambda f, index=index: self._step_done(job, index, f))
+        return job, False
+
+    def _candidates(self, access, analysis_time):
+        """Names over the FIRs during [analysis_time, + lead_seconds], or None outside the indexed horizon."""
+        if access is None or not access.covers(analysis_time, analysis_time + timedelta(seconds=self.lead_seconds)):
+            return None
+        return list(filter_satellites_by_fir(self.satellites, analysis_time, access, self.lead_seconds))
+
+    def _step_done(self, job, index, future):
+        with self._lock:
+            if job.finished: return
+            error = future.exception()
+            if error is not None:
+                job.status = "failed"; job.error = str(error); job.finished_at = datetime.now(UTC)
+                return
+            job.results[index] = future.result(); job.steps_done += 1
+            job.status = "done" if job.steps_done == len(job.steps) else "running"
+            if job.status == "done": job.finished_at = datetime.now(UTC)
+
+    def _evict(self):
+        finished = [j for j in self._jobs.values() if j.finished]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.job_id]
+            if self._by_hash.get(job.param_hash) == job.job_id: del self._by_hash[job.param_hash]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,112 @@
+# live_updates.py - Server-Sent Events fan-out of snapshot diffs to subscribed viewers
+
+# 1. Imports and Setup
+import json
+import os
+import queue
+import threading
+
+from marshmallow import Schema, fields, validate
+
+from snapshot import filter_changes, changes_body
+
+SUBSCRIBER_QUEUE_SIZE = 16        # Pending messages per viewer before it is considered too slow
+KEEPALIVE_SECONDS = 15.0          # Comment line sent on idle streams so proxies keep them open
+MAX_SUBSCRIBERS = int(os.getenv("MAX_STREAM_SUBSCRIBERS", "500"))
+
+
+# --- 2. Marshmallow Schemas ---
+
+class RiskEventStreamQuerySchema(Schema):
+    """Query parameters for /api/risk-events/stream."""
+    since = fields.Int(load_default=None, validate=validate.Range(min=0),
+                       metadata={"description": "Snapshot version already held; the Last-Event-ID header takes precedence."})
+    fir = fields.Str(load_default=None, metadata={"description": "Only push changes for events in this FIR."})
+    norad_id = fields.Int(load_default=None, metadata={"description": "Only push changes involving this NORAD ID."})
+
+
+# --- 3. SSE Encoding ---
+
+def sse_message(data, event="changes", event_id=None):
+    """One text/event-stream frame; event_id lets a reconnecting EventSource resume via Last-Event-ID."""
+    lines = [f"event: {event}"]
+    if event_id is not None: lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+# --- 4. Broadcaster ---
+
+class Subscription:
+    def __init__(self, fir=None, norad_id=None):
+        self.filter_key = (fir, norad_id)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+class ChangeBroadcaster:
+    """
+    Registered as a SnapshotCache listener: every published diff is filtered and serialized once
+    per distinct (fir, norad_id) subscription filter, and the encoded frame is queued to every
+    viewer sharing that filter, so one analysis run fans out at the cost of a few queue puts.
+    A viewer whose queue is full is dropped; its EventSource reconnects with Last-Event-ID and
+    catches up from the diff ring buffer.
+    """
+
+    def __init__(self, snapshots, serialize):
+        self.snapshots = snapshots; self.serialize = serialize   # serialize(body dict) -> JSON-ready dict
+        self._subscribers = set(); self._lock = threading.Lock()
+        snapshots.add_listener(self.on_publish)
+
+    def subscribe(self, fir=None, norad_id=None):
+        """Returns a Subscription, or None when MAX_SUBSCRIBERS viewers are already connected."""
+        with self._lock:
+            if len(self._subscribers) >= MAX_SUBSCRIBERS: return None
+            sub = Subscription(fir, norad_id); self._subscribers.add(sub)
+            # Pushing only makes sense while the analysis keeps running without incoming polls
+            self.snapshots.start_refresher()
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.closed = True
+        with self._lock:
+            self._subscribers.discard(sub)
+            # The last viewer left: polls alone drive the analysis again
+            if not self._subscribers: self.snapshots.stop_refresher()
+
+    def on_publish(self, previous_version, snapshot, diff):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers: return
+        reset = diff is None
+        if reset: diff = {"added": snapshot.events, "updated": [], "removed": []}
+        frames = {}
+        for sub in subscribers:
+            if sub.filter_key not in frames:
+                fir, norad_id = sub.filter_key
+                changes = filter_changes(diff, fir, norad_id)
+                # Nothing this filter cares about changed: send nothing (keepalives cover idle streams)
+                frames[sub.filter_key] = None if not reset and not any(changes.values()) else sse_message(
+                    self.serialize(changes_body(previous_version, snapshot, changes, reset)), event_id=snapshot.version)
+            frame = frames[sub.filter_key]
+            if frame is None: continue
+            try:
+                sub.queue.put_nowait((snapshot.version, frame))
+            except queue.Full:
+                print("[-] WARNING: Dropping a slow live-update subscriber.")
+                self.unsubscribe(sub)
+
+    def stream(self, sub, initial_frame, initial_version):
+        """
+        Generator for a streaming Response: the catch-up frame, then pushed diffs and keepalives.
+        Diffs already covered by the catch-up frame (published while subscribing) are skipped.
+        """
+        try:
+            yield initial_frame
+            while not sub.closed:
+                try:
+                    version, frame = sub.queue.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield b": keepalive\n\n"; continue
+                if version > initial_version: yield frame
+        finally:
+            self.unsubscribe(sub)
@@ -0,0 +1,155 @@
+# monte_carlo.py - Monte Carlo TLE-uncertainty sampling for high-risk conjunction events
+
+# 1. Imports and Setup
+from concurrent.futures import ProcessPoolExecutor
+import os
+import threading
+import numpy as np
+from sgp4.api import Satrec, SatrecArray, WGS72
+
+from collision_probability import (
+    TLE_SIGMA_AT_EPOCH_KM, TLE_SIGMA_GROWTH_KM_PER_DAY, hard_body_radius_km, tle_age_days
+)
+from process_pool import worker_context
+
+# Only events at or above this risk score are sampled, so cost stays bounded
+MC_RISK_THRESHOLD = float(os.getenv("MC_RISK_THRESHOLD", "0.8"))
+MC_SAMPLES = int(os.getenv("MC_SAMPLES", "2000"))          # Perturbed element sets per object
+MC_MAX_EVENTS = int(os.getenv("MC_MAX_EVENTS", "20"))      # Highest-risk events sampled per run
+MC_MAX_WORKERS = int(os.getenv("MC_MAX_WORKERS", "0")) or None  # None = one per CPU
+MC_ENABLED = os.getenv("MC_ENABLED", "0") == "1"
+
+_SGP4_EPOCH_JD = 2433281.5     # sgp4init epochs are days since 1949 December 31 00:00 UT
+_TCA_WINDOW_STEPS = 21         # Time samples around the nominal TCA per perturbed pair
+_MAX_TCA_SHIFT_S = 120.0
+
+_POOL = None; _POOL_LOCK = threading.Lock()   # One sampling pool per process, started on first use
+
+
+# --- 2. Element Handling ---
+
+def satrec_elements(sat):
+    """Mean elements of a Satrec as a plain (picklable) tuple in sgp4init argument order."""
+    epoch = (sat.jdsatepoch - _SGP4_EPOCH_JD) + sat.jdsatepochF
+    return (sat.satnum, epoch, sat.bstar, sat.ndot, sat.nddot, sat.ecco,
+            sat.argpo, sat.inclo, sat.mo, sat.no_kozai, sat.nodeo)
+
+def satrec_from_elements(elements):
+    """Rebuilds a Satrec from satrec_elements() output (e.g. inside a worker process)."""
+    sat = Satrec()
+    sat.sgp4init(WGS72, 'i', *elements)
+    return sat
+
+def _element_sigmas(elements):
+    """
+    Maps the default RIC position sigmas onto mean-element sigmas: radial -> eccentricity,
+    in-track -> mean anomaly (plus mean motion for the growth with TLE age), cross-track ->
+    inclination and RAAN. The mean-motion sigma makes the in-track spread grow with TLE age
+    at the same rate as the default covariance model.
+    """
+    no_kozai = elements[9]                            # rad/min
+    a_km = (398600.4418 / (no_kozai / 60.0) ** 2) ** (1.0 / 3.0)
+    sigma_r, sigma_i, sigma_c = TLE_SIGMA_AT_EPOCH_KM
+    growth_i = TLE_SIGMA_GROWTH_KM_PER_DAY[1]
+    return {
+        "ecco": sigma_r / a_km, "mo": sigma_i / a_km,
+        "inclo": sigma_c / a_km, "nodeo": sigma_c / a_km,
+        # In-track drift of growth_i km/day from a mean-motion error of dn rad/min: dn*1440*a
+        "no_kozai": growth_i / (1440.0 * a_km),
+    }
+
+def _perturbed_array(elements, n_samples, rng):
+    """Builds a SatrecArray of n_samples copies of the object with Gaussian element perturbations."""
+    satnum, epoch, bstar, ndot, nddot, ecco, argpo, inclo, mo, no_kozai, nodeo = elements
+    sig = _element_sigmas(elements)
+    d_ecco = rng.normal(0.0, sig["ecco"], n_samples); d_mo = rng.normal(0.0, sig["mo"], n_samples)
+    d_inc = rng.normal(0.0, sig["inclo"], n_samples); d_node = rng.normal(0.0, sig["nodeo"], n_samples)
+    d_no = rng.normal(0.0, sig["no_kozai"], n_samples)
+    satrecs = []
+    for k in range(n_samples):
+        s = Satrec()
+        s.sgp4init(WGS72, 'i', satnum, epoch, bstar, ndot, nddot,
+                   min(max(ecco + d_ecco[k], 0.0), 0.999), argpo, inclo + d_inc[k],
+                   mo + d_mo[k], no_kozai + d_no[k], nodeo + d_node[k])
+        satrecs.append(s)
+    return SatrecArray(satrecs)
+
+
+# --- 3. Per-Event Sampling (runs in worker processes) ---
+
+def sample_encounter(task):
+    """
+    Propagates n_samples perturbed copies of both objects over a short window around the nominal
+    TCA and returns the miss-distance distribution and empirical Pc for one encounter.
+    task = (elements1, elements2, jd, fr, age1_days, age2_days, hbr_km, rel_speed_km_s, n_samples, seed)
+    """
+    elements1, elements2, jd, fr, age1, age2, hbr_km, rel_speed, n_samples, seed = task
+    rng = np.random.default_rng(seed)
+    arr1 = _perturbed_array(elements1, n_samples, rng)
+    arr2 = _perturbed_array(elements2, n_samples, rng)
+
+    # Window wide enough for a 3-sigma in-track shift to move the TCA
+    sigma_i = TLE_SIGMA_AT_EPOCH_KM[1] + TLE_SIGMA_GROWTH_KM_PER_DAY[1] * max(abs(age1), abs(age2))
+    half_window_s = min(_MAX_TCA_SHIFT_S, 3.0 * sigma_i / max(rel_speed, 0.01) + 1.0)
+    offsets_s = np.linspace(-half_window_s, half_window_s, _TCA_WINDOW_STEPS)
+    step_s = offsets_s[1] - offsets_s[0]
+    jd_t = np.full(offsets_s.shape, jd); fr_t = fr + offsets_s / 86400.0
+
+    e1, r1, v1 = arr1.sgp4(jd_t, fr_t); e2, r2, v2 = arr2.sgp4(jd_t, fr_t)
+    dr = r2 - r1; dv = v2 - v1
+    # Linearized closest approach within +/- half a step of every sample
+    dv2 = np.maximum(np.einsum('ntk,ntk->nt', dv, dv), 1e-12)
+    tau = np.clip(-np.einsum('ntk,ntk->nt', dr, dv) / dv2, -step_s / 2.0, step_s / 2.0)
+    dist = np.linalg.norm(dr + dv * tau[:, :, np.newaxis], axis=2)
+    dist[(e1 != 0) | (e2 != 0)] = np.inf
+    miss = dist.min(axis=1)
+    miss = miss[np.isfinite(miss)]
+    if miss.size == 0: return None
+
+    p5, p50, p95 = np.percentile(miss, [5, 50, 95])
+    return {
+        "samples": int(miss.size), "miss_mean_km": float(miss.mean()), "miss_std_km": float(miss.std()),
+        "miss_min_km": float(miss.min()), "miss_p05_km": float(p5), "miss_p50_km": float(p50),
+        "miss_p95_km": float(p95), "empirical_pc": float(np.mean(miss < hbr_km))
+    }
+
+
+# --- 4. Event Selection and Dispatch ---
+
+def _sampling_pool(max_workers):
+    """Long-lived process pool for sampling (never forked from the threaded server; see process_pool.py)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=max_workers, mp_context=worker_context())
+        return _POOL
+
+def run_monte_carlo(events, satellites, jd, fr, threshold=MC_RISK_THRESHOLD, n_samples=MC_SAMPLES,
+                    max_events=MC_MAX_EVENTS, max_workers=MC_MAX_WORKERS):
+    """
+    Adds a 'monte_carlo' summary to every event whose risk_score >= threshold (at most max_events,
+    highest risk first). Events are dicts with satellite1/satellite2/relative_velocity_km_s as
+    produced by run_full_risk_analysis; satellites maps their names to Satrec objects.
+    Sampling is spread across a process pool shared by every run. Returns the number of events sampled.
+    """
+    selected = sorted((e for e in events if e["risk_score"] >= threshold),
+                      key=lambda e: e["risk_score"], reverse=True)[:max_events]
+    if not selected: return 0
+
+    tasks = []
+    for event in selected:
+        sat1, sat2 = satellites[event["satellite1"]], satellites[event["satellite2"]]
+        hbr = hard_body_radius_km(event["satellite1"]) + hard_body_radius_km(event["satellite2"])
+        seed = (sat1.satnum * 100003 + sat2.satnum) % (2**32)
+        tasks.append((satrec_elements(sat1), satrec_elements(sat2), jd, fr,
+                      tle_age_days(sat1, jd, fr), tle_age_days(sat2, jd, fr), hbr,
+                      event["relative_velocity_km_s"], n_samples, seed))
+
+    if len(tasks) == 1:
+        results = [sample_encounter(tasks[0])]
+    else:
+        results = list(_sampling_pool(max_workers).map(sample_encounter, tasks))
+
+    for event, result in zip(selected, results):
+        if result is not None: event["monte_carlo"] = result
+    return len(selected)
@@ -0,0 +1,164 @@
+# positions.py - Packed, quantized whole-catalog sub-satellite points for map rendering
+
+# 1. Imports and Setup
+from datetime import datetime, UTC
+import os
+import struct
+import threading
+import numpy as np
+
+from marshmallow import Schema, fields, validate, validates, ValidationError
+
+from propagation import get_vector_catalog, datetime_to_jd
+from frames import teme_to_geodetic
+
+POSITIONS_STEP_SECONDS = float(os.getenv("POSITIONS_STEP_SECONDS", "5"))   # Requests within one step share a propagation
+LOD_PIXELS = 4           # Level of detail: at most one object per LOD_PIXELS x LOD_PIXELS screen cell
+TILE_PIXELS = 256        # Web-map tile size: the world is 256 * 2^zoom pixels wide
+ALT_SCALE = 10.0         # Altitude quantum: 0.1 km (uint16 covers 0 - 6553.5 km)
+
+# Frame layout (little-endian): header, then [index column], lat, lon, alt columns of `count` values
+FRAME_MAGIC = b"LEOP"
+FRAME_VERSION = 1
+FLAG_INDEX = 1           # An index column (catalog positions) precedes lat; absent = whole catalog in order
+FLAG_INDEX_U32 = 2       # Index column is uint32 instead of uint16 (catalogs above 65535 objects)
+_HEADER = struct.Struct("<4sBBHIId")   # magic, version, flags, reserved, count, catalog version, epoch (unix s)
+
+
+# --- 2. Marshmallow Schemas ---
+
+class PositionsQuerySchema(Schema):
+    """Query parameters for /api/positions."""
+    bbox = fields.Str(load_default=None, metadata={"description": "min_lon,min_lat,max_lon,max_lat (min_lon > max_lon wraps the antimeridian)."})
+    zoom = fields.Int(load_default=None, validate=validate.Range(min=0, max=22),
+                      metadata={"description": "Map zoom level; thins to one object per few screen pixels. Omit for every object."})
+
+    @validates("bbox")
+    def _validate_bbox(self, value, **kwargs):
+        if value is None: return
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(x) for x in value.split(","))
+        except ValueError:
+            raise ValidationError("bbox must be 'min_lon,min_lat,max_lon,max_lat'.")
+        if min_lat > max_lat: raise ValidationError("bbox min_lat must not exceed max_lat.")
+
+class PositionsIndexSchema(Schema):
+    catalog_version = fields.Int(required=True, metadata={"description": "Matches the frame header; refetch the index when it changes."})
+    norad_ids = fields.List(fields.Int(), required=True, metadata={"description": "NORAD ID of each catalog position."})
+    names = fields.List(fields.Str(), required=True)
+
+
+# --- 3. Quantization ---
+
+def quantize(lat, lon, alt):
+    """Degrees / km -> int16 lat (90/32767 deg), int16 lon (180/32767 deg), uint16 alt (0.1 km)."""
+    q_lat = np.round(np.asarray(lat) * (32767.0 / 90.0)).astype("<i2")
+    q_lon = np.round(np.asarray(lon) * (32767.0 / 180.0)).astype("<i2")
+    q_alt = np.round(np.clip(np.asarray(alt), 0.0, 65535.0 / ALT_SCALE) * ALT_SCALE).astype("<u2")
+    return q_lat, q_lon, q_alt
+
+def dequantize(q_lat, q_lon, q_alt):
+    return q_lat * (90.0 / 32767.0), q_lon * (180.0 / 32767.0), q_alt / ALT_SCALE
+
+def pack_frame(epoch, catalog_version, lat, lon, alt, index=None, n_catalog=0):
+    """Binary frame: header plus quantized columns (an index column only when thinned or clipped)."""
+    flags = 0; parts = []
+    if index is not None:
+        wide = n_catalog > 65535
+        flags = FLAG_INDEX | (FLAG_INDEX_U32 if wide else 0)
+        parts.append(np.asarray(index).astype("<u4" if wide else "<u2").tobytes())
+    parts.extend(column.tobytes() for column in quantize(lat, lon, alt))
+    return _HEADER.pack(FRAME_MAGIC, FRAME_VERSION, flags, 0, len(lat), catalog_version, epoch) + b"".join(parts)
+
+def unpack_frame(body):
+    """Inverse of pack_frame (for tests and Python clients): dict of header fields and float columns."""
+    magic, version, flags, _, count, catalog_version, epoch = _HEADER.unpack_from(body)
+    offset = _HEADER.size; index = None
+    if flags & FLAG_INDEX:
+        dtype = "<u4" if flags & FLAG_INDEX_U32 else "<u2"
+        index = np.frombuffer(body, dtype, count, offset); offset += index.nbytes
+    columns = []
+    for dtype in ("<i2", "<i2", "<u2"):
+        columns.append(np.frombuffer(body, dtype, count, offset)); offset += 2 * count
+    lat, lon, alt = dequantize(*columns)
+    return {"version": version, "catalog_version": catalog_version, "epoch": epoch, "index": index,
+            "lat": lat, "lon": lon, "alt_km": alt}
+
+
+# --- 4. Level of Detail ---
+
+def select_positions(lat, lon, ok, bbox=None, zoom=None):
+    """
+    Catalog positions to send: valid objects inside bbox, then (with zoom) the first object of
+    every LOD_PIXELS-pixel cell at that zoom, so dense regions cost no more than the screen shows.
+    """
+    keep = ok.copy()
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = (float(x) for x in bbox.split(","))
+        keep &= (lat >= min_lat) & (lat <= max_lat)
+        if min_lon <= max_lon: keep &= (lon >= min_lon) & (lon <= max_lon)
+        else: keep &= (lon >= min_lon) | (lon <= max_lon)
+    chosen = np.flatnonzero(keep)
+    if zoom is not None and len(chosen):
+        cell_deg = 360.0 / (TILE_PIXELS * 2 ** zoom) * LOD_PIXELS
+        n_lon = int(np.ceil(360.0 / cell_deg))
+        cells = (np.floor((lat[chosen] + 90.0) / cell_deg).astype(np.int64) * n_lon
+                 + np.floor((lon[chosen] + 180.0) / cell_deg).astype(np.int64))
+        _, first = np.unique(cells, return_index=True)
+        chosen = chosen[np.sort(first)]
+    return chosen
+
+
+# --- 5. Cached Frames ---
+
+def sub_satellite_points(satellites, t, ephemeris=None):
+    """(lat, lon, alt_km, ok) of every catalog object at t, in catalog order, from one batched propagation."""
+    jd, fr = datetime_to_jd(t)
+    states = ephemeris.states_at(t) if ephemeris is not None else None
+    if states is not None:
+        r, _, ok = states
+    else:
+        r, _, ok = get_vector_catalog(satellites).propagate(jd, fr); r = r[:, 0, :]; ok = ok[:, 0]
+    lat, lon, alt = teme_to_geodetic(r, jd, fr)
+    return lat, lon, alt, ok & np.isfinite(lat) & np.isfinite(alt)
+
+class PositionFeed:
+    """
+    Sub-satellite points of the whole catalog, recomputed at most once per POSITIONS_STEP_SECONDS
+    (one batched propagation, or an ephemeris-grid interpolation when one is given) and shared
+    by every request in that step.
+    """
+
+    def __init__(self, satellites, ephemeris=None, step_seconds=POSITIONS_STEP_SECONDS):
+        self.satellites = satellites; self.ephemeris = ephemeris; self.step_seconds = step_seconds
+        self._lock = threading.Lock(); self._frame = None
+
+    @property
+    def catalog_version(self):
+        """32-bit catalog content hash written into every frame header."""
+        return get_vector_catalog(self.satellites).version
+
+    def current(self, now=None):
+        """(epoch, lat, lon, alt_km, ok) for the current step, all in catalog order."""
+        now = (now or datetime.now(UTC)).timestamp()
+        epoch = now // self.step_seconds * self.step_seconds
+        with self._lock:
+            catalog = get_vector_catalog(self.satellites)
+            if self._frame is not None and self._frame[0] == epoch and len(self._frame[1]) == len(catalog):
+                return self._frame
+            t = datetime.fromtimestamp(epoch, UTC)
+            self._frame = (epoch,) + sub_satellite_points(self.satellites, t, self.ephemeris)
+            return self._frame
+
+    def frame_body(self, frame, bbox=None, zoom=None):
+        """Packed body of a frame from current(); the whole catalog in order is sent without an index column."""
+        epoch, lat, lon, alt, ok = frame
+        chosen = select_positions(lat, lon, ok, bbox, zoom)
+        if len(chosen) == len(lat):
+            return pack_frame(epoch, self.catalog_version, lat, lon, alt)
+        return pack_frame(epoch, self.catalog_version, lat[chosen], lon[chosen], alt[chosen],
+                                 index=chosen, n_catalog=len(lat))
+
+    def index_body(self):
+        catalog = get_vector_catalog(self.satellites)
+        return {"catalog_version": self.catalog_version, "norad_ids": catalog.norad_ids.tolist(), "names": catalog.names}
@@ -0,0 +1,20 @@
+# process_pool.py - Start method for the process pools run inside the (multi-threaded) server
+
+# 1. Imports and Setup
+import multiprocessing
+import os
+
+# Workers never fork the threaded server process (a forked copy can inherit locks held by other threads)
+JOB_START_METHOD = os.getenv("JOB_START_METHOD",
+                             "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+# Modules every pool worker needs; the fork server imports them once instead of the parent's __main__
+WORKER_PRELOAD = ["jobs", "risk_analyzer"]
+
+
+# --- 2. Context ---
+
+def worker_context():
+    """multiprocessing context for ProcessPoolExecutor(mp_context=...) in server-side pools."""
+    context = multiprocessing.get_context(JOB_START_METHOD)
+    if JOB_START_METHOD == "forkserver": context.set_forkserver_preload(WORKER_PRELOAD)
+    return context
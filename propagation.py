@@ -0,0 +1,127 @@
+# propagation.py - Batched SGP4 propagation helpers shared by the screening modules
+
+# 1. Imports and Setup
+from sgp4.api import SatrecArray, jday
+from datetime import timedelta
+from collections import OrderedDict
+from functools import cached_property
+import hashlib
+import os
+import threading
+import numpy as np
+
+# Small LRU of vectorized catalogs by content (catalog_tag). Lookups go by the identity of the
+# {name: Satrec} dict first; each entry holds that dict, so its id cannot be reused while cached.
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "4"))
+_CATALOG_CACHE = OrderedDict()   # catalog_tag -> VectorCatalog
+_CATALOG_BY_ID = OrderedDict()   # id(satellites) -> (satellites, catalog_tag)
+_CATALOG_LOCK = threading.Lock()
+
+
+# --- 2. Time Helpers ---
+
+def datetime_to_jd(t):
+    """Splits a datetime into the (jd, fr) Julian date pair expected by SGP4."""
+    return jday(t.year, t.month, t.day, t.hour, t.minute, t.second + t.microsecond / 1e6)
+
+def time_grid(start, end, step_seconds):
+    """
+    Builds a uniform time grid from start to end (inclusive of start).
+    Returns (times, jd, fr) where jd/fr are NumPy arrays ready for SatrecArray.sgp4.
+    """
+    total_seconds = max(0.0, (end - start).total_seconds())
+    offsets = np.arange(0.0, total_seconds + 1e-9, step_seconds)
+    jd0, fr0 = datetime_to_jd(start)
+    jd = np.full(offsets.shape, jd0)
+    fr = fr0 + offsets / 86400.0
+    times = [start + timedelta(seconds=float(s)) for s in offsets]
+    return times, jd, fr
+
+
+# --- 3. Vectorized Catalog ---
+
+class VectorCatalog:
+    """
+    Column view of a {name: Satrec} catalog: names, NORAD IDs, per-object elements and
+    a SatrecArray so the whole catalog propagates in a single C call.
+    """
+
+    def __init__(self, satellites, tag=None):
+        if tag: self.tag = tag
+        self.names = list(satellites.keys())
+        self.satrecs = [satellites[name] for name in self.names]
+        self.array = SatrecArray(self.satrecs)
+        # A shared_catalog.SharedSatellites carries its columns memory-mapped: reuse them as-is
+        columns = getattr(satellites, "columns", None)
+        if columns is not None:
+            self.norad_ids = columns["norad_ids"]
+            self.perigee_km = columns["perigee_km"]; self.apogee_km = columns["apogee_km"]
+        else:
+            self.norad_ids = np.array([sat.satnum for sat in self.satrecs], dtype=np.int64)
+            radius = np.array([sat.radiusearthkm for sat in self.satrecs])
+            # Perigee / apogee altitudes (km); used for cheap radial-shell overlap filters.
+            self.perigee_km = np.array([sat.altp for sat in self.satrecs]) * radius
+            self.apogee_km = np.array([sat.alta for sat in self.satrecs]) * radius
+        self.index_by_norad = {int(n): i for i, n in enumerate(self.norad_ids)}
+
+    def __len__(self):
+        return len(self.names)
+
+    @cached_property
+    def tag(self):
+        """catalog_tag of the catalog, unless given at construction."""
+        return catalog_tag(dict(zip(self.names, self.satrecs)))
+
+    @cached_property
+    def version(self):
+        """32-bit content hash of the catalog (see catalog_tag), for keying caches and payloads built from it."""
+        return int(self.tag[:8], 16)
+
+    def propagate(self, jd, fr, indices=None):
+        """
+        Propagates the catalog (or the subset given by indices) at every (jd, fr) sample.
+        Returns r (N, T, 3), v (N, T, 3) in TEME km and km/s, and an ok mask (N, T).
+        """
+        jd = np.atleast_1d(np.asarray(jd, dtype=float))
+        fr = np.atleast_1d(np.asarray(fr, dtype=float))
+        if indices is None:
+            array = self.array
+        else:
+            array = SatrecArray([self.satrecs[i] for i in indices])
+        e, r, v = array.sgp4(jd, fr)
+        return r, v, e == 0
+
+
+def catalog_tag(satellites):
+    """Content hash of a {name: Satrec} catalog in iteration order (same TLEs, same order, same tag)."""
+    digest = hashlib.sha1()
+    for name, sat in satellites.items():
+        digest.update(f"{name}|{sat.satnum}|{sat.jdsatepoch!r}|{sat.jdsatepochF!r}|{sat.no_kozai!r}|{sat.ecco!r}|"
+                      f"{sat.inclo!r}|{sat.nodeo!r}|{sat.argpo!r}|{sat.mo!r}|{sat.bstar!r}\n".encode())
+    return digest.hexdigest()
+
+def get_vector_catalog(satellites):
+    """
+    Returns the cached VectorCatalog for this satellites dict, building it on first use. A dict
+    not seen before is hashed (catalog_tag), so equal catalogs share one VectorCatalog; a known
+    dict whose size changed is hashed again.
+    """
+    with _CATALOG_LOCK:
+        seen = _CATALOG_BY_ID.get(id(satellites))
+        if seen is not None and seen[0] is satellites:
+            cached = _CATALOG_CACHE.get(seen[1])
+            if cached is not None and len(cached) == len(satellites):
+                _CATALOG_BY_ID.move_to_end(id(satellites)); _CATALOG_CACHE.move_to_end(seen[1])
+                return cached
+    tag = catalog_tag(satellites)
+    with _CATALOG_LOCK:
+        cached = _CATALOG_CACHE.get(tag)
+    if cached is None:
+        cached = VectorCatalog(satellites, tag)
+    with _CATALOG_LOCK:
+        cached = _CATALOG_CACHE.setdefault(tag, cached)
+        _CATALOG_CACHE.move_to_end(tag)
+        _CATALOG_BY_ID[id(satellites)] = (satellites, tag); _CATALOG_BY_ID.move_to_end(id(satellites))
+        while len(_CATALOG_CACHE) > CATALOG_CACHE_SIZE: _CATALOG_CACHE.popitem(last=False)
+        while len(_CATALOG_BY_ID) > CATALOG_CACHE_SIZE: _CATALOG_BY_ID.popitem(last=False)
+    return cached
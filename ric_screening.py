@@ -0,0 +1,172 @@
+# ric_screening.py - Batched RIC-frame ellipsoidal keep-out screening of candidate pairs
+
+# 1. Imports and Setup
+import os
+import threading
+import numpy as np
+from sgp4.api import SatrecArray
+
+from frames import to_ric
+
+# Keep-out ellipsoid semi-axes (km) in the primary's radial / in-track / cross-track frame.
+# Radial separation is tightly constrained; in-track and cross-track tolerate more.
+RIC_KEEP_OUT_KM = tuple(float(x) for x in os.getenv("RIC_KEEP_OUT_KM", "1,25,25").split(","))
+
+# Neighbor-list reuse ("verlet" screening): a candidate list built with a skin margin stays valid
+# for this many seconds either side of its build epoch.
+VERLET_REUSE_SECONDS = float(os.getenv("VERLET_REUSE_SECONDS", "30"))
+MAX_REL_ACCEL_KM_S2 = 0.02     # Bound on relative acceleration of two LEO objects (as in conjunction_screening)
+MAX_ORBITAL_SPEED_KM_S = 11.2  # Escape speed; faster SGP4 states are numerically broken (decayed) objects
+
+
+# --- 2. Screening Functions ---
+
+def ellipsoid_metric(ric, radii_km=RIC_KEEP_OUT_KM):
+    """(R/a)^2 + (I/b)^2 + (C/c)^2 for RIC offsets of shape (..., 3); <= 1 means inside."""
+    return np.sum((np.asarray(ric) / np.asarray(radii_km, dtype=float)) ** 2, axis=-1)
+
+def pairs_within_distance(r, cutoff_km, ok=None, pair_filter=None):
+    """
+    Sweep-and-prune along x: after sorting positions by x, the k-th neighbour in sorted order is
+    compared for every object at once, for k = 1, 2, ... until no slab of width cutoff_km holds
+    k+1 objects. Each sweep is one O(N) vectorized pass. Returns an (M, 2) array of index pairs
+    (i < j) whose Euclidean separation is <= cutoff_km. pair_filter(a, b, dist2), if given,
+    further masks the close pairs of each sweep before they are kept.
+    """
+    r = np.asarray(r, dtype=float)
+    if ok is not None:
+        idx = np.nonzero(ok)[0]
+    else:
+        idx = np.arange(len(r))
+    order = idx[np.argsort(r[idx, 0], kind='stable')]
+    xs = r[order, 0]
+    cutoff2 = cutoff_km ** 2
+    found = []
+    for k in range(1, len(order)):
+        in_slab = (xs[k:] - xs[:-k]) <= cutoff_km
+        if not in_slab.any(): break
+        a = order[:-k][in_slab]; b = order[k:][in_slab]
+        d = r[b] - r[a]
+        d2 = np.einsum('pk,pk->p', d, d)
+        close = d2 <= cutoff2
+        if pair_filter is not None and close.any():
+            close[close] = pair_filter(a[close], b[close], d2[close])
+        if close.any():
+            found.append(np.stack([np.minimum(a[close], b[close]), np.maximum(a[close], b[close])], axis=1))
+    if not found: return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(found).astype(np.int64)
+
+def ric_candidate_pairs(r, v, ok=None, radii_km=RIC_KEEP_OUT_KM):
+    """
+    Finds every pair (i, j), i < j, whose secondary j lies inside the keep-out ellipsoid centred
+    on primary i, given (N, 3) TEME positions/velocities at one epoch. A sweep-and-prune pass on
+    the largest semi-axis yields the few nearby pairs, which are then rotated into the primary's
+    RIC frame and tested against the ellipsoid in one batch.
+    Returns an (M, 2) int array of pair indices.
+    """
+    r = np.asarray(r, dtype=float); v = np.asarray(v, dtype=float)
+    near = pairs_within_distance(r, float(np.max(radii_km)), ok=ok)
+    if len(near) == 0: return near
+    ric = to_ric(r[near[:, 0]], v[near[:, 0]], r[near[:, 1]] - r[near[:, 0]])
+    return near[ellipsoid_metric(ric, radii_km) <= 1.0]
+
+def screen_satellites_ric(satrecs, jd, fr, radii_km=RIC_KEEP_OUT_KM):
+    """Propagates a list of Satrec objects once at (jd, fr) and returns their RIC candidate pairs."""
+    if len(satrecs) < 2: return np.empty((0, 2), dtype=np.int64)
+    e, r, v = SatrecArray(satrecs).sgp4(np.array([jd]), np.array([fr]))
+    return ric_candidate_pairs(r[:, 0, :], v[:, 0, :], ok=e[:, 0] == 0, radii_km=radii_km)
+
+
+# --- 3. Neighbor-List Reuse ---
+
+class VerletNeighborList:
+    """
+    Verlet-style candidate list for consecutive screening epochs. At build time the sweep keeps
+    every pair within cutoff + skin, with skin = max relative speed x reuse interval T plus an
+    acceleration term, then tightens it per pair: a pair stays only if its linearized closest
+    approach within +/- T seconds, less the acceleration drift a T^2 / 2, reaches the cutoff.
+    Epochs within T of the build (same catalog) only propagate the objects on the list and
+    re-test its pairs, instead of propagating and sweeping the whole catalog.
+    """
+
+    def __init__(self, cutoff_km=max(RIC_KEEP_OUT_KM), reuse_seconds=VERLET_REUSE_SECONDS,
+                 max_rel_accel=MAX_REL_ACCEL_KM_S2):
+        self.cutoff_km = cutoff_km; self.reuse_seconds = reuse_seconds; self.max_rel_accel = max_rel_accel
+        self.key = None; self.built_at = None
+        self.members = None; self.local_pairs = None; self.array = None
+        self.builds = 0; self.reuses = 0
+        self.lock = threading.Lock()
+
+    def valid_for(self, key, t_seconds):
+        return (self.members is not None and key == self.key
+                and abs(t_seconds - self.built_at) <= self.reuse_seconds)
+
+    def rebuild(self, key, satrecs, r, v, ok, t_seconds):
+        """Builds the list from full-catalog states (N, 3) at absolute time t_seconds."""
+        t = self.reuse_seconds
+        drift = 0.5 * self.max_rel_accel * t**2
+        v_max = 2.0 * float(np.linalg.norm(v[ok], axis=1).max()) if ok.any() else 0.0
+
+        def reachable(a, b, dist2):
+            dr = r[b] - r[a]; dw = v[b] - v[a]
+            dw2 = np.maximum(np.einsum('pk,pk->p', dw, dw), 1e-12)
+            tau = np.clip(-np.einsum('pk,pk->p', dr, dw) / dw2, -t, t)
+            return np.linalg.norm(dr + dw * tau[:, np.newaxis], axis=1) - drift <= self.cutoff_km
+
+        pairs = pairs_within_distance(r, self.cutoff_km + v_max * t + drift, ok=ok, pair_filter=reachable)
+        self.members, self.local_pairs = np.unique(pairs, return_inverse=True)
+        self.local_pairs = self.local_pairs.reshape(pairs.shape)
+        # Lists built from precomputed states (satrecs=None) get their SatrecArray on first propagation
+        self.array = SatrecArray([satrecs[i] for i in self.members]) if satrecs is not None and len(self.members) else None
+        self.key = key; self.built_at = t_seconds; self.builds += 1
+
+def screen_satellites_verlet(satrecs, jd, fr, neighbor_list, key, radii_km=RIC_KEEP_OUT_KM):
+    """
+    Same pairs as screen_satellites_ric (for objects with physical speeds), reusing neighbor_list
+    while it is valid. key identifies the catalog content, e.g. propagation.VectorCatalog.version.
+    """
+    if len(satrecs) < 2: return np.empty((0, 2), dtype=np.int64)
+    jd_a, fr_a = np.array([jd]), np.array([fr])
+    with neighbor_list.lock:
+        t_seconds = (jd + fr) * 86400.0
+        if neighbor_list.valid_for(key, t_seconds):
+            neighbor_list.reuses += 1
+            if len(neighbor_list.members) == 0: return np.empty((0, 2), dtype=np.int64)
+            if neighbor_list.array is None:
+                neighbor_list.array = SatrecArray([satrecs[i] for i in neighbor_list.members])
+            e, r, v = neighbor_list.array.sgp4(jd_a, fr_a)
+        else:
+            e, r, v = SatrecArray(satrecs).sgp4(jd_a, fr_a)
+            ok = (e[:, 0] == 0) & (np.linalg.norm(v[:, 0, :], axis=1) <= MAX_ORBITAL_SPEED_KM_S)
+            neighbor_list.rebuild(key, satrecs, r[:, 0, :], v[:, 0, :], ok, t_seconds)
+            members = neighbor_list.members
+            e, r, v = e[members], r[members], v[members]
+        members, local = neighbor_list.members, neighbor_list.local_pairs
+
+    r = r[:, 0, :]; v = v[:, 0, :]
+    ok = (e[:, 0] == 0) & (np.linalg.norm(v, axis=1) <= MAX_ORBITAL_SPEED_KM_S)
+    return _listed_pairs(members, local, r, v, ok, radii_km)
+
+def screen_states_verlet(r, v, ok, t_seconds, neighbor_list, key, radii_km=RIC_KEEP_OUT_KM):
+    """
+    screen_satellites_verlet for full-catalog states already at hand (e.g. interpolated by
+    ephemeris.EphemerisStore.states_at) at absolute time t_seconds: while the list is valid only
+    its pairs are re-tested, skipping the sweep over the whole catalog.
+    """
+    r = np.asarray(r, dtype=float); v = np.asarray(v, dtype=float)
+    ok = np.asarray(ok, dtype=bool) & (np.linalg.norm(v, axis=1) <= MAX_ORBITAL_SPEED_KM_S)
+    if len(r) < 2: return np.empty((0, 2), dtype=np.int64)
+    with neighbor_list.lock:
+        if neighbor_list.valid_for(key, t_seconds):
+            neighbor_list.reuses += 1
+        else:
+            neighbor_list.rebuild(key, None, r, v, ok, t_seconds)
+        members, local = neighbor_list.members, neighbor_list.local_pairs
+    return _listed_pairs(members, local, r[members], v[members], ok[members], radii_km)
+
+def _listed_pairs(members, local, r, v, ok, radii_km):
+    """RIC ellipsoid test of a neighbor list's pairs, given the states (and ok mask) of its members."""
+    local = local[ok[local[:, 0]] & ok[local[:, 1]]]
+    if len(local) == 0: return np.empty((0, 2), dtype=np.int64)
+    ric = to_ric(r[local[:, 0]], v[local[:, 0]], r[local[:, 1]] - r[local[:, 0]])
+    return members[local[ellipsoid_metric(ric, radii_km) <= 1.0]]
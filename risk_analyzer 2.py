@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 # REMOVED: import earthaccess # Not needed, avoiding hang
 
 from marshmallow import Schema, fields 
+from frames import teme_to_geodetic
 
 load_dotenv()
 
@@ -112,13 +113,6 @@ def distance_km_to_altitude_km(distance_from_center_km):
     EARTH_RADIUS = 6378.135 
     return distance_from_center_km - EARTH_RADIUS
 
-def calculate_latitude(x, y, z):
-    r_xy = math.sqrt(x**2 + y**2)
-    return math.degrees(math.atan2(z, r_xy))
-
-def calculate_longitude(x, y):
-    return math.degrees(math.atan2(y, x))
-
 def load_tle_data(file_path="spacetrack_leo_3le.txt"):
     satellites = {}
     try:
@@ -144,9 +138,8 @@ def propagate_single(sat, analysis_time):
     e, r, v = sat.sgp4(jd, fr)
     if e != 0: return None 
     r = list(r) 
-    lat = calculate_latitude(r[0], r[1], r[2])
-    lon = calculate_longitude(r[0], r[1])
-    return {"lat": lat, "lon": lon, "sat": sat, "r_km": math.sqrt(sum(c**2 for c in r))}
+    lat, lon, _ = teme_to_geodetic(r, jd, fr)   # WGS-84 sub-point (Earth rotation included)
+    return {"lat": float(lat), "lon": float(lon), "lon": lon, "sat": sat, "r_km": math.sqrt(sum(c**2 for c in r))}
 
 def propagate_and_compare(sat1, sat2, analysis_time):
     jd, fr = jday(analysis_time.year, analysis_time.month, analysis_time.day, 
@@ -161,11 +154,11 @@ def propagate_and_compare(sat1, sat2, analysis_time):
     alt1_km = distance_km_to_altitude_km(math.sqrt(sum(c**2 for c in r1)))
     alt2_km = distance_km_to_altitude_km(math.sqrt(sum(c**2 for c in r2)))
     average_altitude_km = (alt1_km + alt2_km) / 2.0
+    lat1, lon1, _ = teme_to_geodetic(r1, jd, fr)
     return {
         "distance_km": distance_km, "relative_velocity_km_s": relative_velocity_km_s,
         "delta_t_seconds": 0.0, "average_altitude_km": average_altitude_km,
-        "lat": calculate_latitude(r1[0], r1[1], r1[2]), 
-        "lon": calculate_longitude(r1[0], r1[1])
+        "lat": float(lat1), "lon": float(lon1)
     }
 
 
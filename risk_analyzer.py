@@ -1,10 +1,12 @@
 # risk_analyzer.py - FINAL, API-BASED, FAIL-FAST VERSION
 
 # 1. Imports and Setup
-from sgp4.api import WGS72, Satrec, jday 
+from sgp4.api import WGS72, Satrec, SatrecArray, jday 
 from datetime import datetime, timedelta, UTC
+import heapq
 import math
 import os
+import numpy as np
 import requests
 import json
 from dotenv import load_dotenv
@@ -14,6 +16,15 @@ import earthaccess
 
 from marshmallow import Schema, fields 
 
+from collision_probability import collision_probabilities
+from monte_carlo import run_monte_carlo, MC_ENABLED
+from ric_screening import (ric_candidate_pairs, screen_satellites_ric, screen_satellites_verlet, screen_states_verlet,
+                           VerletNeighborList)
+from propagation import get_vector_catalog
+from constellations import FORMATION_POLICY, formation_groups, formation_pair_mask, skipped_summary
+from frames import gmst_radians, teme_to_ecef, ecef_to_geodetic
+from debris_density import NEUTRAL_DSE, dse_weight
+
 load_dotenv()
 
 # --- FIXED: API Key Status Check (Using Basic Auth requirements) ---
@@ -34,6 +45,19 @@ if _ODPO_PLACEHOLDER:
 # -----------------------------------------------------------
 
 
+# Proximity screening before scoring: "all" scores every pair, "ric" keeps only pairs inside
+# the RIC keep-out ellipsoid of the primary (see ric_screening.RIC_KEEP_OUT_KM), "verlet" is
+# "ric" reusing a neighbor list across epochs less than VERLET_REUSE_SECONDS apart.
+SCREENING_MODE = os.getenv("SCREENING_MODE", "all")
+_NEIGHBOR_LIST = VerletNeighborList()
+
+# Events need R_final > REPORT_THRESHOLD. Pairs whose weight-free upper bound cannot exceed it are
+# rejected from distance and relative velocity alone; RISK_TOP_K > 0 keeps only the K riskiest.
+REPORT_THRESHOLD = 0.5
+RISK_PRUNING = os.getenv("RISK_PRUNING", "1") == "1"
+RISK_TOP_K = int(os.getenv("RISK_TOP_K", "0")) or None
+_BOUND_CHUNK_PAIRS = 1_000_000   # Pairs evaluated per vectorized bound pass in "all" mode
+
 # --- Geographical Definitions ---
 SATELLITE_OWNERS = {
     'STARLINK': 'USA', 'ONEWEB': 'UK', 'IRIDIUM': 'USA', 'GLOBALSTAR': 'USA',
@@ -66,14 +90,36 @@ def get_satellite_country(satellite_name):
     return "Unknown"
 
 # --- 2. Marshmallow Schemas (Omitted for brevity) ---
+class MonteCarloSummarySchema(Schema):
+    samples = fields.Int(); empirical_pc = fields.Float()
+    miss_mean_km = fields.Float(); miss_std_km = fields.Float(); miss_min_km = fields.Float()
+    miss_p05_km = fields.Float(); miss_p50_km = fields.Float(); miss_p95_km = fields.Float()
+
 class ConjunctionEventSchema(Schema):
+    event_id = fields.Str(metadata={"description": "Stable encounter ID (NORAD pair, plus TCA bucket when known) used by /changes."})
     satellite1 = fields.Str(required=True); satellite2 = fields.Str(required=True)
+    norad_id_1 = fields.Int(); norad_id_2 = fields.Int()
+    risk_category = fields.Str(); lat = fields.Float(); lon = fields.Float()
+    alt_km = fields.Float(metadata={"description": "Mean altitude of the two objects (km)."})
+    dse = fields.Float(metadata={"description": "Debris/environment index of the encounter cell (1 = neutral)."})
     risk_score = fields.Float(required=True); distance_km = fields.Float(required=True)
     relative_velocity_km_s = fields.Float(required=True); fir = fields.Str(required=True)
     country_of_origin_1 = fields.Str(required=True); country_of_origin_2 = fields.Str(required=True)
+    collision_probability = fields.Float(metadata={"description": "2D probability of collision (Pc) from default TLE covariances."})
+    monte_carlo = fields.Nested(MonteCarloSummarySchema, metadata={"description": "TLE-uncertainty sampling (high-risk events only)."})
 
 class RiskEventsResponseSchema(Schema):
     timestamp = fields.Str(required=True); events = fields.List(fields.Nested(ConjunctionEventSchema), required=True)
+    version = fields.Int(metadata={"description": "Snapshot version the page was read from (0 for forecasts)."})
+    total = fields.Int(metadata={"description": "Number of events matching the filters across all pages."})
+    next_cursor = fields.Str(allow_none=True, metadata={"description": "Pass as ?cursor= to fetch the next page."})
+
+class RiskEventChangesResponseSchema(Schema):
+    since = fields.Int(required=True); version = fields.Int(required=True); timestamp = fields.Str(required=True)
+    added = fields.List(fields.Nested(ConjunctionEventSchema), required=True)
+    updated = fields.List(fields.Nested(ConjunctionEventSchema), required=True)
+    removed = fields.List(fields.Str(), required=True, metadata={"description": "event_ids no longer reported."})
+    reset = fields.Bool(metadata={"description": "True when `since` is unknown or too old: drop local state, 'added' is the full snapshot."})
 
 
 # --- 3. Dynamic Weight Calculation (API Integration) ---
@@ -165,29 +211,49 @@ def fetch_odpo_persistence_weight(alt):
 # --- 4. Core Risk Calculation ---
 D0 = 10.0; T0 = 60.0; V0 = 7.0 
 
-def calculate_R_final_revised(d_min, delta_t, V_rel, alt_km, lat, lon, analysis_time):
+def calculate_R_final_revised(d_min, delta_t, V_rel, alt_km, lat, lon, analysis_time, dse=NEUTRAL_DSE):
     R_geo = math.exp(-d_min / D0); T_f = math.exp(-delta_t / T0); V_f = math.exp(1 - (V_rel / V0)) 
     R_kin = T_f * V_f
     
     W_ops = fetch_operational_weight(lat, lon, analysis_time)         # EarthData (Cloud)
     W_space = fetch_odpo_persistence_weight(alt_km)                   # NOAA (Space Weather/MOCAT Influence)
+    W_env = dse_weight(dse)                                           # Catalog density index (debris_density.py)
     
-    R_final = W_space * W_ops * ((R_geo + R_kin) / 2.0)
+    R_final = W_space * W_ops * W_env * ((R_geo + R_kin) / 2.0)
     
     return min(1.0, max(0.0, R_final)) 
 
+def risk_upper_bound(d_min, delta_t, V_rel):
+    """
+    Vectorized bound on calculate_R_final_revised without any weight fetch: W_ops, W_space
+    and W_env are at most 1, so R_final <= min(1, (R_geo + R_kin) / 2).
+    """
+    R_geo = np.exp(-np.asarray(d_min) / D0)
+    R_kin = np.exp(-np.asarray(delta_t) / T0) * np.exp(1 - np.asarray(V_rel) / V0)
+    return np.minimum(1.0, (R_geo + R_kin) / 2.0)
+
 # --- 5. TLE Loading and Propagation / Location Helpers ---
 
 def distance_km_to_altitude_km(distance_from_center_km):
     EARTH_RADIUS = 6378.135 
     return distance_from_center_km - EARTH_RADIUS
 
-def calculate_latitude(x, y, z):
-    r_xy = math.sqrt(x**2 + y**2)
-    return math.degrees(math.atan2(z, r_xy))
+def calculate_subpoint(r, gmst):
+    """
+    WGS-84 sub-satellite point (lat, lon, alt_km) of a TEME position, rotated to Earth-fixed
+    with the epoch's GMST so longitudes account for Earth rotation.
+    """
+    lat, lon, alt = ecef_to_geodetic(teme_to_ecef(r, gmst))
+    return float(lat), float(lon), float(alt)
 
-def calculate_longitude(x, y):
-    return math.degrees(math.atan2(y, x))
+def in_fir_boxes(lat, lon):
+    """Vectorized FIR test: True where (lat, lon) falls inside any FIR_BOUNDARIES box."""
+    lat = np.asarray(lat); lon = np.asarray(lon)
+    mask = np.zeros(lat.shape, dtype=bool)
+    for bounds in FIR_BOUNDARIES.values():
+        mask |= ((bounds['lat_min'] <= lat) & (lat <= bounds['lat_max']) &
+                 (bounds['lon_min'] <= lon) & (lon <= bounds['lon_max']))
+    return mask
 
 def load_tle_data(file_path="spacetrack_leo_3le.txt"):
     satellites = {}
@@ -222,86 +288,243 @@ def propagate_single(sat, analysis_time):
     e, r, v = sat.sgp4(jd, fr)
     if e != 0: return None 
     r = list(r) 
-    lat = calculate_latitude(r[0], r[1], r[2])
-    lon = calculate_longitude(r[0], r[1])
-    return {"lat": lat, "lon": lon, "sat": sat, "r_km": math.sqrt(sum(c**2 for c in r))}
+    lat, lon, alt = calculate_subpoint(r, gmst_radians(jd, fr))
+    return {"lat": lat, "lon": lon, "alt_km": alt, "sat": sat, "r_km": math.sqrt(sum(c**2 for c in r))}
 
-def propagate_and_compare(sat1, sat2, analysis_time):
+def propagate_and_compare(sat1, sat2, analysis_time, gmst=None):
     jd, fr = jday(analysis_time.year, analysis_time.month, analysis_time.day, 
                       analysis_time.hour, analysis_time.minute, analysis_time.second + analysis_time.microsecond / 1e6)
+    if gmst is None: gmst = gmst_radians(jd, fr)
     e1, r1, v1 = sat1.sgp4(jd, fr); e2, r2, v2 = sat2.sgp4(jd, fr)
     if e1 != 0 or e2 != 0: return None 
+    return compare_states(r1, v1, r2, v2, gmst)
+
+def compare_states(r1, v1, r2, v2, gmst):
+    """Pair geometry from two TEME states (already propagated or interpolated) at one epoch."""
     r1, v1, r2, v2 = list(r1), list(v1), list(r2), list(v2)
     distance_vector = [r1[i] - r2[i] for i in range(3)]
     distance_km = math.sqrt(sum(c**2 for c in distance_vector)) 
     rel_velocity_vector = [v1[i] - v2[i] for i in range(3)]
     relative_velocity_km_s = math.sqrt(sum(c**2 for c in rel_velocity_vector)) 
-    alt1_km = distance_km_to_altitude_km(math.sqrt(sum(c**2 for c in r1)))
-    alt2_km = distance_km_to_altitude_km(math.sqrt(sum(c**2 for c in r2)))
+    lat1, lon1, alt1_km = calculate_subpoint(r1, gmst)
+    alt2_km = calculate_subpoint(r2, gmst)[2]
     average_altitude_km = (alt1_km + alt2_km) / 2.0
     return {
         "distance_km": distance_km, "relative_velocity_km_s": relative_velocity_km_s,
         "delta_t_seconds": 0.0, "average_altitude_km": average_altitude_km,
-        "lat": calculate_latitude(r1[0], r1[1], r1[2]), 
-        "lon": calculate_longitude(r1[0], r1[1])
+        "lat": lat1, "lon": lon1,
+        "r1": r1, "v1": v1, "r2": r2, "v2": v2
     }
 
 
 # --- 6. Main Execution Functions ---
 
-def filter_satellites_by_fir(all_satellites, analysis_time):
-    global FIR_BOUNDARIES
+def filter_satellites_by_fir(all_satellites, analysis_time, index=None, lead_seconds=0.0):
+    """
+    Keeps the satellites over any FIR box at analysis_time, or at any time up to lead_seconds
+    later when an access_windows.AccessWindowIndex built on all_satellites covers that span
+    (an interval lookup instead of a catalog-wide propagation).
+    """
+    window_end = analysis_time + timedelta(seconds=lead_seconds)
+    if index is not None and index.covers(analysis_time, window_end):
+        found = index.over_any(analysis_time, window_end).tolist()
+        print(f"[+] INFO: Access-window index: {len(found)} satellites over the target FIRs.")
+        return {index.catalog.names[i]: all_satellites[index.catalog.names[i]] for i in found}
     print("[-] INFO: Starting geographic pre-filter (only keeping satellites over defined FIRs)...")
-    filtered_satellites = {}
-    for name, sat in all_satellites.items():
-        state = propagate_single(sat, analysis_time)
-        if state is None: continue
-        is_over_fir = False
-        for bounds in FIR_BOUNDARIES.values():
-            if (bounds['lat_min'] <= state['lat'] <= bounds['lat_max'] and 
-                bounds['lon_min'] <= state['lon'] <= bounds['lon_max']):
-                is_over_fir = True
-                break
-        
-        if is_over_fir:
-            filtered_satellites[name] = sat
+    jd, fr = jday(analysis_time.year, analysis_time.month, analysis_time.day, 
+                  analysis_time.hour, analysis_time.minute, analysis_time.second + analysis_time.microsecond / 1e6)
+    # One batched propagation and one TEME->ECEF->geodetic pass for the whole catalog
+    catalog = get_vector_catalog(all_satellites)
+    r, _, ok = catalog.propagate(jd, fr)
+    lat, lon, _ = ecef_to_geodetic(teme_to_ecef(r[:, 0, :], gmst_radians(jd, fr)))
+    over_fir = ok[:, 0] & in_fir_boxes(lat, lon)
+    filtered_satellites = {catalog.names[i]: catalog.satrecs[i] for i in np.nonzero(over_fir)[0]}
             
     print(f"[+] INFO: Pre-filter complete. {len(filtered_satellites)} satellites are over the target FIRs.")
     return filtered_satellites
 
 
-def run_full_risk_analysis(relevant_satellites, analysis_time=None):
+def _upper_triangle_blocks(n, rows):
+    """Yields all pairs i < j of n objects as (M, 2) arrays, `rows` values of i at a time."""
+    for i0 in range(0, n, rows):
+        i = np.arange(i0, min(i0 + rows, n))
+        counts = n - 1 - i
+        a = np.repeat(i, counts)
+        offsets = np.arange(len(a)) - np.repeat(np.cumsum(counts) - counts, counts)
+        yield np.stack([a, a + 1 + offsets], axis=1)
+
+def _all_pairs(n):
+    """Every pair i < j of n objects as one (M, 2) array."""
+    return np.concatenate([np.empty((0, 2), dtype=np.int64)] + list(_upper_triangle_blocks(n, 4096)))
+
+def _masked_pairs(n, pairs, pair_mask):
+    """Candidate pairs (all i < j when pairs is None or a generator) kept by pair_mask, one block at a time."""
+    if isinstance(pairs, (list, np.ndarray)): blocks = [np.asarray(pairs, dtype=np.int64).reshape(-1, 2)]
+    else: blocks = _upper_triangle_blocks(n, max(1, _BOUND_CHUNK_PAIRS // max(n, 1)))
+    return np.concatenate([np.empty((0, 2), dtype=np.int64)]
+                          + [block[np.asarray(pair_mask(block), dtype=bool)] for block in blocks])
+
+def _pairs_by_upper_bound(satrecs, jd, fr, pairs, threshold, states=None):
+    """
+    Propagates every object once (unless their states are given) and returns the (M, 2) pairs
+    (all i < j when pairs is None) whose risk_upper_bound exceeds threshold, highest bound
+    first, with their bounds.
+    """
+    if states is not None:
+        r, v, ok = states
+    else:
+        e, r, v = SatrecArray(satrecs).sgp4(np.array([jd]), np.array([fr]))
+        r = r[:, 0, :]; v = v[:, 0, :]; ok = e[:, 0] == 0
+    if pairs is not None:
+        blocks = [np.asarray(pairs, dtype=np.int64).reshape(-1, 2)]
+    else:
+        blocks = _upper_triangle_blocks(len(satrecs), max(1, _BOUND_CHUNK_PAIRS // max(len(satrecs), 1)))
+    kept = []; bounds = []
+    for block in blocks:
+        if len(block) == 0: continue
+        a, b = block[:, 0], block[:, 1]
+        bound = risk_upper_bound(np.linalg.norm(r[a] - r[b], axis=1), 0.0, np.linalg.norm(v[a] - v[b], axis=1))
+        keep = ok[a] & ok[b] & (bound > threshold)
+        kept.append(block[keep]); bounds.append(bound[keep])
+    if not kept: return np.empty((0, 2), dtype=np.int64), np.empty(0)
+    kept = np.concatenate(kept); bounds = np.concatenate(bounds)
+    order = np.argsort(-bounds, kind='stable')
+    return kept[order], bounds[order]
+
+def run_full_risk_analysis(relevant_satellites, analysis_time=None, monte_carlo=MC_ENABLED, screening=SCREENING_MODE,
+                           prune=RISK_PRUNING, top_k=RISK_TOP_K, formation_policy=FORMATION_POLICY, report=None,
+                           states=None, pair_mask=None, density=None, formations=None):
+    """
+    Scores candidate pairs and returns the reportable events, highest risk first. When a dict is
+    passed as report it receives the comparison count and the intra-formation pairs skipped.
+    states, if given, is (r, v, ok) for every satellite in relevant_satellites order at
+    analysis_time (e.g. interpolated by ephemeris.EphemerisStore.states_at); screening, bounds
+    and scoring then use it instead of propagating. pair_mask, if given, maps an (M, 2) array
+    of candidate pairs to a keep mask (batch.py shards use it to take a disjoint share).
+    density, if given, is the full catalog's debris_density.DebrisDensityIndex; each encounter's
+    DSE is looked up there (otherwise NEUTRAL_DSE). formations, if given, is the full catalog's
+    constellations.get_formation_groups; the formation policy then reads group ids from it.
+    """
     if analysis_time is None: analysis_time = datetime.now(UTC)
     events = []; names = list(relevant_satellites.keys())
-    total_comparisons = 0; 
-    for i in range(len(names)):
-        for j in range(i + 1, len(names)):
-            total_comparisons += 1
-            name1, name2 = names[i], names[j]
-            sat1, sat2 = relevant_satellites[name1], relevant_satellites[name2]
-            state = propagate_and_compare(sat1, sat2, analysis_time)
-            if state is None: continue
-            
-            R_final = calculate_R_final_revised(
-                d_min=state["distance_km"], delta_t=state["delta_t_seconds"], V_rel=state["relative_velocity_km_s"],
-                alt_km=state["average_altitude_km"], lat=state["lat"], lon=state["lon"], analysis_time=analysis_time
-            )
-            
-            category = "Danger" if R_final > 0.8 else ("Attention" if R_final > 0.5 else "Safe")
+    total_comparisons = 0; pc_inputs = []
+    jd, fr = jday(analysis_time.year, analysis_time.month, analysis_time.day, 
+                  analysis_time.hour, analysis_time.minute, analysis_time.second + analysis_time.microsecond / 1e6)
+    gmst = gmst_radians(jd, fr)
+
+    if screening == "ric" and states is not None:
+        pairs = ric_candidate_pairs(states[0], states[1], ok=states[2]).tolist()
+        print(f"[-] INFO: RIC ellipsoid screening on precomputed states kept {len(pairs)} candidate pair(s).")
+    elif screening == "verlet" and states is not None:
+        # Propagation is already done; a valid list still spares the sweep over the whole catalog
+        pairs = screen_states_verlet(states[0], states[1], states[2], (jd + fr) * 86400.0, _NEIGHBOR_LIST,
+                                     get_vector_catalog(relevant_satellites).version).tolist()
+        print(f"[-] INFO: RIC screening on the neighbor list (precomputed states) kept {len(pairs)} candidate pair(s) "
+              f"({_NEIGHBOR_LIST.builds} build(s), {_NEIGHBOR_LIST.reuses} reuse(s)).")
+    elif screening == "ric":
+        # Batch RIC keep-out test for all pairs; only survivors reach scoring and weight lookups
+        pairs = screen_satellites_ric([relevant_satellites[n] for n in names], jd, fr).tolist()
+        print(f"[-] INFO: RIC ellipsoid screening kept {len(pairs)} candidate pair(s).")
+    elif screening == "verlet":
+        pairs = screen_satellites_verlet([relevant_satellites[n] for n in names], jd, fr,
+                                         _NEIGHBOR_LIST, get_vector_catalog(relevant_satellites).version).tolist()
+        print(f"[-] INFO: RIC screening on the neighbor list kept {len(pairs)} candidate pair(s) "
+              f"({_NEIGHBOR_LIST.builds} build(s), {_NEIGHBOR_LIST.reuses} reuse(s)).")
+    else:
+        pairs = None if prune else ((i, j) for i in range(len(names)) for j in range(i + 1, len(names)))
+
+    if pair_mask is not None:
+        # Take this shard's share first, so the bound and scoring passes only see its pairs
+        pairs = _masked_pairs(len(names), pairs, pair_mask)
+
+    bounds = None
+    if prune:
+        # Weight-free upper bound for every candidate at once; survivors come highest bound first
+        n_candidates = len(names) * (len(names) - 1) // 2 if pairs is None else len(pairs)
+        pairs, bounds = _pairs_by_upper_bound([relevant_satellites[n] for n in names], jd, fr, pairs, REPORT_THRESHOLD,
+                                              states=states)
+        print(f"[-] INFO: Risk upper bound kept {len(pairs)} of {n_candidates} candidate pair(s).")
+
+    skipped = {}
+    if formation_policy != "include":
+        # Pairs inside one constellation / shell / plane fly in controlled formation
+        satrecs = [relevant_satellites[n] for n in names]
+        if not isinstance(pairs, (list, np.ndarray)):   # Unpruned "all" mode: materialize the pair generator
+            pairs = _all_pairs(len(names))
+        if formations is not None:
+            catalog_ids, labels, row_by_name = formations
+            group_ids = catalog_ids[[row_by_name[n] for n in names]] if names else np.empty(0, dtype=np.int64)
+        else:
+            group_ids, labels = formation_groups(names, satrecs)
+        keep, _ = formation_pair_mask(pairs, group_ids, np.array([s.satnum for s in satrecs]), formation_policy)
+        skipped = skipped_summary(pairs, keep, group_ids, labels)
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)[keep]
+        if bounds is not None: bounds = np.asarray(bounds)[keep]
+        print(f"[-] INFO: Formation policy '{formation_policy}' skipped {sum(skipped.values())} "
+              f"intra-formation pair(s): {skipped or 'none'}.")
+    if prune or formation_policy != "include" or pair_mask is not None:
+        pairs = np.asarray(pairs).tolist()
+        if bounds is not None: bounds = np.asarray(bounds).tolist()
+
+    top = []   # Min-heap of (risk_score, seq, event, pc_input) when top_k is set
+    for seq, (i, j) in enumerate(pairs):
+        if top_k and len(top) >= top_k and bounds is not None and bounds[seq] <= top[0][0]:
+            break   # Bounds are sorted: no remaining pair can displace the K-th best event
+        total_comparisons += 1
+        name1, name2 = names[i], names[j]
+        sat1, sat2 = relevant_satellites[name1], relevant_satellites[name2]
+        if states is None:
+            state = propagate_and_compare(sat1, sat2, analysis_time, gmst=gmst)
+        elif states[2][i] and states[2][j]:
+            state = compare_states(states[0][i], states[1][i], states[0][j], states[1][j], gmst)
+        else:
+            state = None
+        if state is None: continue
+        
+        dse = density.lookup(state["average_altitude_km"], state["lat"]) if density is not None else NEUTRAL_DSE
+        R_final = calculate_R_final_revised(
+            d_min=state["distance_km"], delta_t=state["delta_t_seconds"], V_rel=state["relative_velocity_km_s"],
+            alt_km=state["average_altitude_km"], lat=state["lat"], lon=state["lon"], analysis_time=analysis_time, dse=dse
+        )
+        
+        category = "Danger" if R_final > 0.8 else ("Attention" if R_final > 0.5 else "Safe")
+        
+        if category != "Safe":
+            fir_name = find_fir_by_location(state["lat"], state["lon"])
+            country1, country2 = get_satellite_country(name1), get_satellite_country(name2)
             
-            if category != "Safe":
-                fir_name = find_fir_by_location(state["lat"], state["lon"])
-                country1, country2 = get_satellite_country(name1), get_satellite_country(name2)
-                
-                events.append({
-                    "satellite1": name1, "satellite2": name2, "risk_score": R_final,
-                    "risk_category": category, "distance_km": state["distance_km"],
-                    "relative_velocity_km_s": state["relative_velocity_km_s"],
-                    "fir": fir_name, "country_of_origin_1": country1, "country_of_origin_2": country2,
-                    "lat": state["lat"], "lon": state["lon"]
-                })
+            event = {
+                "satellite1": name1, "satellite2": name2, "norad_id_1": sat1.satnum, "norad_id_2": sat2.satnum,
+                "risk_score": R_final,
+                "risk_category": category, "distance_km": state["distance_km"],
+                "relative_velocity_km_s": state["relative_velocity_km_s"],
+                "fir": fir_name, "country_of_origin_1": country1, "country_of_origin_2": country2,
+                "lat": state["lat"], "lon": state["lon"], "alt_km": state["average_altitude_km"], "dse": dse
+            }
+            pc_input = (name1, sat1, state["r1"], state["v1"], name2, sat2, state["r2"], state["v2"], jd, fr)
+            if not top_k:
+                events.append(event); pc_inputs.append(pc_input)
+            elif len(top) < top_k:
+                heapq.heappush(top, (R_final, seq, event, pc_input))
+            elif R_final > top[0][0]:
+                heapq.heapreplace(top, (R_final, seq, event, pc_input))
+
+    if top_k:
+        events = [item[2] for item in top]; pc_inputs = [item[3] for item in top]
+
+    # Pc for all reported events in one vectorized pass
+    for event, pc in zip(events, collision_probabilities(pc_inputs)):
+        event["collision_probability"] = pc
+
+    # Monte Carlo miss-distance distributions for the highest-risk events only
+    if monte_carlo:
+        sampled = run_monte_carlo(events, relevant_satellites, jd, fr)
+        print(f"[i] INFO: Monte Carlo TLE-uncertainty sampling run on {sampled} high-risk event(s).")
 
     print(f"\n[i] INFO: Total satellite comparisons performed: {total_comparisons}")
+    if report is not None:
+        report.update({"comparisons": total_comparisons, "formation_policy": formation_policy,
+                       "formation_pairs_skipped": sum(skipped.values()), "formation_skipped_by_constellation": skipped})
     return sorted(events, key=lambda x: x['risk_score'], reverse=True)
 
 
@@ -1,6 +1,7 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, Response
 from dotenv import load_dotenv
 import os
+import json
 import requests
 from datetime import datetime
 import random
@@ -8,17 +9,37 @@ from traffic.data import eurofirs
 
 load_dotenv()
  
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 from flask_cors import CORS 
 
 # Imports for Swagger/Smorest and Risk Logic
-from flask_smorest import Api, Blueprint 
+from flask_smorest import Api, Blueprint, abort
 from flask.views import MethodView 
-from risk_analyzer import load_tle_data, run_full_risk_analysis, RiskEventsResponseSchema 
+from risk_analyzer import load_tle_data, run_full_risk_analysis, RiskEventsResponseSchema, RiskEventChangesResponseSchema
+from conjunction_screening import (
+    screen_primary, ConjunctionWindowQuerySchema, PrimaryConjunctionsResponseSchema,
+    DEFAULT_WINDOW_HOURS, MAX_WINDOW_HOURS
+)
+from event_store import EventStore, EventHistoryQuerySchema, EventHistoryResponseSchema, to_alerts_response
+from snapshot import SnapshotCache, RiskEventsQuerySchema, RiskEventChangesQuerySchema, decode_cursor
+from jobs import JobManager, JobSubmitSchema, JobStatusSchema, JobResultSchema
+from admission import AdmissionController, Overloaded
+from ephemeris import EphemerisStore
+from debris_density import get_density_index
+from constellations import get_formation_groups
+from shared_catalog import load_shared_catalog
+from access_windows import AccessWindowCache, FirAccessQuerySchema, FirAccessResponseSchema
+from live_updates import ChangeBroadcaster, RiskEventStreamQuerySchema, sse_message
+from http_caching import make_etag, begin_conditional, finish_conditional
+from serialization import response_format, page_response
+from positions import PositionFeed, PositionsQuerySchema, PositionsIndexSchema
+from heatmap import snapshot_heatmap, HeatmapQuerySchema, HeatmapResponseSchema
+from ground_track import TrackCache, TrackQuerySchema, TrackResponseSchema, snap_window, DEFAULT_TRACK_HOURS, MAX_TRACK_HOURS
 
 load_dotenv()
 app = Flask(__name__)
-CORS(app) # Enable CORS for frontend requests
+CORS(app, expose_headers=["ETag", "Retry-After"]) # Enable CORS for frontend requests
+app.after_request(finish_conditional) # ETag + gzip/brotli for views that opted in via begin_conditional
 
 # Flask-Smorest Configuration for Swagger
 app.config["API_TITLE"] = "LEO Risk Analysis API"
@@ -36,10 +57,81 @@ blp = Blueprint(
     "Risk Analysis", __name__, url_prefix="/api", description="Operations for LEO Collision Risk"
 )
 
-# Load TLE data once when the server starts
-# NOTE: This assumes 'spacetrack_leo_3le.txt' is in the same directory or accessible via the path defined in risk_analyzer.py
-ALL_SATELLITES = load_tle_data()
-print(f"Flask Server Loaded {len(ALL_SATELLITES)} total TLEs.")
+# Under `python server.py`, job worker processes (forkserver/spawn) re-run this script as
+# __mp_main__ to unpickle their tasks. They only need jobs/risk_analyzer, so the catalog and
+# services below are built in the serving process alone.
+SERVING_PROCESS = __name__ != "__mp_main__"
+
+if SERVING_PROCESS:
+    # Load TLE data once when the server starts
+    # NOTE: This assumes 'spacetrack_leo_3le.txt' is in the same directory or accessible via the path defined in risk_analyzer.py
+    # Under gunicorn (gunicorn.conf.py) the master parses it once and workers attach the shared copy
+    ALL_SATELLITES = load_shared_catalog() or load_tle_data()
+    print(f"Flask Server Loaded {len(ALL_SATELLITES)} total TLEs.")
+
+    # Every live event is persisted so historical date/satellite/FIR queries need no re-propagation
+    EVENT_STORE = EventStore()
+
+    # Every analysis run takes a slot; cached reads never do. Overloaded renders as 429 + Retry-After
+    ANALYSIS_SLOTS = AdmissionController()
+
+    # Catalog states on a fixed grid over the next EPHEMERIS_HORIZON_HOURS, memory-mapped and shared
+    # by all worker processes; analyses inside it interpolate instead of propagating
+    EPHEMERIS = EphemerisStore(ALL_SATELLITES)
+
+    def compute_events(analysis_time):
+        """Runs the analysis for analysis_time (live slot or at-time forecast)."""
+        with ANALYSIS_SLOTS.slot():
+            return run_full_risk_analysis(ALL_SATELLITES, analysis_time=analysis_time,
+                                          states=EPHEMERIS.states_at(analysis_time),
+                                          density=get_density_index(ALL_SATELLITES),
+                                          formations=get_formation_groups(ALL_SATELLITES))
+
+    def record_live_events(previous_version, snapshot, diff):
+        """Persists each published live snapshot; at-time forecasts never reach history or alerts."""
+        EVENT_STORE.record_events(snapshot.events, snapshot.analysis_time)
+
+    # Live results are computed at most once per TTL and served (filtered/paged) from indexed snapshots
+    # (an expired live snapshot is still served when the server is too busy to refresh it)
+    SNAPSHOTS = SnapshotCache(compute_events, stale_on=(Overloaded,))
+    SNAPSHOTS.add_listener(record_live_events)
+
+    # Pushes each published diff to /api/risk-events/stream viewers (serialized once per filter)
+    BROADCASTER = ChangeBroadcaster(SNAPSHOTS, RiskEventChangesResponseSchema().dump)
+
+    # FIR entry/exit intervals over the next ACCESS_HORIZON_HOURS, rebuilt in the background
+    ACCESS_WINDOWS = AccessWindowCache(ALL_SATELLITES)
+
+    # Long forecasts run as background jobs in worker processes instead of inside a request
+    # (epochs inside the access-window horizon are pre-filtered by interval lookup)
+    JOBS = JobManager(ALL_SATELLITES, access_windows=ACCESS_WINDOWS)
+
+    # Whole-catalog sub-satellite points for the map, propagated once per POSITIONS_STEP_SECONDS
+    POSITIONS = PositionFeed(ALL_SATELLITES, EPHEMERIS)
+
+    # Propagated ground tracks per (catalog version, satellite, window), decimated per zoom level
+    TRACKS = TrackCache(ALL_SATELLITES)
+
+def reject_time_range(query):
+    """
+    Snapshot endpoints evaluate every event at one analysis time, so start/end could only match
+    all events or none; time ranges are answered from the event store instead.
+    """
+    if query.get("start") or query.get("end"):
+        abort(400, message="start/end do not apply to a snapshot (every event shares its analysis time); "
+                           "use /api/events/history for a time range or /api/risk-events/at-time/<time> for another epoch.")
+
+def snapshot_for_cursor(query):
+    """Resolves the snapshot a ?cursor= refers to, or None when no cursor was given."""
+    if not query.get("cursor"): return None
+    try:
+        key, _ = decode_cursor(query["cursor"])
+    except ValueError:
+        abort(400, message="Invalid cursor.")
+    snapshot = SNAPSHOTS.lookup(key)
+    if snapshot is None:
+        abort(410, message="Cursor expired: the snapshot it refers to is gone. Restart from the first page.")
+    return snapshot
 
 # API Endpoints
 
@@ -48,50 +140,327 @@ class RiskEventNow(MethodView):
     """API endpoint to retrieve the latest LEO conjunction risk events for the current time."""
 
     # Decorator to document the 200 response using the schema defined in risk_analyzer.py
+    @blp.arguments(RiskEventsQuerySchema, location="query")
     @blp.response(200, RiskEventsResponseSchema)
-    def get(self):
+    def get(self, query):
+        """
+        Returns LEO conjunction risk events for the current UTC time (epoch).
+        Endpoint for real-time risk monitoring. Results come from a snapshot refreshed at most
+        every SNAPSHOT_TTL_SECONDS and support filters (min_risk, category, fir, norad_id, bbox),
+        cursor pagination (limit, cursor) and sparse fieldsets (fields).
+        Every live event is evaluated at the snapshot time, so start/end are rejected (400): use
+        /api/risk-events/at-time/<time> for another epoch or /api/events/history for a range.
+        Send Accept: application/msgpack for a MessagePack body with the same structure.
+        """
+        if not ALL_SATELLITES:
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+        reject_time_range(query)
+
+        snapshot = snapshot_for_cursor(query) or SNAPSHOTS.current()
+        # 304 / cached encoded body when this snapshot version was already served for this query
+        fmt = response_format()
+        cached = begin_conditional(make_etag(snapshot.key, request.full_path, fmt))
+        if cached is not None: return cached
+        return page_response(snapshot, query, fmt) or snapshot.page(query)
+
+@blp.route("/risk-events/changes")
+class RiskEventChanges(MethodView):
+    """API endpoint returning only what changed since a snapshot version the client already holds."""
+
+    @blp.arguments(RiskEventChangesQuerySchema, location="query")
+    @blp.response(200, RiskEventChangesResponseSchema)
+    def get(self, query):
+        """
+        Returns events added, updated and removed (by event_id) between snapshot version `since`
+        and the current one. Diffs of the last CHANGE_HISTORY snapshots are kept; for an older or
+        unknown version the response has reset=true and lists the whole snapshot under 'added'.
+        Optional fir / norad_id filters restrict the diff.
+        """
+        if not ALL_SATELLITES:
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+
+        return SNAPSHOTS.changes_payload(query["since"], query.get("fir"), query.get("norad_id"))
+
+@blp.route("/risk-events/stream")
+class RiskEventStream(MethodView):
+    """Server-Sent Events channel pushing risk-event diffs as soon as a snapshot is published."""
+
+    @blp.arguments(RiskEventStreamQuerySchema, location="query")
+    @blp.response(200, RiskEventChangesResponseSchema, content_type="text/event-stream")
+    def get(self, query):
         """
-        Calculates LEO conjunction risk events for the current UTC time (epoch).
-        Endpoint for real-time risk monitoring.
+        Opens a text/event-stream. The first 'changes' frame catches up from `since` (or the
+        Last-Event-ID header sent by a reconnecting EventSource); every later frame is the diff
+        of one newly published snapshot, in the /api/risk-events/changes format, with the
+        snapshot version as its SSE id. fir / norad_id restrict what is pushed. Run gunicorn with
+        threaded (gthread) or async workers: each open stream holds a worker thread.
         """
         if not ALL_SATELLITES:
-            return {"error": "TLE data not loaded. Check TLE file path."}, 500
+            abort(500, message="TLE data not loaded. Check TLE file path.")
 
-        # Execute analysis logic for now (analysis_time=None uses current UTC time)
-        events = run_full_risk_analysis(ALL_SATELLITES)
-        
-        return {
-            'timestamp': datetime.now(UTC).isoformat(),
-            'events': events
-        }
+        since = query.get("since") or 0
+        last_event_id = request.headers.get("Last-Event-ID", "")
+        if last_event_id.isdigit(): since = int(last_event_id)
+        sub = BROADCASTER.subscribe(query.get("fir"), query.get("norad_id"))
+        if sub is None:
+            abort(503, message="Too many live subscribers. Poll /api/risk-events/changes instead.")
+
+        try:
+            body = SNAPSHOTS.changes_payload(since, query.get("fir"), query.get("norad_id"))
+        except Exception:
+            BROADCASTER.unsubscribe(sub)
+            raise
+        initial = sse_message(RiskEventChangesResponseSchema().dump(body), event_id=body["version"])
+        response = Response(BROADCASTER.stream(sub, initial, body["version"]), mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"   # Disable proxy buffering (nginx)
+        return response
 
 @blp.route("/risk-events/at-time/<string:time_str>")
 class RiskEventAtTime(MethodView):
     """API endpoint to retrieve risk events for a specific future time (forecasting)."""
 
+    @blp.arguments(RiskEventsQuerySchema, location="query")
     @blp.response(200, RiskEventsResponseSchema)
-    def get(self, time_str):
+    def get(self, query, time_str):
         """
         Calculates LEO conjunction risk events at the time specified by time_str (ISO 8601 format). 
-        Used for forecasting future collision risk.
+        Used for forecasting future collision risk. Accepts the same filter, pagination and
+        fieldset parameters as /api/risk-events (start/end are rejected the same way). Times inside
+        the ephemeris grid use interpolated states (within EPHEMERIS_MAX_ERROR_KM of SGP4); other
+        times are propagated.
         Example Path: /api/risk-events/at-time/2025-10-05T10:00:00Z
         """
+        reject_time_range(query)
         try:
             # Parse the time string and ensure it has UTC timezone info
             analysis_time = datetime.fromisoformat(time_str).replace(tzinfo=UTC)
         except ValueError:
-            return {"error": "Invalid time format. Use ISO 8601 format (e.g., 2025-10-05T08:00:00Z)."}, 400
+            abort(400, message="Invalid time format. Use ISO 8601 format (e.g., 2025-10-05T08:00:00Z).")
+
+        if not ALL_SATELLITES:
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+
+        # Execute analysis logic for the specified time (memoized per time for paging)
+        snapshot = snapshot_for_cursor(query) or SNAPSHOTS.at_time(analysis_time)
+        fmt = response_format()
+        cached = begin_conditional(make_etag(snapshot.key, request.full_path, fmt))
+        if cached is not None: return cached
+        return page_response(snapshot, query, fmt) or snapshot.page(query)
+
+@blp.route("/satellites/<int:norad_id>/conjunctions")
+class SatelliteConjunctions(MethodView):
+    """API endpoint to screen a single satellite against the whole loaded catalog."""
+
+    @blp.arguments(ConjunctionWindowQuerySchema, location="query")
+    @blp.response(200, PrimaryConjunctionsResponseSchema)
+    def get(self, args, norad_id):
+        """
+        Ranks the closest approaches between one primary (by NORAD ID) and every other object
+        over the [start, end] window, with time of closest approach (TCA) and miss distance.
+        Example Path: /api/satellites/25544/conjunctions?start=2025-10-05T00:00:00Z&end=2025-10-05T06:00:00Z
+        """
+        if not ALL_SATELLITES:
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+        start = args["start"] or datetime.now(UTC)
+        end = args["end"] or start + timedelta(hours=DEFAULT_WINDOW_HOURS)
+        if end <= start:
+            abort(400, message="'end' must be later than 'start'.")
+        if end - start > timedelta(hours=MAX_WINDOW_HOURS):
+            abort(400, message=f"Screening window is limited to {MAX_WINDOW_HOURS:g} hours.")
+
+        with ANALYSIS_SLOTS.slot():
+            result = screen_primary(
+                ALL_SATELLITES, norad_id, start=start, end=end, step_seconds=args["step_seconds"],
+                max_distance_km=args["max_distance_km"], limit=args["limit"]
+            )
+        if result is None:
+            abort(404, message=f"NORAD ID {norad_id} is not in the loaded catalog.")
+        return result
+
+@blp.route("/satellites/<int:norad_id>/track")
+class SatelliteTrack(MethodView):
+    """API endpoint returning one satellite's ground track as map-ready polylines."""
 
+    @blp.arguments(TrackQuerySchema, location="query")
+    @blp.response(200, TrackResponseSchema)
+    def get(self, args, norad_id):
+        """
+        Propagates [start, end] (snapped to step_seconds) in one call and returns the track split
+        at the antimeridian, decimated to about one pixel at the given zoom. Tracks are cached per
+        catalog version, satellite and window, so panning and zooming the map re-uses them.
+        Example Path: /api/satellites/25544/track?start=2025-10-05T00:00:00Z&end=2025-10-05T03:00:00Z&zoom=3
+        """
+        if not ALL_SATELLITES:
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+        start = args["start"] or datetime.now(UTC)
+        end = args["end"] or start + timedelta(hours=DEFAULT_TRACK_HOURS)
+        if end <= start:
+            abort(400, message="'end' must be later than 'start'.")
+        if end - start > timedelta(hours=MAX_TRACK_HOURS):
+            abort(400, message=f"Track window is limited to {MAX_TRACK_HOURS:g} hours.")
+        start, end = snap_window(start, end, args["step_seconds"])
+
+        cached = begin_conditional(make_etag("track", TRACKS.key(norad_id, start, end, args["step_seconds"]), args["zoom"]))
+        if cached is not None: return cached
+        track = TRACKS.track(norad_id, start, end, args["step_seconds"], args["zoom"])
+        if track is None:
+            abort(404, message=f"NORAD ID {norad_id} is not in the loaded catalog.")
+        return track
+
+@blp.route("/jobs")
+class Jobs(MethodView):
+    """API endpoint submitting long-running analyses (multi-epoch forecasts) as background jobs."""
+
+    @blp.arguments(JobSubmitSchema)
+    @blp.response(202, JobStatusSchema)
+    @blp.alt_response(200, schema=JobStatusSchema, description="An identical job already finished.")
+    def post(self, params):
+        """
+        Queues one analysis every step_minutes over [start, end] (at most 72 h), optionally
+        restricted to some FIRs / a minimum risk. Returns the job ID at once; poll
+        /api/jobs/<job_id> for progress and fetch /api/jobs/<job_id>/result when done.
+        Resubmitting identical parameters returns the existing job (cached=true).
+        """
+        if not ALL_SATELLITES:
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+        job, cached = JOBS.submit(params)
+        status = 200 if job.status == "done" else 202
+        return job.describe(cached), status, {"Location": f"/api/jobs/{job.job_id}"}
+
+@blp.route("/jobs/<string:job_id>")
+class JobStatus(MethodView):
+    """API endpoint reporting the status and progress of a background job."""
+
+    @blp.response(200, JobStatusSchema)
+    def get(self, job_id):
+        """Returns status (queued | running | done | failed), progress in [0, 1] and any error."""
+        job = JOBS.get(job_id)
+        if job is None: abort(404, message=f"Unknown or expired job '{job_id}'.")
+        return job.describe()
+
+@blp.route("/jobs/<string:job_id>/result")
+class JobResult(MethodView):
+    """API endpoint returning the per-epoch events of a finished job."""
+
+    @blp.response(200, JobResultSchema)
+    def get(self, job_id):
+        """Returns one {timestamp, events} entry per analysis epoch; 409 until the job is done."""
+        job = JOBS.get(job_id)
+        if job is None: abort(404, message=f"Unknown or expired job '{job_id}'.")
+        if job.status != "done":
+            abort(409, message=f"Job is {job.status}" + (f": {job.error}" if job.error else "."))
+        # Results never change, so repeated downloads are 304s / cached compressed bodies
+        cached = begin_conditional(make_etag("job", job.param_hash))
+        if cached is not None: return cached
+        return {"job_id": job.job_id, "params": job.params, "results": job.results}
+
+@blp.route("/firs/access")
+class FirAccess(MethodView):
+    """API endpoint listing the objects over a FIR during a time window, from the access-window index."""
+
+    @blp.arguments(FirAccessQuerySchema, location="query")
+    @blp.response(200, FirAccessResponseSchema)
+    def get(self, query):
+        """
+        Returns every object whose sub-point is inside the FIR box at some time in [start, end]
+        with its entry/exit times. Answered from precomputed intervals (no propagation); 503
+        while the index is first being built.
+        """
+        index = ACCESS_WINDOWS.get()
+        if index is None:
+            abort(503, message="FIR access-window index is being built. Retry shortly.", headers={"Retry-After": "30"})
+        start = query.get("start") or datetime.now(UTC)
+        end = query.get("end") or start + timedelta(hours=1)
+        if end < start: abort(400, message="end must not precede start.")
+        if not index.covers(start, end):
+            abort(400, message=f"Window must lie within the indexed horizon {index.start.isoformat()} - {index.end.isoformat()}.")
+        return index.access_report(query["fir"], start, end)
+
+@blp.route("/positions")
+class Positions(MethodView):
+    """API endpoint with the current position of every catalog object as one packed binary frame."""
+
+    @blp.arguments(PositionsQuerySchema, location="query")
+    @blp.response(200, description="Packed frame: 24-byte header (b'LEOP', version u8, flags u8, reserved u16, "
+                  "count u32, catalog_version u32, epoch f64), then an optional u16/u32 catalog index column "
+                  "(flags & 1, u32 if flags & 2), int16 lat (90/32767 deg), int16 lon (180/32767 deg) and "
+                  "uint16 altitude (0.1 km) columns, all little-endian.", content_type="application/octet-stream")
+    def get(self, query):
+        """
+        Returns the sub-satellite points of the whole catalog for the current time step, from a
+        batched propagation shared by all requests in that step. bbox limits the frame to a map
+        viewport and zoom thins it to about one object per few screen pixels; frames that are
+        not the full catalog carry catalog positions to look up in /api/positions/index.
+        """
+        if not ALL_SATELLITES:
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+        frame = POSITIONS.current()
+        cached = begin_conditional(make_etag("positions", POSITIONS.catalog_version, frame[0], request.full_path))
+        if cached is not None: return cached
+        body = POSITIONS.frame_body(frame, query.get("bbox"), query.get("zoom"))
+        return Response(body, status=200, mimetype="application/octet-stream")
+
+@blp.route("/positions/index")
+class PositionsIndex(MethodView):
+    """API endpoint mapping /api/positions catalog positions to NORAD IDs and names."""
+
+    @blp.response(200, PositionsIndexSchema)
+    def get(self):
+        """Returns the catalog order used by position frames; fetch it again when catalog_version changes."""
+        cached = begin_conditional(make_etag("positions-index", POSITIONS.catalog_version, len(ALL_SATELLITES)))
+        if cached is not None: return cached
+        return POSITIONS.index_body()
+
+@blp.route("/heatmap")
+class Heatmap(MethodView):
+    """API endpoint with gridded object and conjunction density for the map's heat layer."""
+
+    @blp.arguments(HeatmapQuerySchema, location="query")
+    @blp.response(200, HeatmapResponseSchema)
+    def get(self, query):
+        """
+        Bins the catalog (at the snapshot time) and the snapshot's conjunction events into
+        lat/lon/altitude cells, globally or inside one FIR, and returns the non-empty cells.
+        Grids are computed once per snapshot and bin layout.
+        Example Path: /api/heatmap?fir=Incheon (South Korea)&cell_deg=0.5&alt_min_km=500&alt_max_km=600
+        """
         if not ALL_SATELLITES:
-            return {"error": "TLE data not loaded. Check TLE file path."}, 500
-
-        # Execute analysis logic for the specified time
-        events = run_full_risk_analysis(ALL_SATELLITES, analysis_time=analysis_time)
-        
-        return {
-            'timestamp': analysis_time.isoformat(),
-            'events': events
-        }
+            abort(500, message="TLE data not loaded. Check TLE file path.")
+        snapshot = SNAPSHOTS.at_time(query["time"]) if query["time"] else SNAPSHOTS.current()
+        cached = begin_conditional(make_etag(snapshot.key, "heatmap", request.full_path))
+        if cached is not None: return cached
+        return snapshot_heatmap(snapshot, ALL_SATELLITES, query, EPHEMERIS)
+
+@blp.route("/events/history")
+class EventHistory(MethodView):
+    """API endpoint to query previously computed conjunction events from the event store."""
+
+    @blp.arguments(EventHistoryQuerySchema, location="query")
+    @blp.response(200, EventHistoryResponseSchema)
+    def get(self, args):
+        """
+        Returns stored events filtered by time range, NORAD ID, FIR and risk category
+        (highest risk first). Served from indexed SQLite, no propagation involved.
+        Example Path: /api/events/history?norad_id=44714&start=2025-10-05T00:00:00Z
+        """
+        events = EVENT_STORE.query(**args)
+        return {'count': len(events), 'events': events}
+
+@blp.route("/alerts/<string:date_str>")
+class AlertsByDate(MethodView):
+    """API endpoint backing the Flutter ApiService.fetchAlertsByDate call."""
+
+    def get(self, date_str):
+        """
+        Returns all stored alerts for one UTC calendar day (YYYY-MM-DD) in the Flutter
+        {lastUpdate, alerts} format.
+        """
+        try:
+            events = EVENT_STORE.events_on_date(date_str, limit=5000)
+        except ValueError:
+            abort(400, message="Invalid date format. Use YYYY-MM-DD.")
+        return to_alerts_response(events, datetime.now(UTC).isoformat())
     
 # Register the blueprint with the API
 api.register_blueprint(blp)
@@ -103,10 +472,18 @@ def home():
     return jsonify({"message": "LEO Risk Analysis Server is running. Access API at /api/risk-events. Documentation at /swagger-ui"})
 
 
+_FIRS_GEOJSON = None; _FIRS_ETAG = None
+
 @app.route('/api/firs')
 def get_firs():
-    # The eurofirs object is a GeoDataFrame. We can convert it to GeoJSON.
-    return jsonify(eurofirs.head().__geo_interface__)
+    global _FIRS_GEOJSON, _FIRS_ETAG
+    # The eurofirs object is a GeoDataFrame. We can convert it to GeoJSON (once; it never changes).
+    if _FIRS_GEOJSON is None:
+        _FIRS_GEOJSON = eurofirs.head().__geo_interface__
+        _FIRS_ETAG = make_etag("firs", json.dumps(_FIRS_GEOJSON, sort_keys=True, default=str))
+    cached = begin_conditional(_FIRS_ETAG)
+    if cached is not None: return cached
+    return jsonify(_FIRS_GEOJSON)
 
 # @app.route('/api/airspaces')
 # def get_airspaces():
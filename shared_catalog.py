@@ -0,0 +1,85 @@
+# shared_catalog.py - TLE catalog published once by the gunicorn master and attached by every worker
+
+# 1. Imports and Setup
+from datetime import datetime, UTC
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from monte_carlo import satrec_elements, satrec_from_elements
+from propagation import catalog_tag
+
+# tmpfs when available, so the mapped pages are plain shared memory
+CATALOG_SHM_DIR = os.getenv("CATALOG_SHM_DIR", "/dev/shm/leo-catalog" if os.path.isdir("/dev/shm")
+                            else os.path.join(tempfile.gettempdir(), "leo-catalog"))
+# Set by the master (gunicorn.conf.py) to the published version; inherited by forked workers
+SHARED_CATALOG_ENV = "LEO_SHARED_CATALOG"
+
+
+# --- 2. Publishing (master process) ---
+
+def publish_catalog(satellites, directory=CATALOG_SHM_DIR):
+    """
+    Writes the catalog columns (mean elements, names, NORAD IDs, perigee/apogee altitudes) as
+    .npy files into a new version directory and returns its path. Older versions are removed;
+    workers still mapping them keep their pages until they exit.
+    """
+    names = list(satellites.keys())
+    satrecs = [satellites[name] for name in names]
+    tag = catalog_tag(satellites)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, tag[:16])
+    if not os.path.isdir(path):
+        staging = tempfile.mkdtemp(prefix=".publishing-", dir=directory)
+        radius = np.array([sat.radiusearthkm for sat in satrecs])
+        np.save(os.path.join(staging, "elements.npy"), np.array([satrec_elements(sat) for sat in satrecs], dtype=float))
+        np.save(os.path.join(staging, "names.npy"), np.array(names, dtype=str))
+        np.save(os.path.join(staging, "norad_ids.npy"), np.array([sat.satnum for sat in satrecs], dtype=np.int64))
+        np.save(os.path.join(staging, "perigee_km.npy"), np.array([sat.altp for sat in satrecs]) * radius)
+        np.save(os.path.join(staging, "apogee_km.npy"), np.array([sat.alta for sat in satrecs]) * radius)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({"tag": tag, "count": len(names), "published_at": datetime.now(UTC).isoformat()}, f)
+        os.rename(staging, path)
+    for entry in os.listdir(directory):
+        if entry != os.path.basename(path):
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return path
+
+
+# --- 3. Attaching (worker processes) ---
+
+class SharedSatellites(dict):
+    """
+    {name: Satrec} view of a published catalog. Satrec objects are C structs that cannot live
+    in shared memory, so each process rebuilds them from the mapped element rows (sgp4init, no
+    TLE parsing); `columns` holds the mapped arrays for VectorCatalog to reuse without copying.
+
+    Only those columns are shared. Each worker still holds its own Satrec objects and what is
+    derived from them: the VectorCatalog SatrecArray, the debris-density index, formation groups
+    and the FIR access-window index. The ephemeris grid is shared separately (ephemeris.py).
+    """
+
+    def __init__(self, path):
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.columns = {name: load(name) for name in ("elements", "norad_ids", "perigee_km", "apogee_km")}
+        names = load("names")
+        # Column 0 (satnum) is stored as float; sgp4init needs it back as an int
+        super().__init__((str(name), satrec_from_elements((int(row[0]),) + tuple(row[1:].tolist())))
+                         for name, row in zip(names, self.columns["elements"]))
+
+def load_shared_catalog():
+    """The catalog published by the master, or None outside gunicorn (or if it is unreadable)."""
+    path = os.getenv(SHARED_CATALOG_ENV)
+    if not path: return None
+    try:
+        satellites = SharedSatellites(path)
+        print(f"[+] INFO: Attached shared catalog {os.path.basename(path)} ({len(satellites)} satellites).")
+        return satellites
+    except (OSError, ValueError) as e:
+        print(f"[-] WARNING: Shared catalog at {path} unavailable ({e}); loading the TLE file instead.")
+        return None
@@ -0,0 +1,381 @@
+# snapshot.py - Cached, versioned risk-event snapshots with in-memory indexes for filtered queries
+
+# 1. Imports and Setup
+from collections import OrderedDict, deque
+from datetime import datetime, UTC
+import base64
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+from marshmallow import Schema, fields, validate, validates, ValidationError
+
+SNAPSHOT_TTL_SECONDS = float(os.getenv("SNAPSHOT_TTL_SECONDS", "30"))  # Matches the client poll interval
+SNAPSHOT_HISTORY = 4       # Recent snapshots kept so open cursors can finish paging
+AT_TIME_CACHE_SIZE = 8     # Forecast snapshots kept per process
+DEFAULT_PAGE_SIZE = 100; MAX_PAGE_SIZE = 1000
+CHANGE_HISTORY = int(os.getenv("CHANGE_HISTORY", "120"))  # Snapshot diffs kept for /changes (~1 h at 30 s)
+TCA_BUCKET_SECONDS = 600   # Same pair with TCAs within one bucket = same encounter
+# An event counts as "updated" only when one of these (rounded) values changes between snapshots
+_CHANGE_SIGNATURE = (("risk_category", None), ("fir", None), ("risk_score", 2),
+                     ("distance_km", 0), ("collision_probability", 6))
+
+
+# --- 2. Marshmallow Schemas ---
+
+class RiskEventsQuerySchema(Schema):
+    """Filtering, pagination and sparse-fieldset parameters shared by the risk-event endpoints."""
+    min_risk = fields.Float(load_default=None, validate=validate.Range(min=0.0, max=1.0),
+                            metadata={"description": "Only events with risk_score >= min_risk."})
+    category = fields.Str(load_default=None, validate=validate.OneOf(["Danger", "Attention"]))
+    fir = fields.Str(load_default=None, metadata={"description": "FIR name, e.g. 'Incheon (South Korea)'."})
+    norad_id = fields.Int(load_default=None, metadata={"description": "Events involving this NORAD ID."})
+    bbox = fields.Str(load_default=None,
+                      metadata={"description": "min_lon,min_lat,max_lon,max_lat of the event location."})
+    # Every event of a snapshot shares its analysis time, so a time range cannot select among them
+    start = fields.AwareDateTime(load_default=None, default_timezone=UTC,
+                                 metadata={"description": "Not supported on snapshots (400); use /api/events/history."})
+    end = fields.AwareDateTime(load_default=None, default_timezone=UTC,
+                               metadata={"description": "Not supported on snapshots (400); use /api/events/history."})
+    limit = fields.Int(load_default=DEFAULT_PAGE_SIZE, validate=validate.Range(min=1, max=MAX_PAGE_SIZE))
+    cursor = fields.Str(load_default=None, metadata={"description": "Opaque next_cursor from a previous page."})
+    fields_ = fields.Str(data_key="fields", load_default=None,
+                         metadata={"description": "Comma-separated event fields to return (sparse fieldset)."})
+
+    @validates("bbox")
+    def _validate_bbox(self, value, **kwargs):
+        if value is None: return
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(x) for x in value.split(","))
+        except ValueError:
+            raise ValidationError("bbox must be 'min_lon,min_lat,max_lon,max_lat'.")
+        if min_lat > max_lat: raise ValidationError("bbox min_lat must not exceed max_lat.")
+
+class RiskEventChangesQuerySchema(Schema):
+    """Query parameters for /api/risk-events/changes."""
+    since = fields.Int(required=True, validate=validate.Range(min=0),
+                       metadata={"description": "Snapshot version the client already holds (0 = none)."})
+    fir = fields.Str(load_default=None, metadata={"description": "Only changes for events in this FIR."})
+    norad_id = fields.Int(load_default=None, metadata={"description": "Only changes involving this NORAD ID."})
+
+
+# --- 3. Snapshot and Indexes ---
+
+def event_id(event, analysis_time=None, bucket_seconds=None):
+    """
+    Stable identity of an encounter across snapshots: the NORAD pair (order-free), plus the
+    TCA bucket when the event carries a computed TCA. Live events without one are keyed by
+    the pair alone, so a pair that stays close shows up as "updated" instead of being removed
+    and re-added whenever the clock crosses a bucket. Pass bucket_seconds to split TCA-less
+    events by analysis_time instead (batch campaigns spanning many orbits).
+    """
+    a, b = sorted((event.get("norad_id_1") or 0, event.get("norad_id_2") or 0))
+    tca = event.get("tca")
+    if tca is None:
+        if bucket_seconds is None or analysis_time is None: return f"{a}-{b}"
+        tca = analysis_time
+    if isinstance(tca, str): tca = datetime.fromisoformat(tca)
+    return f"{a}-{b}-{int(tca.timestamp() // (bucket_seconds or TCA_BUCKET_SECONDS))}"
+
+def _signature(event):
+    return tuple(round(event[k], nd) if nd is not None and event.get(k) is not None else event.get(k)
+                 for k, nd in _CHANGE_SIGNATURE)
+
+def snapshot_key(analysis_time, events):
+    """
+    Content identity of a snapshot (analysis time plus every event_id and change signature), so
+    every worker process that computes the same result hands out the same key and ETags.
+    """
+    digest = hashlib.sha1(analysis_time.isoformat().encode())
+    for eid, signature in sorted((e["event_id"], repr(_signature(e))) for e in events):
+        digest.update(f"|{eid}:{signature}".encode())
+    return digest.hexdigest()[:20]
+
+class RiskSnapshot:
+    """
+    Immutable result of one analysis run. Events are kept sorted by risk (highest first) and
+    indexed by category, FIR and NORAD ID (position lists) plus columnar risk/lat/lon arrays, so
+    filtered pages are index intersections and vectorized masks instead of list scans.
+    """
+
+    def __init__(self, version, analysis_time, events):
+        self.version = version
+        self.analysis_time = analysis_time; self.timestamp = analysis_time.isoformat()
+        self.events = sorted(events, key=lambda e: e["risk_score"], reverse=True)
+        for event in self.events: event.setdefault("event_id", event_id(event, analysis_time))
+        self.key = snapshot_key(analysis_time, self.events)
+        self.by_id = {e["event_id"]: e for e in self.events}
+        n = len(self.events)
+        self.risk = np.array([e["risk_score"] for e in self.events], dtype=float)
+        self.lat = np.array([e.get("lat", np.nan) for e in self.events], dtype=float)
+        self.lon = np.array([e.get("lon", np.nan) for e in self.events], dtype=float)
+        self.alt = np.array([e.get("alt_km", np.nan) for e in self.events], dtype=float)
+        self.by_category = self._index(lambda e: (e.get("risk_category"),))
+        self.by_fir = self._index(lambda e: (e.get("fir"),))
+        self.by_norad = self._index(lambda e: {e.get("norad_id_1"), e.get("norad_id_2")})
+        self.encoded_events = {}   # Body format -> per-event encoded bytes, filled lazily by serialization.py
+        self.aggregates = {}       # Grid parameters -> density grid, filled lazily by heatmap.py
+
+    def _index(self, keys_of):
+        buckets = {}
+        for pos, event in enumerate(self.events):
+            for k in keys_of(event):
+                if k is not None: buckets.setdefault(k, []).append(pos)
+        return {k: np.array(v, dtype=np.int64) for k, v in buckets.items()}
+
+    def select(self, min_risk=None, category=None, fir=None, norad_id=None, bbox=None):
+        """Positions of matching events, in risk order."""
+        candidates = None
+        for index, key in ((self.by_category, category), (self.by_fir, fir), (self.by_norad, norad_id)):
+            if key is None: continue
+            positions = index.get(key, np.empty(0, dtype=np.int64))
+            candidates = positions if candidates is None else np.intersect1d(candidates, positions, assume_unique=True)
+        if candidates is None: candidates = np.arange(len(self.events))
+
+        mask = np.ones(len(candidates), dtype=bool)
+        if min_risk is not None: mask &= self.risk[candidates] >= min_risk
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = (float(x) for x in bbox.split(","))
+            lat, lon = self.lat[candidates], self.lon[candidates]
+            mask &= (lat >= min_lat) & (lat <= max_lat)
+            # A box with min_lon > max_lon wraps across the antimeridian
+            if min_lon <= max_lon: mask &= (lon >= min_lon) & (lon <= max_lon)
+            else: mask &= (lon >= min_lon) | (lon <= max_lon)
+        return candidates[mask]
+
+    def page_parts(self, query):
+        """
+        Applies a loaded RiskEventsQuerySchema dict; returns the page envelope (everything but
+        'events'), the positions of the page's events and the requested field names (or None).
+        """
+        positions = self.select(query.get("min_risk"), query.get("category"), query.get("fir"),
+                                query.get("norad_id"), query.get("bbox"))
+        offset = decode_cursor(query.get("cursor"))[1] if query.get("cursor") else 0
+        limit = query.get("limit", DEFAULT_PAGE_SIZE)
+        page = positions[offset:offset + limit]
+        wanted = query.get("fields_")
+        names = [f.strip() for f in wanted.split(",") if f.strip()] if wanted else None
+        next_offset = offset + len(page)
+        envelope = {
+            "timestamp": self.timestamp, "version": self.version, "total": int(len(positions)),
+            "next_cursor": encode_cursor(self.key, next_offset) if next_offset < len(positions) else None
+        }
+        return envelope, page, names
+
+    def page(self, query):
+        """Response body (dict) for one page; see page_parts."""
+        envelope, page, names = self.page_parts(query)
+        if names:
+            events = [{k: self.events[p][k] for k in names if k in self.events[p]} for p in page]
+        else:
+            events = [self.events[p] for p in page]
+        return dict(envelope, events=events)
+
+
+# --- 4. Snapshot Diffs ---
+
+def diff_snapshots(old, new):
+    """
+    Changes from snapshot old to new keyed by event_id: {"added": [...], "updated": [...],
+    "removed": [...]}, all holding event dicts (removed ones as last seen) so filters still apply.
+    """
+    added = [e for k, e in new.by_id.items() if k not in old.by_id]
+    updated = [e for k, e in new.by_id.items() if k in old.by_id and _signature(e) != _signature(old.by_id[k])]
+    removed = [e for k, e in old.by_id.items() if k not in new.by_id]
+    return {"added": added, "updated": updated, "removed": removed}
+
+def merge_diffs(diffs):
+    """Collapses consecutive diffs into one net diff (an add later removed disappears entirely)."""
+    state = {}   # event_id -> ("added" | "updated" | "removed", event)
+    for diff in diffs:
+        for e in diff["added"]:
+            prior = state.get(e["event_id"], (None,))[0]
+            state[e["event_id"]] = ("updated" if prior == "removed" else "added", e)
+        for e in diff["updated"]:
+            prior = state.get(e["event_id"], (None,))[0]
+            state[e["event_id"]] = ("added" if prior == "added" else "updated", e)
+        for e in diff["removed"]:
+            if state.get(e["event_id"], (None,))[0] == "added": del state[e["event_id"]]
+            else: state[e["event_id"]] = ("removed", e)
+    merged = {"added": [], "updated": [], "removed": []}
+    for kind, event in state.values(): merged[kind].append(event)
+    return merged
+
+def filter_changes(changes, fir=None, norad_id=None):
+    """Restricts a diff to events in one FIR and/or involving one NORAD ID."""
+    def keep(e):
+        return ((fir is None or e.get("fir") == fir) and
+                (norad_id is None or norad_id in (e.get("norad_id_1"), e.get("norad_id_2"))))
+    return {kind: [e for e in events if keep(e)] for kind, events in changes.items()}
+
+def changes_body(since, snapshot, changes, reset=False):
+    return {
+        "since": since, "version": snapshot.version, "timestamp": snapshot.timestamp, "reset": reset,
+        "added": changes["added"], "updated": changes["updated"],
+        "removed": [e["event_id"] for e in changes["removed"]]
+    }
+
+
+# --- 5. Cursors ---
+
+def encode_cursor(snapshot_key, offset):
+    raw = json.dumps({"s": snapshot_key, "o": int(offset)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Returns (snapshot_key, offset); raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(data["s"]), int(data["o"])
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+# --- 6. Snapshot Cache ---
+
+class SnapshotCache:
+    """
+    Holds the live snapshot (recomputed at most every ttl_seconds) plus a few recent and
+    forecast snapshots so cursors keep paging against the data they started on.
+    compute_fn(analysis_time) must return the list of event dicts for that time.
+
+    Live analysis times are floored to the ttl_seconds grid and the version is that time in
+    Unix seconds, so every worker process computing the same slot reports the same version.
+    """
+
+    def __init__(self, compute_fn, ttl_seconds=SNAPSHOT_TTL_SECONDS, stale_on=()):
+        self.compute_fn = compute_fn; self.ttl_seconds = ttl_seconds
+        self.stale_on = stale_on          # Exception types (e.g. admission rejections) answered with the stale snapshot
+        self.version = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()   # Only one request recomputes an expired snapshot
+        self._live = None; self._computed_at = None
+        self._recent = OrderedDict()      # key -> RiskSnapshot (live history and forecasts)
+        self._forecasts = OrderedDict()   # analysis time (ISO) -> forecast RiskSnapshot
+        self._diffs = deque(maxlen=CHANGE_HISTORY)   # (from_version, to_version, diff) ring buffer
+        self._listeners = []; self._refresher = None; self._stop_refresh = threading.Event()
+
+    def _remember(self, snapshot, limit):
+        self._recent[snapshot.key] = snapshot
+        self._recent.move_to_end(snapshot.key)
+        while len(self._recent) > limit: self._recent.popitem(last=False)
+
+    def _slot(self, now=None):
+        """Live analysis time for `now`: the start of its ttl_seconds slot."""
+        now = (now or datetime.now(UTC)).timestamp()
+        return datetime.fromtimestamp(now // self.ttl_seconds * self.ttl_seconds if self.ttl_seconds > 0 else now, UTC)
+
+    def publish(self, events, analysis_time):
+        """Installs a freshly computed event list as the new live snapshot version."""
+        with self._lock:
+            self.version = max(int(analysis_time.timestamp()), self.version + 1)
+            snapshot = RiskSnapshot(self.version, analysis_time, events)
+            previous = self._live; diff = None
+            if previous is not None:
+                diff = diff_snapshots(previous, snapshot)
+                self._diffs.append((previous.version, snapshot.version, diff))
+            self._live = snapshot; self._computed_at = datetime.now(UTC)
+            self._remember(snapshot, SNAPSHOT_HISTORY + AT_TIME_CACHE_SIZE)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(previous.version if previous else 0, snapshot, diff)
+            except Exception as e:
+                print(f"[-] ERROR: Snapshot listener failed: {e}")
+        return snapshot
+
+    def add_listener(self, fn):
+        """fn(previous_version, snapshot, diff) is called after every publish (diff is None for the first)."""
+        with self._lock:
+            self._listeners.append(fn)
+
+    def start_refresher(self):
+        """Starts (unless running) a daemon thread that republishes the live snapshot every ttl_seconds."""
+        with self._lock:
+            self._stop_refresh.clear()
+            if self._refresher is not None: return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="snapshot-refresh", daemon=True)
+            self._refresher.start()
+
+    def stop_refresher(self):
+        """Lets the refresh thread exit after its current cycle (start_refresher restarts it)."""
+        with self._lock:
+            self._stop_refresh.set()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.current()
+            except Exception as e:
+                print(f"[-] ERROR: Background snapshot refresh failed: {e}")
+            now = datetime.now(UTC)
+            self._stop_refresh.wait(max((self._slot(now) - now).total_seconds() + self.ttl_seconds, 1.0))
+            with self._lock:
+                # Decided under the lock, so a concurrent start_refresher either cancels the stop or starts anew
+                if self._stop_refresh.is_set():
+                    self._refresher = None; return
+
+    def is_fresh(self):
+        return (self._live is not None and self.ttl_seconds > 0
+                and self._live.analysis_time >= self._slot())
+
+    def current(self):
+        """
+        Returns the live snapshot, recomputing it if it is older than the TTL. While one request
+        recomputes, concurrent readers get the previous snapshot instead of queueing behind it.
+        """
+        if self.is_fresh(): return self._live
+        if not self._refresh_lock.acquire(blocking=self._live is None): return self._live
+        try:
+            if self.is_fresh(): return self._live
+            analysis_time = self._slot()
+            try:
+                events = self.compute_fn(analysis_time)
+            except self.stale_on:
+                if self._live is None: raise
+                return self._live
+            return self.publish(events, analysis_time)
+        finally:
+            self._refresh_lock.release()
+
+    def at_time(self, analysis_time):
+        """Forecast snapshot for an arbitrary time, memoized per process."""
+        when = analysis_time.isoformat()
+        with self._lock:
+            cached = self._forecasts.get(when)
+        if cached is not None: return cached
+        snapshot = RiskSnapshot(0, analysis_time, self.compute_fn(analysis_time))
+        with self._lock:
+            self._forecasts[when] = snapshot
+            while len(self._forecasts) > AT_TIME_CACHE_SIZE: self._forecasts.popitem(last=False)
+            self._remember(snapshot, SNAPSHOT_HISTORY + AT_TIME_CACHE_SIZE)
+        return snapshot
+
+    def lookup(self, key):
+        with self._lock:
+            return self._recent.get(key)
+
+    def changes_since(self, since):
+        """
+        Net diff from live version `since` to the current live snapshot, or None when this
+        process never published that exact version (it left the ring buffer, or the client's
+        previous request was answered by another worker) and the client must resynchronize
+        from the full snapshot.
+        """
+        with self._lock:
+            if since == self.version: return {"added": [], "updated": [], "removed": []}
+            start = next((i for i, (frm, _, _) in enumerate(self._diffs) if frm == since), None)
+            if start is None: return None
+            diffs = [d for _, _, d in list(self._diffs)[start:]]
+        return merge_diffs(diffs)
+
+    def changes_payload(self, since, fir=None, norad_id=None):
+        """Response body shared by /changes and the push stream (see RiskEventChangesResponseSchema)."""
+        snapshot = self.current()
+        changes = self.changes_since(since)
+        reset = changes is None
+        if reset: changes = {"added": snapshot.events, "updated": [], "removed": []}
+        return changes_body(since, snapshot, filter_changes(changes, fir, norad_id), reset)
@@ -0,0 +1,33 @@
+# test_collision_probability.py - 2D Pc quadrature against a Monte Carlo reference
+
+import numpy as np
+
+from collision_probability import compute_pc_batch, default_covariance
+
+
+def monte_carlo_pc(r1, v1, r2, v2, age1, age2, hbr, samples=400_000, seed=7):
+    """Samples both position errors in 3D and counts misses inside hbr across the encounter plane."""
+    rng = np.random.default_rng(seed)
+    e1 = rng.multivariate_normal(np.zeros(3), default_covariance(r1, v1, age1), samples)
+    e2 = rng.multivariate_normal(np.zeros(3), default_covariance(r2, v2, age2), samples)
+    rel = (r2 - r1) + e2 - e1
+    z = (v2 - v1) / np.linalg.norm(v2 - v1)
+    across = rel - np.outer(rel @ z, z)
+    return np.mean(np.linalg.norm(across, axis=1) < hbr), samples
+
+def test_pc_matches_monte_carlo():
+    r1 = np.array([7000.0, 0.0, 0.0]); v1 = np.array([0.0, 7.5, 0.0])
+    v2 = np.array([0.0, 5.3, 5.3])
+    cases = [(np.array([0.3, 0.0, 0.0]), 0.5, 1.0, 2.0), (np.array([0.8, 0.1, -0.1]), 0.3, 0.5, 0.5)]
+    for offset, hbr, age1, age2 in cases:
+        r2 = r1 + offset
+        pc = compute_pc_batch(r1, v1, r2, v2, np.array([age1]), np.array([age2]), np.array([hbr]))[0]
+        reference, n = monte_carlo_pc(r1, v1, r2, v2, age1, age2, hbr)
+        assert abs(pc - reference) < 4.0 * np.sqrt(reference * (1.0 - reference) / n)
+
+def test_pc_decreases_with_miss_distance():
+    r1 = np.array([[7000.0, 0.0, 0.0]] * 3); v1 = np.array([[0.0, 7.5, 0.0]] * 3)
+    r2 = r1 + np.array([[0.1, 0.0, 0.0], [1.0, 0.0, 0.0], [10.0, 0.0, 0.0]])
+    v2 = np.array([[0.0, 0.0, 7.5]] * 3)
+    pc = compute_pc_batch(r1, v1, r2, v2, np.ones(3), np.ones(3), np.full(3, 0.02))
+    assert pc[0] > pc[1] > pc[2] >= 0.0
@@ -0,0 +1,26 @@
+# test_event_store.py - Recording, querying and retention of stored events
+
+from datetime import datetime, timedelta, UTC
+
+from event_store import EventStore
+
+
+def event(a, b, risk=0.6):
+    return {"norad_id_1": a, "norad_id_2": b, "satellite1": f"SAT {a}", "satellite2": f"SAT {b}",
+            "risk_score": risk, "risk_category": "Attention", "fir": "Incheon (South Korea)"}
+
+def test_query_by_time_and_norad(tmp_path):
+    store = EventStore(str(tmp_path / "events.sqlite3"), retention_days=0)
+    t0 = datetime.now(UTC)
+    store.record_events([event(1, 2), event(3, 4, risk=0.9)], t0)
+    store.record_events([event(1, 2, risk=0.7)], t0 + timedelta(minutes=1))
+    assert [e["risk_score"] for e in store.query(norad_id=1)] == [0.7, 0.6]
+    assert len(store.query(start=t0 + timedelta(seconds=30))) == 1
+
+def test_old_events_are_purged_on_record(tmp_path):
+    store = EventStore(str(tmp_path / "events.sqlite3"), retention_days=30)
+    now = datetime.now(UTC)
+    store.record_events([event(1, 2)], now - timedelta(days=40))
+    store.record_events([event(3, 4)], now - timedelta(days=10))
+    assert [e["norad_id_1"] for e in store.query()] == [3]
+    assert store.purge(now) == 1 and store.query() == []
@@ -0,0 +1,42 @@
+# test_frames.py - GMST and TEME -> geodetic conversion
+
+import numpy as np
+
+from frames import WGS84_A_KM, WGS84_B_KM, WGS84_E2, gmst_radians, ecef_to_geodetic, teme_to_geodetic
+
+
+def geodetic_to_ecef(lat_deg, lon_deg, alt_km):
+    """Closed-form inverse of ecef_to_geodetic, as the reference."""
+    lat = np.radians(lat_deg); lon = np.radians(lon_deg)
+    n = WGS84_A_KM / np.sqrt(1.0 - WGS84_E2 * np.sin(lat) ** 2)
+    return np.stack([(n + alt_km) * np.cos(lat) * np.cos(lon),
+                     (n + alt_km) * np.cos(lat) * np.sin(lon),
+                     (n * (1.0 - WGS84_E2) + alt_km) * np.sin(lat)], axis=-1)
+
+def test_gmst_at_j2000():
+    assert np.isclose(np.degrees(gmst_radians(2451545.0, 0.0)), 280.4606, atol=1e-4)
+
+def test_gmst_advances_one_sidereal_day():
+    # The Earth turns 360.9856 deg per solar day
+    step = np.degrees(gmst_radians(2451546.0, 0.0) - gmst_radians(2451545.0, 0.0)) % 360.0
+    assert np.isclose(step, 0.9856, atol=1e-3)
+
+def test_geodetic_axes():
+    lat, lon, alt = ecef_to_geodetic(np.array([[WGS84_A_KM, 0.0, 0.0], [0.0, 0.0, WGS84_B_KM + 500.0]]))
+    assert np.allclose(lat, [0.0, 90.0]) and np.isclose(lon[0], 0.0)
+    assert np.allclose(alt, [0.0, 500.0], atol=1e-6)
+
+def test_geodetic_round_trip():
+    lat = np.array([37.5, -12.0, 65.0, 0.0]); lon = np.array([127.0, -75.5, 179.9, -180.0 + 1e-6])
+    alt = np.array([550.0, 1200.0, 35786.0, 300.0])
+    got_lat, got_lon, got_alt = ecef_to_geodetic(geodetic_to_ecef(lat, lon, alt))
+    assert np.allclose(got_lat, lat, atol=1e-6)
+    assert np.allclose(got_lon, lon, atol=1e-9)
+    assert np.allclose(got_alt, alt, atol=1e-3)
+
+def test_teme_to_geodetic_rotates_by_gmst():
+    # A TEME vector along x sits at longitude -GMST in the Earth-fixed frame
+    jd, fr = 2460000.0, 0.25
+    lat, lon, alt = teme_to_geodetic(np.array([WGS84_A_KM + 400.0, 0.0, 0.0]), jd, fr)
+    expected = (-np.degrees(gmst_radians(jd, fr)) + 180.0) % 360.0 - 180.0
+    assert np.isclose(lat, 0.0) and np.isclose(lon, expected) and np.isclose(alt, 400.0)
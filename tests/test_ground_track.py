@@ -0,0 +1,44 @@
+# test_ground_track.py - Antimeridian splitting and polyline decimation
+
+from datetime import datetime, UTC
+
+import numpy as np
+
+from ground_track import split_antimeridian, simplify, snap_window
+
+
+def test_split_at_antimeridian_interpolates_edge_points():
+    lon = np.array([170.0, 176.0, -178.0, -172.0])
+    lat = np.array([0.0, 3.0, 6.0, 9.0]); alt = np.full(4, 500.0); t = np.arange(4) * 30.0
+    first, second = split_antimeridian(lat, lon, alt, t)
+    # 176 -> -178 is 6 deg eastward; the edge lies 4/6 of the way, at lat 3 + 3 * 2/3
+    assert np.allclose(first[-1], [5.0, 180.0, 500.0, 50.0])
+    assert np.allclose(second[0], [5.0, -180.0, 500.0, 50.0])
+    assert np.array_equal(first[:-1, 1], lon[:2]) and np.array_equal(second[1:, 1], lon[2:])
+
+def test_split_westward_and_without_crossing():
+    lat = np.zeros(3); alt = np.zeros(3); t = np.arange(3.0)
+    west = split_antimeridian(lat, np.array([-175.0, -179.0, 177.0]), alt, t)
+    assert [s[-1, 1] for s in west[:-1]] == [-180.0] and west[1][0, 1] == 180.0
+    assert len(split_antimeridian(lat, np.array([10.0, 20.0, 30.0]), alt, t)) == 1
+    assert split_antimeridian(lat[:0], lat[:0], alt[:0], t[:0]) == []
+
+def test_simplify_drops_collinear_points_and_keeps_corners():
+    line = np.column_stack([np.linspace(0, 10, 11), np.linspace(0, 10, 11), np.zeros(11), np.arange(11.0)])
+    assert np.array_equal(simplify(line, 0.01), line[[0, -1]])
+    corner = np.vstack([line[:6], np.column_stack([np.full(5, 5.0), np.linspace(6, 10, 5), np.zeros(5), np.arange(11, 16.0)])])
+    kept = simplify(corner, 0.01)
+    assert np.array_equal(kept[:, :2], [[0, 0], [5, 5], [5, 10]])
+
+def test_simplify_stays_within_tolerance():
+    rng = np.random.default_rng(1)
+    x = np.linspace(0, 20, 400); points = np.column_stack([np.sin(x) + rng.normal(0, 0.01, 400), x, np.zeros(400), x])
+    kept = simplify(points, 0.05)
+    assert 2 < len(kept) < len(points)
+    # Every dropped point lies within tolerance of the retained polyline (interpolated along column 1)
+    assert np.abs(np.interp(points[:, 1], kept[:, 1], kept[:, 0]) - points[:, 0]).max() <= 0.05 * 1.5
+    assert simplify(points, 0.0) is points
+
+def test_snap_window_floors_start_and_ceils_end():
+    start, end = snap_window(datetime(2025, 10, 5, 6, 0, 17, tzinfo=UTC), datetime(2025, 10, 5, 7, 0, 1, tzinfo=UTC), 30.0)
+    assert start == datetime(2025, 10, 5, 6, 0, 0, tzinfo=UTC) and end == datetime(2025, 10, 5, 7, 0, 30, tzinfo=UTC)
@@ -0,0 +1,45 @@
+# test_positions.py - Packed position frames and level-of-detail selection
+
+import numpy as np
+
+from positions import pack_frame, unpack_frame, select_positions, FLAG_INDEX, FLAG_INDEX_U32, _HEADER
+
+
+def sample_points(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-90, 90, n), rng.uniform(-180, 180, n), rng.uniform(200, 2000, n)
+
+def test_whole_catalog_round_trip():
+    lat, lon, alt = sample_points()
+    body = pack_frame(1759644000.0, 0xDEADBEEF, lat, lon, alt)
+    assert len(body) == _HEADER.size + 6 * len(lat)
+    frame = unpack_frame(body)
+    assert frame["index"] is None and frame["catalog_version"] == 0xDEADBEEF and frame["epoch"] == 1759644000.0
+    assert np.abs(frame["lat"] - lat).max() <= 90.0 / 32767 / 2 + 1e-12
+    assert np.abs(frame["lon"] - lon).max() <= 180.0 / 32767 / 2 + 1e-12
+    assert np.abs(frame["alt_km"] - alt).max() <= 0.05 + 1e-9
+
+def test_index_column_round_trip():
+    lat, lon, alt = sample_points()
+    chosen = np.array([0, 7, 42, 499])
+    frame = unpack_frame(pack_frame(0.0, 1, lat[chosen], lon[chosen], alt[chosen], index=chosen, n_catalog=len(lat)))
+    assert np.array_equal(frame["index"], chosen) and frame["index"].dtype == np.dtype("<u2")
+    assert np.allclose(frame["lat"], lat[chosen], atol=0.01)
+
+def test_wide_index_for_large_catalogs():
+    index = np.array([3, 70_000])
+    body = pack_frame(0.0, 1, np.zeros(2), np.zeros(2), np.zeros(2), index=index, n_catalog=80_000)
+    assert _HEADER.unpack_from(body)[2] == FLAG_INDEX | FLAG_INDEX_U32
+    assert np.array_equal(unpack_frame(body)["index"], index)
+
+def test_select_positions_bbox_wraps_antimeridian():
+    lat = np.array([0.0, 10.0, 10.0, 10.0]); lon = np.array([179.0, -179.0, 0.0, 175.0])
+    ok = np.array([True, True, True, False])
+    assert select_positions(lat, lon, ok, bbox="170,-20,-170,20").tolist() == [0, 1]
+
+def test_select_positions_thins_by_zoom():
+    lat, lon, alt = sample_points(5000)
+    ok = np.ones(len(lat), dtype=bool)
+    coarse = select_positions(lat, lon, ok, zoom=0); fine = select_positions(lat, lon, ok, zoom=6)
+    assert len(coarse) < len(fine) <= len(lat)
+    assert np.all(np.diff(coarse) > 0)
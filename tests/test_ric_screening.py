@@ -0,0 +1,31 @@
+# test_ric_screening.py - Neighbor-list reuse against a fresh RIC screening pass
+
+import numpy as np
+
+from ric_screening import ric_candidate_pairs, screen_states_verlet, VerletNeighborList
+
+
+def cluster(n=400, seed=5):
+    rng = np.random.default_rng(seed)
+    r = np.array([7000.0, 0.0, 0.0]) + rng.uniform(-60, 60, (n, 3))
+    v = np.array([0.0, 7.5, 0.0]) + rng.normal(0, 0.3, (n, 3))
+    return r, v
+
+def as_set(pairs):
+    return {tuple(p) for p in pairs.tolist()}
+
+def test_states_verlet_matches_ric_while_reusing():
+    r, v = cluster(); ok = np.ones(len(r), dtype=bool); ok[3] = False
+    neighbors = VerletNeighborList(reuse_seconds=30.0)
+    for dt in (0.0, 10.0, 20.0, 30.0, 45.0):
+        r_t = r + v * dt
+        expected = as_set(ric_candidate_pairs(r_t, v, ok=ok))
+        assert as_set(screen_states_verlet(r_t, v, ok, 1000.0 + dt, neighbors, key=1)) == expected
+    assert (neighbors.builds, neighbors.reuses) == (2, 3)
+
+def test_states_verlet_rebuilds_for_another_catalog():
+    r, v = cluster(); ok = np.ones(len(r), dtype=bool)
+    neighbors = VerletNeighborList()
+    screen_states_verlet(r, v, ok, 0.0, neighbors, key=1)
+    screen_states_verlet(r[:200], v[:200], ok[:200], 0.0, neighbors, key=2)
+    assert neighbors.builds == 2
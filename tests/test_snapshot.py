@@ -0,0 +1,52 @@
+# test_snapshot.py - Snapshot diffs, diff merging and change history
+
+from datetime import datetime, timedelta, UTC
+
+from snapshot import RiskSnapshot, SnapshotCache, diff_snapshots, merge_diffs, event_id
+
+T0 = datetime(2025, 10, 5, 6, 0, tzinfo=UTC)
+
+
+def event(a, b, risk=0.6, distance=12.0):
+    return {"norad_id_1": a, "norad_id_2": b, "risk_score": risk, "risk_category": "Attention",
+            "fir": "Incheon (South Korea)", "distance_km": distance, "collision_probability": None}
+
+def ids(diff):
+    return {kind: sorted(e["event_id"] for e in events) for kind, events in diff.items()}
+
+def test_event_id_is_order_free_and_stable_for_live_events():
+    assert event_id(event(2, 1), T0) == event_id(event(1, 2), T0 + timedelta(hours=1)) == "1-2"
+    assert event_id(dict(event(1, 2), tca=T0.isoformat()), T0) == f"1-2-{int(T0.timestamp() // 600)}"
+    assert event_id(event(1, 2), T0, bucket_seconds=600) == f"1-2-{int(T0.timestamp() // 600)}"
+
+def test_diff_added_updated_removed():
+    old = RiskSnapshot(1, T0, [event(1, 2), event(3, 4), event(5, 6)])
+    new = RiskSnapshot(2, T0 + timedelta(seconds=30),
+                       [event(1, 2), event(3, 4, risk=0.9), event(7, 8), event(5, 6, distance=12.2)])
+    assert ids(diff_snapshots(old, new)) == {"added": ["7-8"], "updated": ["3-4"], "removed": []}
+    assert ids(diff_snapshots(new, old)) == {"added": [], "updated": ["3-4"], "removed": ["7-8"]}
+
+def test_merge_matches_direct_diff():
+    a = RiskSnapshot(1, T0, [event(1, 2), event(3, 4)])
+    b = RiskSnapshot(2, T0, [event(1, 2, risk=0.7), event(5, 6)])
+    c = RiskSnapshot(3, T0, [event(1, 2, risk=0.7), event(3, 4), event(7, 8)])
+    merged = merge_diffs([diff_snapshots(a, b), diff_snapshots(b, c)])
+    # 5-6 came and went; 3-4 left and returned unchanged but is reported as an update
+    assert ids(merged) == {"added": ["7-8"], "updated": ["1-2", "3-4"], "removed": []}
+    direct = ids(diff_snapshots(a, c))
+    assert (direct["added"], direct["removed"]) == (ids(merged)["added"], ids(merged)["removed"])
+
+def test_snapshot_key_depends_on_content_only():
+    events = [event(1, 2), event(3, 4)]
+    assert RiskSnapshot(1, T0, [dict(e) for e in events]).key == RiskSnapshot(9, T0, [dict(e) for e in events]).key
+    assert RiskSnapshot(1, T0, [event(1, 2)]).key != RiskSnapshot(1, T0, [event(1, 2, risk=0.9)]).key
+
+def test_changes_since_known_and_unknown_versions():
+    cache = SnapshotCache(lambda t: [], ttl_seconds=30)
+    first = cache.publish([event(1, 2)], T0)
+    cache.publish([event(1, 2), event(3, 4)], T0 + timedelta(seconds=30))
+    latest = cache.publish([event(3, 4)], T0 + timedelta(seconds=60))
+    assert latest.version == int((T0 + timedelta(seconds=60)).timestamp())
+    assert ids(cache.changes_since(first.version)) == {"added": ["3-4"], "updated": [], "removed": ["1-2"]}
+    assert cache.changes_since(latest.version) == {"added": [], "updated": [], "removed": []}
+    assert cache.changes_since(first.version + 1) is None      # Never published here: client resets